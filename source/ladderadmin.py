@@ -0,0 +1,43 @@
+import argparse
+
+import ladderdb
+import ladderio
+
+# Command line tool for ladder administration that doesn't need the bot to be running.
+#
+# Examples:
+# python ladderadmin.py export roster roster.csv
+# python ladderadmin.py export history history.jsonl --ladder "Season 1"
+# python ladderadmin.py import roster roster.csv --ladder "Season 2"
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Ladder administration tool')
+    parser.add_argument('--credentials', default = 'MySQL.token', help = 'MySQL credential file')
+    subparsers = parser.add_subparsers(dest = 'command', required = True)
+
+    exportParser = subparsers.add_parser('export', help = 'Exports a roster or challenge history to a .csv or .jsonl file')
+    exportParser.add_argument('kind', choices = ladderio.exportKinds)
+    exportParser.add_argument('file')
+    exportParser.add_argument('--ladder', default = '', help = 'Ladder name, defaults to the current ladder')
+
+    importParser = subparsers.add_parser('import', help = 'Imports a roster or challenge history from a .csv or .jsonl file')
+    importParser.add_argument('kind', choices = ladderio.exportKinds)
+    importParser.add_argument('file')
+    importParser.add_argument('--ladder', default = '', help = 'Ladder name, defaults to the current ladder')
+
+    args = parser.parse_args()
+
+    db = ladderdb.LadderDatabase(args.credentials)
+
+    if args.command == 'export':
+        count = ladderio.exportToFile(db, args.kind, args.file, args.ladder)
+        print(f"Exported {count} rows to '{args.file}'.")
+
+    elif args.command == 'import':
+        count = ladderio.importFromFile(db, args.kind, args.file, args.ladder)
+
+        # Ratings depend on the whole history
+        if args.kind == 'history':
+            db.recomputeRatings(args.ladder)
+
+        print(f"Imported {count} rows from '{args.file}'.")
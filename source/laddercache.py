@@ -0,0 +1,38 @@
+import collections
+
+# Cache for rendered bot responses.
+# Entries are stored with the version of the ladder they were computed from (see LadderDatabase.getLadderVersion)
+# and are only returned while the ladder still has that version, so they never need to be invalidated explicitly.
+
+
+class ResponseCache:
+    def __init__(self, maxEntries = 1000):
+        self.maxEntries = maxEntries
+        # Maps (kind, ladder, user) -> (version, value), least recently used first
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # Returns the cached value or None if there is none for this version of the ladder
+    def get(self, kind, ladder, version, user = None):
+        key = (kind, ladder, user)
+        entry = self.entries.get(key)
+
+        if entry is None or not entry[0] == version:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, kind, ladder, version, value, user = None):
+        key = (kind, ladder, user)
+        self.entries[key] = (version, value)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.maxEntries:
+            self.entries.popitem(last = False)
+
+    def clear(self):
+        self.entries.clear()
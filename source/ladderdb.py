@@ -1,27 +1,120 @@
 import MySQLdb
+import MySQLdb.constants.CLIENT
+import MySQLdb.cursors
+import array
+import collections
+import functools
 import sys
 import math
 import datetime
+import time
+
+import laddereligibility
+import ladderevents
+import ladderrating
+import ladderreplicas
+import ladderrules
+import ladderstore
+import laddertiers
+import laddertimers
+
+# Reads MySQL credentials (host, user, password, database name) from a token file with one value per line
+def readCredentials(credentialFile):
+    mysqlCredentialFile = open(credentialFile, 'r')
+    mysqlCredentials = [line.rstrip('\n') for line in mysqlCredentialFile]
+    mysqlCredentialFile.close()
+
+    return (mysqlCredentials[0], mysqlCredentials[1], mysqlCredentials[2], mysqlCredentials[3])
+
+# Marks a method that only reads: Its queries use self.readCursor, which may belong to a read replica.
+# Read-only methods called by a read-write method always use the primary.
+def readOnly(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.readCursor is not None:
+            return method(self, *args, **kwargs)
+
+        self.readCursor = self.cursor
+        if self.replicas is not None:
+            self.readCursor = self.replicas.getCursor() or self.cursor
+
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.readCursor = None
+
+    return wrapper
+
+# Marks a method that writes to the primary, which keeps the following reads on the primary until replicas caught up
+def readWrite(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        previousReadCursor = self.readCursor
+        self.readCursor = self.cursor
+
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.readCursor = previousReadCursor
+
+            if self.replicas is not None:
+                self.replicas.markWrite()
+
+    return wrapper
 
 class LadderDatabase:
-    def __init__(self, credentialFile):
+    def __init__(self, credentialFile, replicaCredentialFiles = []):
         # Reads MySQL credentials from token file
         try:
-            mysqlCredentialFile = open(credentialFile, 'r')
-            mysqlCredentials = [line.rstrip('\n') for line in mysqlCredentialFile]
-            self.ip = mysqlCredentials[0]
-            self.user = mysqlCredentials[1]
-            self.password = mysqlCredentials[2]
-            self.databaseName = mysqlCredentials[3]
-
-            self.database = MySQLdb.connect(host = self.ip, user = self.user, passwd = self.password, db = self.databaseName)
+            self.ip, self.user, self.password, self.databaseName = readCredentials(credentialFile)
+
+            # With FOUND_ROWS, rowcount counts the rows an UPDATE matched instead of the ones it changed, see __setTimeout
+            self.database = MySQLdb.connect(host = self.ip, user = self.user, passwd = self.password, db = self.databaseName, client_flag = MySQLdb.constants.CLIENT.FOUND_ROWS)
             self.cursor = self.database.cursor()
         except:
             print('Failed to connect to MySQL database')
             raise
 
+        # Precomputed tier tables by (tier layout, number of players)
+        self.tierIndices = {}
+        # Precomputed rank and tier conditions of all pairs of players by (tier layout, number of players, rank range)
+        self.eligibilityMatrices = {}
+
+        # Names of all tables in the database, loaded with a single catalogue query on startup
+        self.existingTables = None
+
+        # Values of all configuration attributes by name, see getConfig
+        self.config = {}
+
+        # Versions of all ladders, see getLadderVersion
+        self.versionCounter = 0
+        self.ladderVersions = {}
+        self.configVersion = 0
+
+        # Running cooldowns and protections by (ladder, Discord ID, 'outgoing' or 'ingoing'), loaded per ladder on first use
+        self.timeouts = laddertimers.TimerWheel(time.time())
+        self.timeoutLadders = set()
+        # Cooldowns and protections that ran out since the last call of popExpiredTimeouts
+        self.expiredTimeouts = collections.deque(maxlen = 10000)
+
+        # ladderstore.WarmState that answers reads until the next change, see restoreWarmState
+        self.warmState = None
+
+        # Cursor used by read-only methods, see readOnly
+        self.readCursor = None
+        self.replicas = None
+
         # self.__dropAllTables()
         self.__initAllTables()
+
+        # Connects to the read replicas, if there are any
+        if len(replicaCredentialFiles) > 0:
+            try:
+                credentials = [readCredentials(replicaCredentialFile) for replicaCredentialFile in replicaCredentialFiles]
+                self.replicas = ladderreplicas.ReplicaPool(credentials, float(self.getConfig('replica_max_lag')))
+            except:
+                print('Failed to connect to MySQL read replicas')
+                raise
     
     # Executes the given query and returns all results.
     def __query(self, sqlCommand):
@@ -30,19 +123,163 @@ class LadderDatabase:
 
     # Checks if a table with the given name already exists in the database.
     def __doesTableExist(self, tableName):
-        self.cursor.execute("SELECT COUNT(*) FROM information_schema.tables WHERE table_schema=%s AND table_name=%s LIMIT 1;", (self.databaseName, tableName,))
-        result = self.cursor.fetchall()
-        return result[0][0] > 0
+        if self.existingTables is None:
+            self.cursor.execute("SELECT table_name FROM information_schema.tables WHERE table_schema=%s;", (self.databaseName,))
+            self.existingTables = set([row[0].lower() for row in self.cursor.fetchall()])
+
+        return tableName.lower() in self.existingTables
     
     # Makes sure all necessary tables exist
     def __initAllTables(self):
         self.__initPlayersTable()
         self.__initChallengesTable()
         self.__initConfigTable()
+        self.__initPlayerStatsTable()
+        self.__initHeadToHeadTable()
+        self.__initTierRecordsTable()
+        self.__initRatingsTable()
+        self.__initRatingChangesTable()
+        self.__initEventsTable()
+        self.__initSnapshotsTable()
+        self.__initIndexes()
+        self.__initArchiveTables()
+
+        self.__loadConfig()
+
+    # Commits the current transaction and bumps the version of the changed ladder (None: all ladders)
+    def __commit(self, ladder):
+        self.database.commit()
+
+        if self.warmState is not None and (ladder is None or ladder == self.warmState.ladder):
+            self.warmState = None
+
+        self.versionCounter += 1
+        if ladder is None:
+            self.configVersion = self.versionCounter
+        else:
+            self.ladderVersions[ladder] = self.versionCounter
+
+    # Returns the version of a ladder. It increases with every change to the ladder or the configuration
+    # and whenever a cooldown or protection in the ladder runs out, so anything computed from the ladder stays valid while it's the same.
+    def getLadderVersion(self, ladder = ''):
+        if ladder == '':
+            ladder = self.getConfig('current_ladder')
+
+        self.__loadTimeouts(ladder)
+        self.__advanceTimeouts()
+
+        return max(self.ladderVersions.get(ladder, 0), self.configVersion)
+
+    # Drops everything cached about the configuration and the ladder after another process changed them, see ladderjobs.py
+    def refresh(self, ladder = ''):
+        # Ends the current transaction, so the following reads see the other process' changes
+        self.database.commit()
+        self.__loadConfig()
+
+        if ladder == '':
+            ladder = self.getConfig('current_ladder')
+
+        self.timeouts.cancelWhere(lambda key: key[0] == ladder)
+        self.timeoutLadders.discard(ladder)
+
+        # Another process changed the ladder, so nobody may read from a replica that doesn't have the changes yet
+        if self.replicas is not None:
+            self.replicas.markWrite(everyone = True)
+
+        self.__commit(None)
+
+    # Returns the current time of the database in its own time zone, for timestamps that are compared with its NOW()
+    def __getDatabaseTime(self):
+        self.cursor.execute("SELECT NOW();")
+        return self.cursor.fetchall()[0][0]
+
+    # Loads the running cooldowns and protections of a ladder into the timer wheel, once per ladder
+    # Always reads from the primary, as the wheel is kept until the next change. The checks of the wheel (e.g. hasChallengeTimeout) don't query at all.
+    # The database computes the remaining seconds itself, so it doesn't matter which time zone its NOW() is in
+    def __loadTimeouts(self, ladder):
+        if ladder in self.timeoutLadders:
+            return
+
+        self.cursor.execute("""SELECT DiscordID, TIMESTAMPDIFF(SECOND, NOW(), OutgoingTimeoutUntil), TIMESTAMPDIFF(SECOND, NOW(), IngoingTimeoutUntil)
+        FROM Players WHERE Ladder=%s AND (OutgoingTimeoutUntil>NOW() OR IngoingTimeoutUntil>NOW());""", (ladder,))
+        result = self.cursor.fetchall()
+        now = time.time()
+
+        for discordID, outgoingSeconds, ingoingSeconds in result:
+            if outgoingSeconds is not None and outgoingSeconds > 0:
+                self.timeouts.schedule((ladder, discordID, 'outgoing'), now + outgoingSeconds)
+            if ingoingSeconds is not None and ingoingSeconds > 0:
+                self.timeouts.schedule((ladder, discordID, 'ingoing'), now + ingoingSeconds)
+
+        self.timeoutLadders.add(ladder)
+
+    # Updates the timer of a cooldown ('outgoing') or protection ('ingoing') that was just set in the database
+    # The timer only runs if the UPDATE found the player. Writing the same deadline twice within a second doesn't change the row,
+    # so this relies on rowcount counting matched rows (CLIENT.FOUND_ROWS).
+    def __setTimeout(self, ladder, discordID, kind, hours):
+        key = (ladder, discordID, kind)
+        # Configured durations are passed as strings
+        hours = float(hours)
+
+        if hours > 0 and self.cursor.rowcount > 0:
+            self.timeouts.schedule(key, time.time() + hours * 3600)
+        else:
+            self.timeouts.cancel(key)
+
+    # Removes the cooldowns and protections of kicked players
+    def __cancelTimeouts(self, ladder, discordID):
+        self.timeouts.cancel((ladder, discordID, 'outgoing'))
+        self.timeouts.cancel((ladder, discordID, 'ingoing'))
+
+    # Runs out all cooldowns and protections that expired and bumps the version of their ladders
+    def __advanceTimeouts(self):
+        expired = self.timeouts.advance(time.time())
+
+        for ladder in set([key[0] for key in expired]):
+            self.versionCounter += 1
+            self.ladderVersions[ladder] = self.versionCounter
+
+        self.expiredTimeouts.extend(expired)
+
+    # Returns (ladder, Discord ID, 'outgoing' or 'ingoing') of every cooldown and protection that ran out since the last call
+    # Only ladders that were used since the bot started are tracked, the given ladder is loaded if it wasn't yet
+    def popExpiredTimeouts(self, ladder = ''):
+        if ladder == '':
+            ladder = self.getConfig('current_ladder')
+
+        self.__loadTimeouts(ladder)
+        self.__advanceTimeouts()
+
+        expired = list(self.expiredTimeouts)
+        self.expiredTimeouts.clear()
+        return expired
+
+    # Secondary indexes the queries rely on, as (table, columns). See ladderexplain.py.
+    requiredIndexes = [
+        ('Players', ('Ladder', 'Rank')),
+        ('Players', ('DiscordID', 'Ladder')),
+        ('Challenges', ('State', 'Time'))
+    ]
+
+    # Adds required indexes that tables created by older versions don't have yet
+    def __initIndexes(self):
+        self.cursor.execute("""SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME FROM information_schema.statistics
+        WHERE table_schema=%s ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX;""", (self.databaseName,))
+
+        indexColumns = {}
+        for tableName, indexName, columnName in self.cursor.fetchall():
+            indexColumns.setdefault((tableName.lower(), indexName), []).append(columnName.lower())
+
+        existingIndexes = set([(tableName, tuple(columns)) for (tableName, _), columns in indexColumns.items()])
+
+        for tableName, columns in LadderDatabase.requiredIndexes:
+            if (tableName.lower(), tuple([column.lower() for column in columns])) not in existingIndexes:
+                self.cursor.execute(f"ALTER TABLE {tableName} ADD KEY ({', '.join(columns)});")
+                print(f"Added index ({', '.join(columns)}) to table \"{tableName}\".")
 
     # Deletes all tables - for debugging only!
     def __dropAllTables(self):
-        tableList = ['Players', 'Challenges', 'Config']
+        tableList = ['Players', 'Challenges', 'Config', 'PlayerStats', 'HeadToHead', 'TierRecords', 'Ratings', 'RatingChanges', 'Events', 'Snapshots'] + [f"{tableName}Archive" for tableName in LadderDatabase.archivedTables]
 
         for tableName in tableList:
             self.cursor.execute(f"DROP TABLE {tableName};")
@@ -67,59 +304,134 @@ class LadderDatabase:
                 OutgoingTimeoutUntil DATETIME,
                 IngoingTimeoutUntil DATETIME,
                 LastOpponent BIGINT,
-                PRIMARY KEY (PlayerID)
+                PRIMARY KEY (PlayerID),
+                KEY (Ladder, Rank),
+                KEY (DiscordID, Ladder)
             );""")
 
             print('Created table "Players".')
 
     # Adds new player signup
     def addPlayer(self, discordID, ladder = ''):
+        self.addPlayers([discordID], ladder)
+
+    # Adds several signups at once in a single transaction and returns the Discord IDs of the players that were added
+    # The lowest rank is locked while the new ranks are allocated, so concurrent signups can't get the same rank
+    @readWrite
+    def addPlayers(self, discordIDs, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
 
-        lowestRank = self.getLowestRank(ladder)
-        newPlayerRank = lowestRank + 1
-        newPlayerTier = self.convertToTier(newPlayerRank)
+        if len(discordIDs) == 0:
+            return []
 
-        self.cursor.execute("INSERT INTO Players (DiscordID, Ladder, Tier, Rank, OutgoingTimeoutUntil, IngoingTimeoutUntil) VALUES (%s, %s, %s, %s, NOW(), NOW());", 
-        (discordID, ladder, newPlayerTier, newPlayerRank))
-        self.database.commit()
+        self.cursor.execute("SELECT MAX(Rank) FROM Players WHERE Ladder=%s FOR UPDATE;", (ladder,))
+        lowestRank = self.cursor.fetchall()[0][0]
+        if lowestRank is None:
+            lowestRank = 0
+
+        # Skips players that are already signed up or were queued twice
+        idPlaceholders = ', '.join(['%s'] * len(discordIDs))
+        self.cursor.execute(f"SELECT DiscordID FROM Players WHERE Ladder=%s AND DiscordID IN ({idPlaceholders});", (ladder, *discordIDs,))
+        signedUpIDs = set([row[0] for row in self.cursor.fetchall()])
+
+        newPlayerIDs = []
+        for discordID in discordIDs:
+            if discordID not in signedUpIDs and discordID not in newPlayerIDs:
+                newPlayerIDs += [discordID]
+
+        if len(newPlayerIDs) == 0:
+            self.__commit(ladder)
+            return []
+
+        tierIndex = self.getTierIndex(ladder, lowestRank + len(newPlayerIDs))
+        now = self.__getDatabaseTime()
+        rows = []
+
+        for i, discordID in enumerate(newPlayerIDs):
+            newPlayerRank = lowestRank + i + 1
+            rows += [(discordID, ladder, tierIndex.getTier(newPlayerRank), newPlayerRank, now, now)]
+
+        # Sent as one multi-row insert, which mysqlclient only does if all values are placeholders
+        self.cursor.executemany("INSERT INTO Players (DiscordID, Ladder, Tier, Rank, OutgoingTimeoutUntil, IngoingTimeoutUntil) VALUES (%s, %s, %s, %s, %s, %s);", rows)
+
+        # Tiers that depend on the ladder size can move for existing players
+        previousTierIndex = self.getTierIndex(ladder, lowestRank)
+        self.__updateTiers(ladder, previousTierIndex.getChangedRanks(tierIndex), tierIndex)
+
+        self.cursor.execute("SELECT PlayerID, DiscordID, Rank FROM Players WHERE Ladder=%s AND Rank>%s ORDER BY Rank;", (ladder, lowestRank,))
+        for playerID, discordID, rank in self.cursor.fetchall():
+            self.__logEvent(ladder, 'signup', {'playerID': playerID, 'discordID': discordID, 'rank': rank})
+
+        self.__commit(ladder)
+        return newPlayerIDs
 
     # Deletes player
     def kickPlayer(self, discordID, ladder = ''):
+        self.kickPlayers([discordID], ladder)
+
+    # Deletes several players at once in a single transaction
+    # Cancels their active challenges and closes all gaps in the ranking in one pass
+    @readWrite
+    def kickPlayers(self, discordIDs, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
 
-        # Gets current rank of the kicked player
-        self.cursor.execute("SELECT Rank FROM Players WHERE DiscordID=%s AND Ladder=%s;", (discordID, ladder,))
-        result = self.cursor.fetchall()
-        rank = result[0][0]
+        if len(discordIDs) == 0:
+            return
 
-        if rank is not None and rank > 0:
-            # Gets ID&rank of all players that are below the kicked player in the ladder
-            self.cursor.execute("SELECT PlayerID, Rank FROM Players WHERE Rank>%s", (rank,))
-            result = self.cursor.fetchall()
+        idPlaceholders = ', '.join(['%s'] * len(discordIDs))
 
-            for row in result:
-                playerID = row[0]
-                if playerID is None:
-                    break
+        # Gets current rank of the kicked players
+        self.cursor.execute(f"SELECT Rank, PlayerID, DiscordID FROM Players WHERE Ladder=%s AND DiscordID IN ({idPlaceholders});", (ladder, *discordIDs,))
+        kickedPlayers = self.cursor.fetchall()
 
-                # Moves the player up by one rank
-                updatedRank = row[1] - 1
-                updatedTier = self.convertToTier(updatedRank)
-                self.cursor.execute("UPDATE Players SET Rank=%s, Tier=%s WHERE PlayerID=%s", (updatedRank, updatedTier, playerID,))
+        if len(kickedPlayers) == 0:
+            return
 
-        # Removes the kicked player from the ladder
-        self.cursor.execute("DELETE FROM Players WHERE DiscordID=%s AND Ladder=%s;", (discordID, ladder,))
-        self.database.commit()
+        # Cancels active challenges: Cancelled if the kicked player challenged, denied if they got challenged
+        self.cursor.execute(f"""UPDATE Challenges c
+        JOIN Players p1 ON c.IssuedByID=p1.PlayerID
+        JOIN Players p2 ON c.OpponentID=p2.PlayerID
+        SET c.State=IF(p1.DiscordID IN ({idPlaceholders}), 'cancelled', 'denied')
+        WHERE c.State='pending' AND p1.Ladder=%s AND p2.Ladder=%s AND (p1.DiscordID IN ({idPlaceholders}) OR p2.DiscordID IN ({idPlaceholders}));""",
+        (*discordIDs, ladder, ladder, *discordIDs, *discordIDs,))
+
+        lowestRank = self.getLowestRank(ladder)
+        kickedRanks = sorted([row[0] for row in kickedPlayers if row[0] is not None and row[0] > 0])
+
+        # Removes the kicked players from the ladder
+        self.cursor.execute(f"DELETE FROM Players WHERE Ladder=%s AND DiscordID IN ({idPlaceholders});", (ladder, *discordIDs,))
+
+        if len(kickedRanks) > 0:
+            # Moves the players between two gaps up by the number of kicked players above them
+            for i, kickedRank in enumerate(kickedRanks):
+                nextKickedRank = kickedRanks[i + 1] if i + 1 < len(kickedRanks) else lowestRank + 1
+                if nextKickedRank > kickedRank + 1:
+                    self.cursor.execute("UPDATE Players SET Rank=Rank-%s WHERE Ladder=%s AND Rank>%s AND Rank<%s;", (i + 1, ladder, kickedRank, nextKickedRank,))
+
+            # Only updates the tier of players that moved across a tier boundary
+            previousTierIndex = self.getTierIndex(ladder, lowestRank)
+            tierIndex = self.getTierIndex(ladder, lowestRank - len(kickedRanks))
+            self.__updateTiers(ladder, previousTierIndex.getChangedRanks(tierIndex, kickedRanks), tierIndex)
 
+        for rank, kickedPlayerID, discordID in kickedPlayers:
+            # Kicked players lose their record, so their statistics are reset as well
+            self.__deletePlayerStatistics(discordID, ladder)
+            self.cursor.execute("DELETE FROM Ratings WHERE PlayerID=%s;", (kickedPlayerID,))
+
+            self.__cancelTimeouts(ladder, discordID)
+            self.__logEvent(ladder, 'kick', {'playerID': kickedPlayerID})
+
+        self.__commit(ladder)
+
+    @readOnly
     def getPlayerByRank(self, rank, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
 
-        self.cursor.execute("SELECT PlayerID, DiscordID, Tier, Wins, Losses, Titles, LastOpponent FROM Players WHERE Rank=%s AND Ladder=%s;", (rank, ladder,))
-        result = self.cursor.fetchall()
+        self.readCursor.execute("SELECT PlayerID, DiscordID, Tier, Wins, Losses, Titles, LastOpponent FROM Players WHERE Rank=%s AND Ladder=%s;", (rank, ladder,))
+        result = self.readCursor.fetchall()
 
         if len(result) == 0 or result[0][0] is None:
             return None
@@ -128,25 +440,81 @@ class LadderDatabase:
             return PlayerInfo(row[0], row[1], rank, row[2], row[3], row[4], row[5], row[6])
 
     # Checks if player is signed up for the ladder
+    @readOnly
     def isPlayerSignedUp(self, discordID, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
 
-        self.cursor.execute("SELECT COUNT(PlayerID) FROM Players WHERE DiscordID=%s AND Ladder=%s;", (discordID, ladder,))
-        result = self.cursor.fetchall()
+        self.readCursor.execute("SELECT COUNT(PlayerID) FROM Players WHERE DiscordID=%s AND Ladder=%s;", (discordID, ladder,))
+        result = self.readCursor.fetchall()
         return result[0][0] > 0
 
+    # Returns the Discord IDs of all players of the ladder as set
+    # Always reads from the primary, a lagging replica would make ladderroles.py take the role from players who just signed up
+    def getRosterDiscordIDs(self, ladder = ''):
+        if ladder == '':
+            ladder = self.getConfig('current_ladder')
+
+        self.cursor.execute("SELECT DiscordID FROM Players WHERE Ladder=%s;", (ladder,))
+        return set([row[0] for row in self.cursor.fetchall()])
+
     # Calculates which tier a rank is
-    def convertToTier(self, rank):
-        return round(math.sqrt(2*rank - 1))
+    def convertToTier(self, rank, ladder = ''):
+        return self.getTierIndex(ladder).getTier(rank)
+
+    # Returns the precomputed tier table of the ladder with its current or the given number of players
+    def getTierIndex(self, ladder = '', playerCount = None):
+        if ladder == '':
+            ladder = self.getConfig('current_ladder')
+
+        if playerCount is None:
+            playerCount = self.getLowestRank(ladder)
+
+        layoutText = self.getConfig('tier_layout')
+        key = (layoutText, playerCount)
+
+        if key not in self.tierIndices:
+            # Keeps the cache small, only the last few ladder sizes are ever needed
+            if len(self.tierIndices) > 16:
+                self.tierIndices.clear()
+
+            self.tierIndices[key] = laddertiers.TierIndex(laddertiers.parseTierLayout(layoutText), playerCount)
+
+        return self.tierIndices[key]
+
+    # Sets the tier of the players at the given ranks according to the tier table, doesn't commit
+    def __updateTiers(self, ladder, ranks, tierIndex):
+        if len(ranks) == 0:
+            return
+
+        self.cursor.executemany("UPDATE Players SET Tier=%s WHERE Ladder=%s AND Rank=%s;", [(tierIndex.getTier(rank), ladder, rank) for rank in ranks])
+
+    # Recalculates the tiers of all players, used after the tier layout was changed
+    @readWrite
+    def updateAllTiers(self, ladder = ''):
+        if ladder == '':
+            ladder = self.getConfig('current_ladder')
+
+        self.__updateAllTiers(ladder)
+        self.__commit(ladder)
+
+    # Sets the tier of every player whose stored tier doesn't match the tier table, doesn't commit
+    def __updateAllTiers(self, ladder):
+        tierIndex = self.getTierIndex(ladder)
+
+        self.cursor.execute("SELECT Rank, Tier FROM Players WHERE Ladder=%s;", (ladder,))
+        changedRanks = [row[0] for row in self.cursor.fetchall() if not row[1] == tierIndex.getTier(row[0])]
+
+        self.__updateTiers(ladder, changedRanks, tierIndex)
 
     # Gets the current lowest rank in the ladder
+    @readOnly
     def getLowestRank(self, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
 
-        self.cursor.execute("SELECT MAX(Rank) FROM Players WHERE Ladder=%s;", (ladder,))
-        result = self.cursor.fetchall()
+        self.readCursor.execute("SELECT MAX(Rank) FROM Players WHERE Ladder=%s;", (ladder,))
+        result = self.readCursor.fetchall()
 
         lowestRank = result[0][0]
         if lowestRank is None:
@@ -159,32 +527,16 @@ class LadderDatabase:
         if ladder == '':
             ladder = self.getConfig('current_ladder')
 
-        self.cursor.execute("SELECT OutgoingTimeoutUntil FROM Players WHERE DiscordID=%s AND Ladder=%s;", (discordID, ladder,))
-        result = self.cursor.fetchall()
-
-        if result[0][0] is None:
-            return False
-
-        timeoutEnd = result[0][0]
-        currentTime = datetime.datetime.now()
-
-        return timeoutEnd > currentTime
+        self.__loadTimeouts(ladder)
+        return self.timeouts.isRunning((ladder, discordID, 'outgoing'), time.time())
 
     # Returns true if the user is currently protected from challenges
     def hasChallengeProtection(self, discordID, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
 
-        self.cursor.execute("SELECT IngoingTimeoutUntil FROM Players WHERE DiscordID=%s AND Ladder=%s;", (discordID, ladder,))
-        result = self.cursor.fetchall()
-
-        if result[0][0] is None:
-            return False
-
-        timeoutEnd = result[0][0]
-        currentTime = datetime.datetime.now()
-
-        return timeoutEnd > currentTime
+        self.__loadTimeouts(ladder)
+        return self.timeouts.isRunning((ladder, discordID, 'ingoing'), time.time())
 
     # Returns if Player 1 is allowed to challenge Player 2
     def canChallengeBasedOnRank(self, discordID1, discordID2, ladder = ''):
@@ -194,38 +546,16 @@ class LadderDatabase:
         challengerInfo = self.getPlayerInfo(discordID1, ladder)
         opponentInfo = self.getPlayerInfo(discordID2, ladder)
 
-        # The #1 player can only challenge tier 2
-        if challengerInfo.rank == 1:
-            return opponentInfo.tier == 2 or opponentInfo.tier ==3
-
-        # Others can challenge all players below them
-        if challengerInfo.rank < opponentInfo.rank:
-            return True
-
-        # You can always challenge people in your own tier
-        if challengerInfo.tier == opponentInfo.tier:
-            return True
-
-        # You can't challenge players more than one tier above you
-        if challengerInfo.tier > opponentInfo.tier + 1:
-            return False
-        
-        # You can challenge player more 3 or less ranks above you
         rankRange = int(self.getConfig('rank_range'))
-        if challengerInfo.rank <= opponentInfo.rank + rankRange:
-            return True
-
-        # In all other cases, you can challenge!
-        return True
+        return ladderrules.canChallengeBasedOnRank(challengerInfo.rank, challengerInfo.tier, opponentInfo.rank, opponentInfo.tier, rankRange)
 
     # Returns a list of all higher ranked players that a player could challenge
+    @readOnly
     def getPossibleChallenges(self, discordID, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
 
-        challenges = []
-        playerInfo = self.getPlayerInfo(discordID)
-        result = {}
+        playerInfo = self.getPlayerInfo(discordID, ladder)
 
         rankRange = int(self.getConfig('rank_range'))
         lastOpponentValue = playerInfo.lastOpponent
@@ -233,29 +563,19 @@ class LadderDatabase:
         if playerInfo.lastOpponent is None:
             lastOpponentValue = 0
 
-        # Selects all players above the given player's rank that could be challenged
-        if playerInfo.rank == 1:
-            self.cursor.execute("SELECT DiscordID FROM Players WHERE Ladder=%s AND IngoingTimeoutUntil<NOW() AND NOT PlayerID=%s AND (Tier=2 OR Tier=3);",
-            (ladder, lastOpponentValue,))
-        else:
-            self.cursor.execute("""SELECT DiscordID FROM Players WHERE Ladder=%s AND IngoingTimeoutUntil<NOW() AND NOT PlayerID=%s AND NOT DiscordID=%s 
-            AND Rank<%s AND (Tier=%s OR (Tier=%s AND Rank>=%s));""",
-            (ladder, lastOpponentValue, playerInfo.discordID, playerInfo.rank, playerInfo.tier, playerInfo.tier-1, playerInfo.rank-rankRange))
-
-        result = self.cursor.fetchall()
+        # Looks up the ranks of all players above the given player's rank that could be challenged (see ladderrules.isPossibleChallenge)
+        challengeableRanks = self.getTierIndex(ladder).getChallengeableRanks(playerInfo.rank, rankRange)
 
-        if len(result) == 0 or result[0][0] is None:
+        if challengeableRanks is None:
             return []
 
-        # Filters out all challengers that are already in a match
-        for row in result:
-            playerDiscordID = row[0]
-            activeChallenge = self.getActiveChallenge(playerDiscordID, ladder)
+        # Players that are already in a match are filtered out in the same query, so the answer comes from a single snapshot
+        self.readCursor.execute("""SELECT p.DiscordID FROM Players p WHERE p.Ladder=%s AND p.IngoingTimeoutUntil<NOW() AND NOT p.PlayerID=%s AND NOT p.DiscordID=%s
+        AND p.Rank BETWEEN %s AND %s
+        AND NOT EXISTS (SELECT 1 FROM Challenges c WHERE c.State='pending' AND (c.IssuedByID=p.PlayerID OR c.OpponentID=p.PlayerID));""",
+        (ladder, lastOpponentValue, playerInfo.discordID, challengeableRanks[0], challengeableRanks[1]))
 
-            if activeChallenge is None:
-                challenges += [playerDiscordID]
-        
-        return challenges
+        return [row[0] for row in self.readCursor.fetchall() if row[0] is not None]
 
 
     # Deprecated
@@ -285,29 +605,83 @@ class LadderDatabase:
         else:
             return tier1 == tier2 + 1
 
-    # Gets if a user has timeouts and if so, which
+    # Returns every challenge that could be issued right now as (challenger Discord ID, opponent Discord ID), ordered by the challenger's rank
+    # Same conditions as the challenge command for the challenges listed by getPossibleChallenges, evaluated for all players at once
+    def getOpenMatchups(self, ladder = ''):
+        matchups, discordIDs, lastOpponentRanks = self.getOpenMatchupRanks(ladder)
+        return [(discordIDs[challengerRank - 1], discordIDs[opponentRank - 1]) for challengerRank, opponentRank in matchups]
+
+    # Returns the open matchups as (challenger rank, opponent rank), the Discord IDs of all players by rank - 1
+    # and the rank of every player's last opponent by rank - 1 (0 if there is none)
+    @readOnly
+    def getOpenMatchupRanks(self, ladder = ''):
+        if ladder == '':
+            ladder = self.getConfig('current_ladder')
+
+        self.readCursor.execute("SELECT PlayerID, DiscordID, Rank, LastOpponent FROM Players WHERE Ladder=%s ORDER BY Rank;", (ladder,))
+        players = self.readCursor.fetchall()
+        playerCount = len(players)
+
+        self.readCursor.execute("""SELECT c.IssuedByID, c.OpponentID FROM Challenges c
+        JOIN Players p ON c.IssuedByID=p.PlayerID
+        WHERE c.State='pending' AND p.Ladder=%s;""", (ladder,))
+        challengedPlayerIDs = set([playerID for row in self.readCursor.fetchall() for playerID in row])
+
+        rankRange = int(self.getConfig('rank_range'))
+        key = (self.getConfig('tier_layout'), playerCount, rankRange)
+
+        if key not in self.eligibilityMatrices:
+            # Keeps the cache small, only the last few ladder sizes are ever needed
+            if len(self.eligibilityMatrices) > 4:
+                self.eligibilityMatrices.clear()
+
+            self.eligibilityMatrices[key] = laddereligibility.EligibilityMatrix(self.getTierIndex(ladder, playerCount), rankRange)
+
+        # Per player conditions by rank - 1, timeouts come from the timer wheel
+        self.__loadTimeouts(ladder)
+        currentTime = time.time()
+
+        ranks = dict([(row[0], row[2]) for row in players])
+        discordIDs = [0] * playerCount
+        canChallenge = [False] * playerCount
+        canBeChallenged = [False] * playerCount
+        lastOpponentRanks = [0] * playerCount
+
+        for playerID, discordID, rank, lastOpponent in players:
+            # Ranks with gaps or duplicates are left out, see checkIntegrity
+            if rank is None or rank < 1 or rank > playerCount:
+                continue
+
+            discordIDs[rank - 1] = discordID
+            isFree = playerID not in challengedPlayerIDs
+            canChallenge[rank - 1] = isFree and not self.timeouts.isRunning((ladder, discordID, 'outgoing'), currentTime)
+            canBeChallenged[rank - 1] = isFree and not self.timeouts.isRunning((ladder, discordID, 'ingoing'), currentTime)
+            lastOpponentRanks[rank - 1] = ranks.get(lastOpponent, 0) or 0
+
+        matchups = self.eligibilityMatrices[key].getOpenMatchups(canChallenge, canBeChallenged, lastOpponentRanks)
+        return matchups, discordIDs, lastOpponentRanks
+
+    # Gets if a user has timeouts and if so, which. The ends of the timeouts are given in UTC.
     def getTimeoutInfo(self, discordID, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
 
-        self.cursor.execute("SELECT OutgoingTimeoutUntil, IngoingTimeoutUntil FROM Players WHERE DiscordID=%s AND Ladder=%s;", (discordID, ladder,))
-        result = self.cursor.fetchall()
+        self.__loadTimeouts(ladder)
+        currentTime = time.time()
+        timeoutEnds = []
 
-        if len(result) == 0:
-            return None
-        else:
-            outgoingTimeout = result[0][0]
-            incomingTimeout = result[0][1]
-            currentTime = datetime.datetime.now()
+        for kind in ['outgoing', 'ingoing']:
+            key = (ladder, discordID, kind)
 
-            if outgoingTimeout is not None and outgoingTimeout < currentTime:
-                outgoingTimeout = None
-            if incomingTimeout is not None and incomingTimeout < currentTime:
-                incomingTimeout = None
+            if self.timeouts.isRunning(key, currentTime):
+                timeoutEnds += [datetime.datetime.fromtimestamp(self.timeouts.getExpiry(key), datetime.timezone.utc)]
+            else:
+                timeoutEnds += [None]
 
-            return TimeoutInfo(outgoingTimeout, incomingTimeout)
+        return TimeoutInfo(timeoutEnds[0], timeoutEnds[1])
 
     # Increments the number of cancellations a player used
+    @readWrite
     def updateCancelCounter(self, discordID, change: int, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
@@ -327,17 +701,18 @@ class LadderDatabase:
             playerID = result[0][1]
 
             self.cursor.execute("""UPDATE Players SET Cancellations=%s WHERE PlayerID=%s;""", (cancellations, playerID,))
-            self.database.commit()
+            self.__commit(ladder)
 
         return cancellations
 
     # Returns rank and signup information of the player with the given discord id
+    @readOnly
     def getPlayerInfo(self, discordID, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
 
-        self.cursor.execute("SELECT PlayerID, Rank, Tier, Wins, Losses, Titles, LastOpponent FROM Players WHERE DiscordID=%s AND Ladder=%s;", (discordID, ladder,))
-        result = self.cursor.fetchall()
+        self.readCursor.execute("SELECT PlayerID, Rank, Tier, Wins, Losses, Titles, LastOpponent FROM Players WHERE DiscordID=%s AND Ladder=%s;", (discordID, ladder,))
+        result = self.readCursor.fetchall()
 
         if len(result) == 0 or result[0][0] is None:
             return None
@@ -346,36 +721,49 @@ class LadderDatabase:
             return PlayerInfo(row[0], discordID, row[1], row[2], row[3], row[4], row[5], row[6])
 
     # Prohibits the given player from issueing challenges for the given number of days
+    @readWrite
     def giveChallengeCooldown(self, discordID, hours, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
 
-        self.cursor.execute("UPDATE Players SET OutgoingTimeoutUntil=(NOW() + INTERVAL %s HOUR) WHERE DiscordID=%s AND Ladder=%s;", (hours, discordID, ladder,))
-        self.database.commit()
+        # Configured durations are passed as strings and may be fractional, MySQL would round an INTERVAL in hours
+        hours = float(hours)
+
+        self.cursor.execute("UPDATE Players SET OutgoingTimeoutUntil=(NOW() + INTERVAL %s SECOND) WHERE DiscordID=%s AND Ladder=%s;", (round(hours * 3600), discordID, ladder,))
+        self.__setTimeout(ladder, discordID, 'outgoing', hours)
+
+        self.__logEvent(ladder, 'timeout', {'discordID': discordID, 'outgoingHours': hours})
+        self.__commit(ladder)
 
     # Protects the given player from being challenged for the given number of days
+    @readWrite
     def giveChallengeProtection(self, discordID, hours, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
 
-        self.cursor.execute("UPDATE Players SET IngoingTimeoutUntil=(NOW() + INTERVAL %s HOUR) WHERE DiscordID=%s AND Ladder=%s;", (hours, discordID, ladder,))
-        self.database.commit()
+        # Configured durations are passed as strings and may be fractional, MySQL would round an INTERVAL in hours
+        hours = float(hours)
+
+        self.cursor.execute("UPDATE Players SET IngoingTimeoutUntil=(NOW() + INTERVAL %s SECOND) WHERE DiscordID=%s AND Ladder=%s;", (round(hours * 3600), discordID, ladder,))
+        self.__setTimeout(ladder, discordID, 'ingoing', hours)
 
+        self.__logEvent(ladder, 'timeout', {'discordID': discordID, 'ingoingHours': hours})
+        self.__commit(ladder)
+
+    # Returns the ranking of the top 100 players as RankingSnapshot
+    @readOnly
     def getRanking(self, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
 
-        self.cursor.execute("SELECT PlayerID, DiscordID, Rank, Tier, Wins, Losses, Titles, LastOpponent FROM Players WHERE Ladder=%s ORDER BY Rank LIMIT 100;", (ladder,))
-        result = self.cursor.fetchall()
-
-        players = []
+        if self.__isWarm(ladder):
+            return self.warmState.ranking
 
-        for row in result:
-            players += [PlayerInfo(row[0], row[1], row[2], row[3], row[4], row[5], row[6], row[7])]
-        
-        return players
+        self.readCursor.execute("SELECT PlayerID, DiscordID, Rank, Tier, Wins, Losses, Titles, LastOpponent FROM Players WHERE Ladder=%s ORDER BY Rank LIMIT 100;", (ladder,))
+        return RankingSnapshot(self.readCursor.fetchall())
 
     # Randomly shuffles all ladder participants so that ranks are random
+    @readWrite
     def shuffleLadder(self, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
@@ -385,19 +773,51 @@ class LadderDatabase:
         result = self.cursor.fetchall()
 
         # Assigns new rank to every player
+        tierIndex = self.getTierIndex(ladder, len(result))
         rank = 1
         tier = 1
+        order = []
         for row in result:
             if row[0] is None:
                 break
             
             playerID = row[0]
-            tier = self.convertToTier(rank)
+            tier = tierIndex.getTier(rank)
             self.cursor.execute("UPDATE Players SET Rank=%s, Tier=%s WHERE PlayerID=%s;", (rank, tier, playerID,))
 
+            order += [playerID]
             rank += 1
 
-        self.database.commit()
+        self.__logEvent(ladder, 'shuffle', {'order': order})
+        self.__commit(ladder)
+
+    # Checks that the ranking is consistent and returns a description of every violation
+    # Ranks must be 1 to n without gaps or duplicates, tiers must match the tier layout and nobody can be in two pending challenges
+    def checkIntegrity(self, ladder = ''):
+        if ladder == '':
+            ladder = self.getConfig('current_ladder')
+
+        violations = []
+
+        self.cursor.execute("SELECT DiscordID, Rank, Tier FROM Players WHERE Ladder=%s ORDER BY Rank;", (ladder,))
+        players = self.cursor.fetchall()
+        tierIndex = self.getTierIndex(ladder, len(players))
+
+        for expectedRank, (discordID, rank, tier) in enumerate(players, start = 1):
+            if not rank == expectedRank:
+                violations += [f"Player {discordID} has rank {rank} instead of {expectedRank}"]
+            elif not tier == tierIndex.getTier(rank):
+                violations += [f"Player {discordID} with rank {rank} is in tier {tier} instead of {tierIndex.getTier(rank)}"]
+
+        self.cursor.execute("""SELECT p.DiscordID, COUNT(*) FROM Challenges c
+        JOIN Players p ON c.IssuedByID=p.PlayerID OR c.OpponentID=p.PlayerID
+        WHERE c.State='pending' AND p.Ladder=%s
+        GROUP BY p.DiscordID HAVING COUNT(*)>1;""", (ladder,))
+
+        for discordID, challengeCount in self.cursor.fetchall():
+            violations += [f"Player {discordID} is in {challengeCount} pending challenges"]
+
+        return violations
 
 
 ##### CHALLENGES #####
@@ -419,11 +839,13 @@ class LadderDatabase:
                 Time DATETIME DEFAULT NOW(),
                 State ENUM('pending', 'played', 'denied', 'cancelled', 'timeout') DEFAULT 'pending',
                 Won TINYINT,
-                PRIMARY KEY (ChallengeID)
+                PRIMARY KEY (ChallengeID),
+                KEY (State, Time)
             );""")
 
             print('Created table "Challenges".')
 
+    @readWrite
     def addChallenge(self, issuedByDiscordID, opponentDiscordID, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
@@ -436,21 +858,22 @@ class LadderDatabase:
         (NOW() + INTERVAL %s HOUR));""",
         (issuedByDiscordID, ladder, opponentDiscordID, ladder, challengeTimeout,))
 
-        self.database.commit()
+        self.__commit(ladder)
 
     # Returns the Discord ID of the member the player with the given Discord ID played against last
+    @readOnly
     def getLastPlayedChallenge(self, discordID, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
 
         # Gets the Discord ID of the player who was challenged last
-        self.cursor.execute("""SELECT c.ChallengeID, p1.DiscordID, p2.DiscordID, c.Time, c.Won FROM Challenges c 
+        self.readCursor.execute("""SELECT c.ChallengeID, p1.DiscordID, p2.DiscordID, c.Time, c.Won FROM Challenges c 
         JOIN Players p1 ON c.IssuedByID=p1.PlayerID 
         JOIN Players p2 ON c.OpponentID=p2.PlayerID 
         WHERE (p1.DiscordID=%s OR p2.DiscordID=%s) AND p1.Ladder=%s AND p2.Ladder=%s AND c.State='played' 
         ORDER BY c.Time DESC 
         LIMIT 1;""",  (discordID, discordID, ladder, ladder,))
-        result = self.cursor.fetchall()
+        result = self.readCursor.fetchall()
 
         if len(result) == 0 or result[0][0] is None or result[0][1] is None:
             return None
@@ -459,17 +882,21 @@ class LadderDatabase:
             return ChallengeInfo(row[0], row[1], row[2], row[3], row[4])
 
     # Return information about the currently active challenge of the given player
+    @readOnly
     def getActiveChallenge(self, discordID, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
 
-        self.cursor.execute("""SELECT c.ChallengeID, p1.DiscordID, p2.DiscordID, c.Time FROM Challenges c
+        if self.__isWarm(ladder):
+            return self.warmState.activeChallenges.get(discordID)
+
+        self.readCursor.execute("""SELECT c.ChallengeID, p1.DiscordID, p2.DiscordID, c.Time FROM Challenges c
         JOIN Players p1 ON c.IssuedByID=p1.PlayerID 
         JOIN Players p2 ON c.OpponentID=p2.PlayerID 
         WHERE (p1.DiscordID=%s OR p2.DiscordID=%s) AND p1.Ladder=%s AND p2.Ladder=%s AND c.State='pending'
         ORDER BY c.Time DESC
         LIMIT 1;""", (discordID, discordID, ladder, ladder,))
-        result = self.cursor.fetchall()
+        result = self.readCursor.fetchall()
 
         if len(result) == 0 or result[0][0] is None:
             return None
@@ -482,6 +909,7 @@ class LadderDatabase:
             )
 
     # Cancels the current active challenge of the given player
+    @readWrite
     def cancelActiveChallenge(self, discordID, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
@@ -506,9 +934,10 @@ class LadderDatabase:
             else:
                 self.cursor.execute("UPDATE Challenges SET State='denied' WHERE ChallengeID=%s;", (challengeID,))
 
-            self.database.commit()
+            self.__commit(ladder)
 
     # Updates the database record of a challenge with the result and both players' rank, tier, wins and losses
+    @readWrite
     def reportResult(self, challengeInfo, won, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
@@ -522,12 +951,16 @@ class LadderDatabase:
         challengerInfo = self.getPlayerInfo(challengeInfo.challenger)
         opponentInfo = self.getPlayerInfo(challengeInfo.opponent)
 
+        # Remembers the tiers the game was played in for the per-tier records
+        challengerTier = challengerInfo.tier
+        opponentTier = opponentInfo.tier
+
         # Updates Win/Loss/Titles and switches rank&tier if the winner is lower ranked
         if won:
             challengerInfo.wins += 1
             opponentInfo.losses += 1
 
-            if challengerInfo.rank > opponentInfo.rank:
+            if ladderrules.shouldSwapRanks(challengerInfo.rank, opponentInfo.rank, won):
                 newRank = opponentInfo.rank
                 newTier = opponentInfo.tier
 
@@ -543,7 +976,7 @@ class LadderDatabase:
             challengerInfo.losses += 1
             opponentInfo.wins += 1
                 
-            if opponentInfo.rank > challengerInfo.rank:
+            if ladderrules.shouldSwapRanks(challengerInfo.rank, opponentInfo.rank, won):
                 newRank = opponentInfo.rank
                 newTier = opponentInfo.tier
 
@@ -563,10 +996,24 @@ class LadderDatabase:
         self.cursor.execute("UPDATE Players SET Rank=%s, Tier=%s, Wins=%s, Losses=%s, Titles=%s, LastOpponent=%s WHERE PlayerID=%s;", 
         (opponentInfo.rank, opponentInfo.tier, opponentInfo.wins, opponentInfo.losses, opponentInfo.titles, challengerInfo.playerID, opponentInfo.playerID,))
 
-        self.database.commit()
+        # Updates streaks, head-to-head and per-tier records of both players
+        challengerStats = self.__recordStatistics(challengeInfo.challenger, challengeInfo.opponent, challengerTier, won, ladder)
+        opponentStats = self.__recordStatistics(challengeInfo.opponent, challengeInfo.challenger, opponentTier, not won, ladder)
+
+        # Updates the rating of both players
+        self.__recordRatingChange(challengeInfo.challengeID, challengerInfo.playerID, opponentInfo.playerID, won)
+
+        # The streaks and form from before the game are logged, so a dispute can restore them without reading the players' history
+        self.__logEvent(ladder, 'report', {'challenger': challengerInfo.playerID, 'opponent': opponentInfo.playerID, 'won': bool(won),
+        'challengerStats': challengerStats.toList(), 'opponentStats': opponentStats.toList()}, challengeInfo.challengeID)
+
+        self.__commit(ladder)
 
 
     # Undos the latest result report for the given player
+    # If the report is in the event log, the ladder is replayed without it, which is exact even if other games happened since.
+    # Otherwise the effects of the game are reversed by switching the current ranks of both players back.
+    @readWrite
     def reverseReport(self, discordID, challengeInfo, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
@@ -574,44 +1021,69 @@ class LadderDatabase:
         # Updates entry for the challenge in the database
         self.cursor.execute("UPDATE Challenges SET State='pending', Won=NULL WHERE ChallengeID=%s;", (challengeInfo.challengeID,))
 
+        if challengeInfo.won is not None:
+            challengerWon = challengeInfo.won == 1
+
+            # Has to be read before the report is marked as reverted
+            reportEvent = self.__getReportEvent(challengeInfo.challengeID, ladder)
+
+            # Reverses changes to the win/loss/titles and ranks and gets the tiers both players played the game in
+            gameTiers = self.__revertReportEvent(challengeInfo.challengeID, ladder)
+
+            if gameTiers is None:
+                gameTiers = self.__reverseReportBySwapping(challengeInfo)
+
+            # Takes the game out of the statistics of both players
+            self.__removeStatistics(challengeInfo.challenger, challengeInfo.opponent, gameTiers[0], challengerWon, ladder, reportEvent, 'challenger')
+            self.__removeStatistics(challengeInfo.opponent, challengeInfo.challenger, gameTiers[1], not challengerWon, ladder, reportEvent, 'opponent')
+
+            # Gives both players back the rating they won or lost in the game
+            self.__removeRatingChange(challengeInfo.challengeID)
+
+            self.__logEvent(ladder, 'dispute', {'challengeID': challengeInfo.challengeID}, challengeInfo.challengeID)
+
+        self.__commit(ladder)
+
+    # Reverses a report by switching the current ranks of both players, doesn't commit
+    # This is not accurate if either player played other games since. Returns the tiers of both players after the switch.
+    def __reverseReportBySwapping(self, challengeInfo):
         challengerInfo = self.getPlayerInfo(challengeInfo.challenger)
         opponentInfo = self.getPlayerInfo(challengeInfo.opponent)
 
-        # Reverses changes to the win/loss/titles and switches the rank/tiers
-        if challengeInfo.won is not None:
-            if challengeInfo.won == 1:
-                challengerInfo.wins -= 1
-                opponentInfo.losses -= 1
+        if challengeInfo.won == 1:
+            challengerInfo.wins -= 1
+            opponentInfo.losses -= 1
 
-                if challengerInfo.rank == 1:
-                    challengerInfo.titles -= 1
-            else:
-                challengerInfo.losses -= 1
-                opponentInfo.wins -= 1
+            if challengerInfo.rank == 1:
+                challengerInfo.titles -= 1
+        else:
+            challengerInfo.losses -= 1
+            opponentInfo.wins -= 1
 
-                if opponentInfo.rank == 1:
-                    opponentInfo.titles -= 1
+            if opponentInfo.rank == 1:
+                opponentInfo.titles -= 1
 
-            newRank = opponentInfo.rank
-            newTier = opponentInfo.tier
+        newRank = opponentInfo.rank
+        newTier = opponentInfo.tier
 
-            opponentInfo.rank = challengerInfo.rank
-            opponentInfo.tier = challengerInfo.tier
+        opponentInfo.rank = challengerInfo.rank
+        opponentInfo.tier = challengerInfo.tier
 
-            challengerInfo.rank = newRank
-            challengerInfo.tier = newTier
-                
-            # Pushes changes to database
-            self.cursor.execute("UPDATE Players SET Rank=%s, Tier=%s, Wins=%s, Losses=%s, Titles=%s WHERE PlayerID=%s;", 
-            (challengerInfo.rank, challengerInfo.tier, challengerInfo.wins, challengerInfo.losses, challengerInfo.titles, challengerInfo.playerID,))
+        challengerInfo.rank = newRank
+        challengerInfo.tier = newTier
+            
+        # Pushes changes to database
+        self.cursor.execute("UPDATE Players SET Rank=%s, Tier=%s, Wins=%s, Losses=%s, Titles=%s WHERE PlayerID=%s;", 
+        (challengerInfo.rank, challengerInfo.tier, challengerInfo.wins, challengerInfo.losses, challengerInfo.titles, challengerInfo.playerID,))
 
-            self.cursor.execute("UPDATE Players SET Rank=%s, Tier=%s, Wins=%s, Losses=%s, Titles=%s WHERE PlayerID=%s;", 
-            (opponentInfo.rank, opponentInfo.tier, opponentInfo.wins, opponentInfo.losses, opponentInfo.titles, opponentInfo.playerID,))
+        self.cursor.execute("UPDATE Players SET Rank=%s, Tier=%s, Wins=%s, Losses=%s, Titles=%s WHERE PlayerID=%s;", 
+        (opponentInfo.rank, opponentInfo.tier, opponentInfo.wins, opponentInfo.losses, opponentInfo.titles, opponentInfo.playerID,))
 
-        self.database.commit()
+        return (challengerInfo.tier, opponentInfo.tier)
 
     
     # Marks all overdue challenges as timed out
+    @readWrite
     def cancelAllOverdueChallenges(self, ladder = ''):
         if ladder == '':
             ladder = self.getConfig('current_ladder')
@@ -640,63 +1112,940 @@ class LadderDatabase:
         return affectedPlayers
 
 
-##### CONFIGURATION #####
+##### STATISTICS #####
 
-    # Creates 'Config' table if it doesn't exist yet
-    def __initConfigTable(self):
-        if not self.__doesTableExist('Config'):
+    # Creates 'PlayerStats' table if it doesn't exist yet
+    # CurrentStreak: Positive for a win streak, negative for a loss streak
+    # RecentForm: Results of the most recent games as 'W'/'L' characters, oldest first
+    def __initPlayerStatsTable(self):
+        if not self.__doesTableExist('PlayerStats'):
             self.cursor.execute("""
-            CREATE TABLE Config (
-                ConfigID INT AUTO_INCREMENT,
-                Ladder varchar(255),
-                Name varchar(255) NOT NULL,
-                Value varchar(255) NOT NULL,
-                PRIMARY KEY (ConfigID)
+            CREATE TABLE PlayerStats (
+                PlayerStatsID INT AUTO_INCREMENT,
+                DiscordID BIGINT NOT NULL,
+                Ladder varchar(255) NOT NULL,
+                CurrentStreak INT DEFAULT 0,
+                LongestWinStreak INT DEFAULT 0,
+                LongestLossStreak INT DEFAULT 0,
+                RecentForm varchar(10) DEFAULT '',
+                PRIMARY KEY (PlayerStatsID),
+                UNIQUE KEY (Ladder, DiscordID)
             );""")
 
-            self.cursor.execute("""INSERT INTO Config (Name, Value) VALUES 
-            ('ranking_channel', 0),
-            ('general_channel', 0),
-            ('ladder_role', 0),
-            ('admin_role', 0),
-            ('challenge_timeout', 3),
-            ('current_ladder', 'default'),
-            ('num_cancels', 3),
-            ('outgoing_cooldown', 1),
-            ('challenge_protection', 1),
-            ('ranking_message', 0),
-            ('signup_only', 0),
-            ('rank_range',3 )
-            ;""")
-            self.database.commit()
+            print('Created table "PlayerStats".')
 
-            print('Created table "Config".')
+    # Creates 'HeadToHead' table if it doesn't exist yet
+    # Every pairing is stored twice, once from the point of view of each player
+    def __initHeadToHeadTable(self):
+        if not self.__doesTableExist('HeadToHead'):
+            self.cursor.execute("""
+            CREATE TABLE HeadToHead (
+                HeadToHeadID INT AUTO_INCREMENT,
+                DiscordID BIGINT NOT NULL,
+                OpponentDiscordID BIGINT NOT NULL,
+                Ladder varchar(255) NOT NULL,
+                Wins INT DEFAULT 0,
+                Losses INT DEFAULT 0,
+                PRIMARY KEY (HeadToHeadID),
+                UNIQUE KEY (Ladder, DiscordID, OpponentDiscordID)
+            );""")
 
-    # Gets the value of a configuration attribute by name
-    def getConfig(self, name, ladder = ''):
+            print('Created table "HeadToHead".')
+
+    # Creates 'TierRecords' table if it doesn't exist yet
+    # Tier: The tier the player was in when the game was played
+    def __initTierRecordsTable(self):
+        if not self.__doesTableExist('TierRecords'):
+            self.cursor.execute("""
+            CREATE TABLE TierRecords (
+                TierRecordID INT AUTO_INCREMENT,
+                DiscordID BIGINT NOT NULL,
+                Ladder varchar(255) NOT NULL,
+                Tier INT NOT NULL,
+                Wins INT DEFAULT 0,
+                Losses INT DEFAULT 0,
+                PRIMARY KEY (TierRecordID),
+                UNIQUE KEY (Ladder, DiscordID, Tier)
+            );""")
+
+            print('Created table "TierRecords".')
+
+    # Returns streaks and recent form of the given player
+    @readOnly
+    def getPlayerStats(self, discordID, ladder = ''):
         if ladder == '':
-            self.cursor.execute("SELECT Value FROM Config WHERE Name=%s LIMIT 1;", (name,))
-        else:
-            self.cursor.execute("SELECT Value FROM Config WHERE Name=%s AND Ladder=%s LIMIT 1;", (name, ladder,))
+            ladder = self.getConfig('current_ladder')
+
+        self.readCursor.execute("SELECT CurrentStreak, LongestWinStreak, LongestLossStreak, RecentForm FROM PlayerStats WHERE DiscordID=%s AND Ladder=%s;", (discordID, ladder,))
+        result = self.readCursor.fetchall()
 
-        result = self.cursor.fetchall()
         if len(result) == 0:
-            raise Exception(f"Invalid configuration name '{name}' for ladder '{ladder}'")
+            return PlayerStats(discordID)
         else:
-            return result[0][0]
+            row = result[0]
+            return PlayerStats(discordID, row[0], row[1], row[2], row[3])
 
-    # Sets the value of a configuration attribute by name
-    def setConfig(self, name, value, ladder = ''):
+    # Returns the record of player 1 against player 2
+    @readOnly
+    def getHeadToHead(self, discordID1, discordID2, ladder = ''):
         if ladder == '':
-            self.cursor.execute("UPDATE Config SET Value=%s WHERE Name=%s;", (value, name,))
-        else:
-            self.cursor.execute("UPDATE Config SET Value=%s WHERE Name=%s AND Ladder=%s;", (value, name, ladder,))
+            ladder = self.getConfig('current_ladder')
 
-        self.database.commit()
+        self.readCursor.execute("SELECT Wins, Losses FROM HeadToHead WHERE DiscordID=%s AND OpponentDiscordID=%s AND Ladder=%s;", (discordID1, discordID2, ladder,))
+        result = self.readCursor.fetchall()
 
-    # Checks if a user is a ladder admin
-    def isLadderAdmin(self, member):
-        adminRoleID = int(self.getConfig('admin_role'))
+        if len(result) == 0:
+            return HeadToHeadInfo(discordID1, discordID2, 0, 0)
+        else:
+            return HeadToHeadInfo(discordID1, discordID2, result[0][0], result[0][1])
+
+    # Returns the head-to-head records of a player against the opponents they played most often
+    @readOnly
+    def getMostPlayedOpponents(self, discordID, limit = 5, ladder = ''):
+        if ladder == '':
+            ladder = self.getConfig('current_ladder')
+
+        self.readCursor.execute("""SELECT OpponentDiscordID, Wins, Losses FROM HeadToHead WHERE DiscordID=%s AND Ladder=%s AND Wins+Losses>0
+        ORDER BY Wins+Losses DESC LIMIT %s;""", (discordID, ladder, limit,))
+        result = self.readCursor.fetchall()
+
+        records = []
+
+        for row in result:
+            records += [HeadToHeadInfo(discordID, row[0], row[1], row[2])]
+
+        return records
+
+    # Returns the records of a player in every tier they played in
+    @readOnly
+    def getTierRecords(self, discordID, ladder = ''):
+        if ladder == '':
+            ladder = self.getConfig('current_ladder')
+
+        self.readCursor.execute("SELECT Tier, Wins, Losses FROM TierRecords WHERE DiscordID=%s AND Ladder=%s ORDER BY Tier;", (discordID, ladder,))
+        result = self.readCursor.fetchall()
+
+        records = []
+
+        for row in result:
+            records += [TierRecordInfo(row[0], row[1], row[2])]
+
+        return records
+
+    # Adds the result of a game to the statistics of one player, doesn't commit
+    def __recordStatistics(self, discordID, opponentDiscordID, tier, won, ladder):
+        winNum = 1 if won else 0
+        lossNum = 1 - winNum
+
+        self.cursor.execute("""INSERT INTO HeadToHead (DiscordID, OpponentDiscordID, Ladder, Wins, Losses) VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE Wins=Wins+%s, Losses=Losses+%s;""",
+        (discordID, opponentDiscordID, ladder, winNum, lossNum, winNum, lossNum,))
+
+        self.cursor.execute("""INSERT INTO TierRecords (DiscordID, Ladder, Tier, Wins, Losses) VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE Wins=Wins+%s, Losses=Losses+%s;""",
+        (discordID, ladder, tier, winNum, lossNum, winNum, lossNum,))
+
+        stats = self.getPlayerStats(discordID, ladder)
+        previousStats = PlayerStats(discordID, *stats.toList())
+
+        stats.addResult(won)
+        self.__storePlayerStats(stats, ladder)
+
+        return previousStats
+
+    # Returns (EventID, data) of the report of a challenge that wasn't reverted yet, None if it isn't in the event log
+    def __getReportEvent(self, challengeID, ladder):
+        self.cursor.execute("SELECT EventID, Data FROM Events WHERE ChallengeID=%s AND Ladder=%s AND Type='report' AND Reverted=0 ORDER BY EventID DESC LIMIT 1;", (challengeID, ladder,))
+        result = self.cursor.fetchall()
+
+        if len(result) == 0:
+            return None
+
+        return result[0][0], ladderevents.decodeEventData(result[0][1])
+
+    # Takes the result of a game out of the statistics of one player, doesn't commit
+    # reportEvent: (EventID, data) of the report, see __getReportEvent. side: 'challenger' or 'opponent', the role of the player in the game.
+    def __removeStatistics(self, discordID, opponentDiscordID, tier, won, ladder, reportEvent, side):
+        winNum = 1 if won else 0
+        lossNum = 1 - winNum
+
+        self.cursor.execute("UPDATE HeadToHead SET Wins=GREATEST(Wins-%s, 0), Losses=GREATEST(Losses-%s, 0) WHERE DiscordID=%s AND OpponentDiscordID=%s AND Ladder=%s;",
+        (winNum, lossNum, discordID, opponentDiscordID, ladder,))
+
+        self.cursor.execute("UPDATE TierRecords SET Wins=GREATEST(Wins-%s, 0), Losses=GREATEST(Losses-%s, 0) WHERE DiscordID=%s AND Tier=%s AND Ladder=%s;",
+        (winNum, lossNum, discordID, tier, ladder,))
+
+        # Streaks can't be decremented, so the ones from before the game are restored from the report
+        # and the player's games reported since are added again. Disputes follow the game closely, so there are few of those.
+        if reportEvent is not None and f"{side}Stats" in reportEvent[1]:
+            reportEventID, data = reportEvent
+            playerID = data[side]
+            stats = PlayerStats(discordID, *data[f"{side}Stats"])
+
+            self.cursor.execute("SELECT Data FROM Events WHERE Ladder=%s AND EventID>%s AND Type='report' AND Reverted=0 ORDER BY EventID;", (ladder, reportEventID,))
+
+            for row in self.cursor.fetchall():
+                laterData = ladderevents.decodeEventData(row[0])
+
+                if laterData['challenger'] == playerID:
+                    stats.addResult(laterData['won'])
+                elif laterData['opponent'] == playerID:
+                    stats.addResult(not laterData['won'])
+
+            self.__storePlayerStats(stats, ladder)
+            return
+
+        # Reports logged by older versions don't have the streaks, so they're rebuilt from the player's remaining games
+        self.cursor.execute("""SELECT p1.DiscordID, c.Won FROM Challenges c
+        JOIN Players p1 ON c.IssuedByID=p1.PlayerID
+        JOIN Players p2 ON c.OpponentID=p2.PlayerID
+        WHERE (p1.DiscordID=%s OR p2.DiscordID=%s) AND p1.Ladder=%s AND p2.Ladder=%s AND c.State='played'
+        ORDER BY c.ChallengeID;""", (discordID, discordID, ladder, ladder,))
+        result = self.cursor.fetchall()
+
+        stats = PlayerStats(discordID)
+        for row in result:
+            isChallenger = row[0] == discordID
+            stats.addResult((row[1] == 1) == isChallenger)
+
+        self.__storePlayerStats(stats, ladder)
+
+    # Writes the streaks and form of a player to the database, doesn't commit
+    def __storePlayerStats(self, stats, ladder):
+        self.cursor.execute("""INSERT INTO PlayerStats (DiscordID, Ladder, CurrentStreak, LongestWinStreak, LongestLossStreak, RecentForm) VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE CurrentStreak=VALUES(CurrentStreak), LongestWinStreak=VALUES(LongestWinStreak), LongestLossStreak=VALUES(LongestLossStreak), RecentForm=VALUES(RecentForm);""",
+        (stats.discordID, ladder, stats.currentStreak, stats.longestWinStreak, stats.longestLossStreak, stats.recentForm,))
+
+    # Deletes all statistics of a player, doesn't commit
+    def __deletePlayerStatistics(self, discordID, ladder):
+        self.cursor.execute("DELETE FROM PlayerStats WHERE DiscordID=%s AND Ladder=%s;", (discordID, ladder,))
+        self.cursor.execute("DELETE FROM HeadToHead WHERE DiscordID=%s AND Ladder=%s;", (discordID, ladder,))
+        self.cursor.execute("DELETE FROM TierRecords WHERE DiscordID=%s AND Ladder=%s;", (discordID, ladder,))
+
+
+##### RATINGS #####
+
+    # Creates 'Ratings' table if it doesn't exist yet
+    # PlayerID: Players.PlayerID of the rated player. Players without an entry have the initial rating.
+    def __initRatingsTable(self):
+        if not self.__doesTableExist('Ratings'):
+            self.cursor.execute("""
+            CREATE TABLE Ratings (
+                PlayerID INT NOT NULL,
+                Rating DOUBLE NOT NULL,
+                PRIMARY KEY (PlayerID)
+            );""")
+
+            print('Created table "Ratings".')
+
+    # Creates 'RatingChanges' table if it doesn't exist yet
+    # Stores how much rating each player won or lost in a game, so that disputed games can be taken back
+    def __initRatingChangesTable(self):
+        if not self.__doesTableExist('RatingChanges'):
+            self.cursor.execute("""
+            CREATE TABLE RatingChanges (
+                ChallengeID INT NOT NULL,
+                PlayerID INT NOT NULL,
+                RatingChange DOUBLE NOT NULL,
+                PRIMARY KEY (ChallengeID, PlayerID)
+            );""")
+
+            print('Created table "RatingChanges".')
+
+    # Returns the current rating of the player with the given PlayerID
+    @readOnly
+    def getRating(self, playerID):
+        self.readCursor.execute("SELECT Rating FROM Ratings WHERE PlayerID=%s;", (playerID,))
+        result = self.readCursor.fetchall()
+
+        if len(result) == 0:
+            return float(self.getConfig('rating_initial'))
+        else:
+            return result[0][0]
+
+    # Returns a dictionary mapping the Discord ID of every player in the ladder to their rating
+    @readOnly
+    def getRatings(self, ladder = ''):
+        if ladder == '':
+            ladder = self.getConfig('current_ladder')
+
+        initialRating = float(self.getConfig('rating_initial'))
+
+        self.readCursor.execute("""SELECT p.DiscordID, r.Rating FROM Players p
+        LEFT JOIN Ratings r ON r.PlayerID=p.PlayerID
+        WHERE p.Ladder=%s;""", (ladder,))
+        result = self.readCursor.fetchall()
+
+        ratings = {}
+
+        for row in result:
+            ratings[row[0]] = row[1] if row[1] is not None else initialRating
+
+        return ratings
+
+    # Replays the whole challenge history of the ladder and recalculates all ratings.
+    # Used after a rating parameter was changed.
+    @readWrite
+    def recomputeRatings(self, ladder = ''):
+        if ladder == '':
+            ladder = self.getConfig('current_ladder')
+
+        initialRating = float(self.getConfig('rating_initial'))
+        kFactor = float(self.getConfig('rating_k_factor'))
+
+        # Kicked players don't have a Players entry anymore, so games count for the ladder if either player is still in it
+        self.cursor.execute("""SELECT c.ChallengeID, c.IssuedByID, c.OpponentID, c.Won FROM Challenges c
+        LEFT JOIN Players p1 ON c.IssuedByID=p1.PlayerID
+        LEFT JOIN Players p2 ON c.OpponentID=p2.PlayerID
+        WHERE c.State='played' AND (p1.Ladder=%s OR p2.Ladder=%s)
+        ORDER BY c.ChallengeID;""", (ladder, ladder,))
+        result = self.cursor.fetchall()
+
+        games = [(row[1], row[2], row[3] == 1) for row in result]
+        ratings, changes = ladderrating.replayGames(games, initialRating, kFactor)
+
+        # Rewrites ratings and rating changes
+        self.cursor.execute("SELECT PlayerID FROM Players WHERE Ladder=%s;", (ladder,))
+        playerIDs = [row[0] for row in self.cursor.fetchall()]
+
+        self.cursor.execute("DELETE r FROM Ratings r JOIN Players p ON r.PlayerID=p.PlayerID WHERE p.Ladder=%s;", (ladder,))
+
+        ratingRows = [(playerID, ratings[playerID]) for playerID in playerIDs if playerID in ratings]
+        if len(ratingRows) > 0:
+            self.cursor.executemany("INSERT INTO Ratings (PlayerID, Rating) VALUES (%s, %s);", ratingRows)
+
+        changeRows = []
+        for i, row in enumerate(result):
+            changeRows += [(row[0], row[1], changes[i]), (row[0], row[2], -changes[i])]
+
+        if len(changeRows) > 0:
+            self.cursor.executemany("REPLACE INTO RatingChanges (ChallengeID, PlayerID, RatingChange) VALUES (%s, %s, %s);", changeRows)
+
+        self.__commit(ladder)
+
+    # Updates the ratings of both players after a game, doesn't commit
+    def __recordRatingChange(self, challengeID, challengerPlayerID, opponentPlayerID, won):
+        kFactor = float(self.getConfig('rating_k_factor'))
+        challengerRating = self.getRating(challengerPlayerID)
+        opponentRating = self.getRating(opponentPlayerID)
+
+        change = ladderrating.ratingChange(challengerRating, opponentRating, won, kFactor)
+
+        self.cursor.executemany("REPLACE INTO Ratings (PlayerID, Rating) VALUES (%s, %s);",
+        [(challengerPlayerID, challengerRating + change), (opponentPlayerID, opponentRating - change)])
+
+        self.cursor.executemany("REPLACE INTO RatingChanges (ChallengeID, PlayerID, RatingChange) VALUES (%s, %s, %s);",
+        [(challengeID, challengerPlayerID, change), (challengeID, opponentPlayerID, -change)])
+
+    # Takes back the rating changes of a game, doesn't commit
+    def __removeRatingChange(self, challengeID):
+        self.cursor.execute("""UPDATE Ratings r JOIN RatingChanges rc ON r.PlayerID=rc.PlayerID
+        SET r.Rating=r.Rating-rc.RatingChange WHERE rc.ChallengeID=%s;""", (challengeID,))
+        self.cursor.execute("DELETE FROM RatingChanges WHERE ChallengeID=%s;", (challengeID,))
+
+
+##### EVENTS #####
+
+    # Creates 'Events' table if it doesn't exist yet
+    # Type: Kind of ladder mutation, see ladderevents.eventTypes
+    # ChallengeID: Challenges.ChallengeID for reports and disputes, NULL otherwise
+    # Data: JSON encoded details of the event, see ladderevents.LadderState.applyEvent
+    # Reverted: Whether the event was taken back by a dispute and must be skipped when replaying
+    def __initEventsTable(self):
+        if not self.__doesTableExist('Events'):
+            self.cursor.execute("""
+            CREATE TABLE Events (
+                EventID INT AUTO_INCREMENT,
+                Ladder varchar(255) NOT NULL,
+                Type ENUM('signup', 'kick', 'report', 'shuffle', 'timeout', 'dispute') NOT NULL,
+                ChallengeID INT,
+                Time DATETIME DEFAULT NOW(),
+                Data TEXT NOT NULL,
+                Reverted TINYINT DEFAULT 0,
+                PRIMARY KEY (EventID),
+                KEY (Ladder, EventID),
+                KEY (ChallengeID)
+            );""")
+
+            print('Created table "Events".')
+
+    # Creates 'Snapshots' table if it doesn't exist yet
+    # EventID: The last event that is included in the snapshot
+    # Data: Compact ladder state, see ladderevents.LadderState.toSnapshot
+    def __initSnapshotsTable(self):
+        if not self.__doesTableExist('Snapshots'):
+            self.cursor.execute("""
+            CREATE TABLE Snapshots (
+                SnapshotID INT AUTO_INCREMENT,
+                Ladder varchar(255) NOT NULL,
+                EventID INT NOT NULL,
+                Time DATETIME DEFAULT NOW(),
+                Data MEDIUMTEXT NOT NULL,
+                PRIMARY KEY (SnapshotID),
+                KEY (Ladder, EventID)
+            );""")
+
+            print('Created table "Snapshots".')
+
+    # Appends an event to the log, doesn't commit
+    # Must be called after the mutation was written, so that snapshots taken here include it
+    def __logEvent(self, ladder, eventType, data, challengeID = None):
+        self.cursor.execute("INSERT INTO Events (Ladder, Type, ChallengeID, Data) VALUES (%s, %s, %s, %s);",
+        (ladder, eventType, challengeID, ladderevents.encodeEventData(data),))
+        eventID = self.cursor.lastrowid
+
+        # Takes a snapshot for the first event of a ladder and after every 'snapshot_interval' events
+        self.cursor.execute("SELECT MAX(EventID) FROM Snapshots WHERE Ladder=%s;", (ladder,))
+        lastSnapshotEventID = self.cursor.fetchall()[0][0]
+
+        if lastSnapshotEventID is None:
+            self.__writeSnapshot(ladder, eventID)
+            return
+
+        self.cursor.execute("SELECT COUNT(*) FROM Events WHERE Ladder=%s AND EventID>%s;", (ladder, lastSnapshotEventID,))
+        eventsSinceSnapshot = self.cursor.fetchall()[0][0]
+
+        if eventsSinceSnapshot >= int(self.getConfig('snapshot_interval')):
+            self.__writeSnapshot(ladder, eventID)
+
+    # Returns the current ladder state as stored in the 'Players' table
+    def __readLadderState(self, ladder):
+        self.cursor.execute("SELECT PlayerID, DiscordID, Rank, Wins, Losses, Titles, LastOpponent FROM Players WHERE Ladder=%s;", (ladder,))
+        result = self.cursor.fetchall()
+
+        state = ladderevents.LadderState()
+
+        for row in result:
+            state.players[row[0]] = ladderevents.PlayerState(row[1], row[2], row[3], row[4], row[5], row[6])
+
+        return state
+
+    # Returns the current ladder state (see ladderevents.LadderState) and the ID of the last event of the ladder, 0 if there is none
+    def getLadderState(self, ladder = ''):
+        if ladder == '':
+            ladder = self.getConfig('current_ladder')
+
+        self.cursor.execute("SELECT MAX(EventID) FROM Events WHERE Ladder=%s;", (ladder,))
+        lastEventID = self.cursor.fetchall()[0][0]
+
+        return self.__readLadderState(ladder), lastEventID if lastEventID is not None else 0
+
+    # Returns (EventID, type, data) of the events of the ladder after the given event that weren't reverted, in the order they happened
+    def getEventsSince(self, eventID, ladder = ''):
+        if ladder == '':
+            ladder = self.getConfig('current_ladder')
+
+        self.cursor.execute("SELECT EventID, Type, Data FROM Events WHERE Ladder=%s AND EventID>%s AND Reverted=0 ORDER BY EventID;", (ladder, eventID,))
+        return [(row[0], row[1], ladderevents.decodeEventData(row[2])) for row in self.cursor.fetchall()]
+
+    # Stores the current state of the ladder as snapshot of the given event, doesn't commit
+    def __writeSnapshot(self, ladder, eventID):
+        state = self.__readLadderState(ladder)
+
+        self.cursor.execute("INSERT INTO Snapshots (Ladder, EventID, Data) VALUES (%s, %s, %s);", (ladder, eventID, state.toSnapshot(),))
+
+    # Stores the current state of the ladder as snapshot after the latest logged event, doesn't commit
+    # Used after changes that aren't logged as events, so that later replays start from the changed state
+    def __writeCurrentSnapshot(self, ladder):
+        self.cursor.execute("SELECT MAX(EventID) FROM Events WHERE Ladder=%s;", (ladder,))
+        lastEventID = self.cursor.fetchall()[0][0]
+
+        self.__writeSnapshot(ladder, lastEventID if lastEventID is not None else 0)
+
+    # Takes back a reported game by replaying the ladder from the nearest snapshot without it, doesn't commit
+    # Returns the tiers of challenger and opponent at the time of the game, or None if the game can't be replayed
+    def __revertReportEvent(self, challengeID, ladder):
+        # Finds the report in the event log
+        self.cursor.execute("SELECT EventID FROM Events WHERE ChallengeID=%s AND Ladder=%s AND Type='report' AND Reverted=0 ORDER BY EventID DESC LIMIT 1;", (challengeID, ladder,))
+        result = self.cursor.fetchall()
+
+        if len(result) == 0:
+            return None
+
+        reportEventID = result[0][0]
+
+        # Finds the latest snapshot taken before the report
+        self.cursor.execute("SELECT EventID, Data FROM Snapshots WHERE Ladder=%s AND EventID<%s ORDER BY EventID DESC, SnapshotID DESC LIMIT 1;", (ladder, reportEventID,))
+        result = self.cursor.fetchall()
+
+        if len(result) == 0:
+            return None
+
+        snapshotEventID = result[0][0]
+        state = ladderevents.LadderState.fromSnapshot(result[0][1])
+        # Replays every event including the report, which has to end in the current state
+        checkState = ladderevents.LadderState.fromSnapshot(result[0][1])
+
+        # Replays all events since the snapshot except for the disputed report
+        self.cursor.execute("SELECT EventID, Type, Data FROM Events WHERE Ladder=%s AND EventID>%s AND Reverted=0 ORDER BY EventID;", (ladder, snapshotEventID,))
+        events = self.cursor.fetchall()
+
+        gameTiers = None
+        tierIndex = self.getTierIndex(ladder)
+
+        for eventID, eventType, data in events:
+            data = ladderevents.decodeEventData(data)
+
+            if eventID == reportEventID:
+                challenger = state.players[data['challenger']]
+                opponent = state.players[data['opponent']]
+                gameTiers = (tierIndex.getTier(challenger.rank), tierIndex.getTier(opponent.rank))
+            else:
+                state.applyEvent(eventType, data)
+
+            checkState.applyEvent(eventType, data)
+
+        # The replay only works if the log covers every change made to the ladder since the snapshot
+        currentState = self.__readLadderState(ladder)
+
+        if gameTiers is None or not checkState.matches(currentState):
+            print(f"Event log of ladder '{ladder}' doesn't match the 'Players' table, can't replay challenge {challengeID}.")
+            return None
+
+        # Writes all players whose state changed
+        for playerID, player in state.players.items():
+            current = currentState.players[playerID]
+
+            if (player.rank, player.wins, player.losses, player.titles, player.lastOpponent) == (current.rank, current.wins, current.losses, current.titles, current.lastOpponent):
+                continue
+
+            self.cursor.execute("UPDATE Players SET Rank=%s, Tier=%s, Wins=%s, Losses=%s, Titles=%s, LastOpponent=%s WHERE PlayerID=%s;",
+            (player.rank, tierIndex.getTier(player.rank), player.wins, player.losses, player.titles, player.lastOpponent, playerID,))
+
+        # Marks the report as reverted and drops snapshots that include it
+        self.cursor.execute("UPDATE Events SET Reverted=1 WHERE EventID=%s;", (reportEventID,))
+        self.cursor.execute("DELETE FROM Snapshots WHERE Ladder=%s AND EventID>=%s;", (ladder, reportEventID,))
+
+        return gameTiers
+
+
+##### SEASONS #####
+
+    # Tables whose rows of the old season are moved to an archive table when a new season starts
+    archivedTables = ['Players', 'Challenges', 'PlayerStats', 'HeadToHead', 'TierRecords', 'Ratings', 'RatingChanges']
+
+    # Creates an archive table for every table of archivedTables if it doesn't exist yet, e.g. 'PlayersArchive'
+    # They have the same columns as the original tables and hold the rows of finished seasons, see startSeason
+    def __initArchiveTables(self):
+        for tableName in LadderDatabase.archivedTables:
+            if not self.__doesTableExist(f"{tableName}Archive"):
+                self.cursor.execute(f"CREATE TABLE {tableName}Archive LIKE {tableName};")
+                print(f"Created table \"{tableName}Archive\".")
+
+    # Starts a new season: Creates the new ladder with every player of the current one, seeded by the given policy
+    # (see ladderrules.seedNextSeason), moves the old season's players, games, statistics and ratings to the archive tables and makes the new ladder
+    # the current one, all in a single transaction. Pending challenges and running cooldowns and protections carry over.
+    # Returns the number of players in the new season.
+    @readWrite
+    def startSeason(self, newLadder, seeding = 'keep'):
+        ladder = self.getConfig('current_ladder')
+
+        if newLadder == ladder:
+            raise ValueError(f"'{newLadder}' is already the current ladder")
+        if seeding not in ladderrules.seedingPolicies:
+            raise ValueError(f"Unknown seeding '{seeding}', use one of {', '.join(ladderrules.seedingPolicies)}")
+
+        try:
+            playerCount = self.__startSeason(ladder, newLadder, seeding)
+        except:
+            self.database.rollback()
+            raise
+
+        self.config['current_ladder'] = newLadder
+
+        # The old ladder isn't tracked anymore, the new one is loaded on first use
+        self.timeouts.cancelWhere(lambda key: key[0] == ladder)
+        self.timeoutLadders.discard(ladder)
+
+        return playerCount
+
+    def __startSeason(self, ladder, newLadder, seeding):
+        self.cursor.execute("SELECT COUNT(*) FROM Players WHERE Ladder=%s;", (newLadder,))
+        if self.cursor.fetchall()[0][0] > 0:
+            raise ValueError(f"The ladder '{newLadder}' already has players")
+
+        self.cursor.execute("SELECT DiscordID, Wins+Losses, OutgoingTimeoutUntil, IngoingTimeoutUntil FROM Players WHERE Ladder=%s ORDER BY Rank FOR UPDATE;", (ladder,))
+        players = self.cursor.fetchall()
+        timeouts = dict([(row[0], (row[2], row[3])) for row in players])
+
+        seededIDs = ladderrules.seedNextSeason([(row[0], row[1]) for row in players], seeding)
+        tierIndex = self.getTierIndex(newLadder, len(seededIDs))
+
+        rows = [(discordID, newLadder, tierIndex.getTier(rank), rank, *timeouts[discordID]) for rank, discordID in enumerate(seededIDs, start = 1)]
+
+        for i in range(0, len(rows), LadderDatabase.importBatchSize):
+            self.cursor.executemany("""INSERT INTO Players (DiscordID, Ladder, Tier, Rank, OutgoingTimeoutUntil, IngoingTimeoutUntil)
+            VALUES (%s, %s, %s, %s, %s, %s);""", rows[i:i + LadderDatabase.importBatchSize])
+
+        # Pending challenges move to the new ladder, so they can be played and reported as usual
+        self.cursor.execute("""UPDATE Challenges c
+        JOIN Players p1 ON c.IssuedByID=p1.PlayerID
+        JOIN Players p2 ON c.OpponentID=p2.PlayerID
+        JOIN Players np1 ON np1.DiscordID=p1.DiscordID AND np1.Ladder=%s
+        JOIN Players np2 ON np2.DiscordID=p2.DiscordID AND np2.Ladder=%s
+        SET c.IssuedByID=np1.PlayerID, c.OpponentID=np2.PlayerID
+        WHERE c.State='pending' AND p1.Ladder=%s AND p2.Ladder=%s;""", (newLadder, newLadder, ladder, ladder,))
+
+        # Moves the old season out of the tables every command reads
+        self.cursor.execute("""INSERT INTO ChallengesArchive SELECT c.* FROM Challenges c
+        JOIN Players p ON c.IssuedByID=p.PlayerID WHERE p.Ladder=%s;""", (ladder,))
+        self.cursor.execute("DELETE c FROM Challenges c JOIN Players p ON c.IssuedByID=p.PlayerID WHERE p.Ladder=%s;", (ladder,))
+
+        # Ratings are stored by PlayerID, so they're moved before the players
+        self.cursor.execute("INSERT INTO RatingChangesArchive SELECT rc.* FROM RatingChanges rc JOIN Players p ON rc.PlayerID=p.PlayerID WHERE p.Ladder=%s;", (ladder,))
+        self.cursor.execute("DELETE rc FROM RatingChanges rc JOIN Players p ON rc.PlayerID=p.PlayerID WHERE p.Ladder=%s;", (ladder,))
+        self.cursor.execute("INSERT INTO RatingsArchive SELECT r.* FROM Ratings r JOIN Players p ON r.PlayerID=p.PlayerID WHERE p.Ladder=%s;", (ladder,))
+        self.cursor.execute("DELETE r FROM Ratings r JOIN Players p ON r.PlayerID=p.PlayerID WHERE p.Ladder=%s;", (ladder,))
+
+        for tableName in ['PlayerStats', 'HeadToHead', 'TierRecords']:
+            self.cursor.execute(f"INSERT INTO {tableName}Archive SELECT * FROM {tableName} WHERE Ladder=%s;", (ladder,))
+            self.cursor.execute(f"DELETE FROM {tableName} WHERE Ladder=%s;", (ladder,))
+
+        self.cursor.execute("INSERT INTO PlayersArchive SELECT * FROM Players WHERE Ladder=%s;", (ladder,))
+        self.cursor.execute("DELETE FROM Players WHERE Ladder=%s;", (ladder,))
+
+        # Seeded players aren't in the event log, so replays of the new ladder have to start after the rollover
+        self.__writeCurrentSnapshot(newLadder)
+
+        self.cursor.execute("UPDATE Config SET Value=%s WHERE Name='current_ladder';", (newLadder,))
+        self.__commit(None)
+
+        return len(rows)
+
+
+##### WARM RESTARTS #####
+
+    # Returns values that change with every change of the data in a ladder's WarmState: the last event, the number of players,
+    # the newest player, the newest challenge and the number of pending challenges
+    # Everything the bot changes is caught by these, changes made directly in the database need the file to be deleted
+    def __getWarmStateKey(self, ladder):
+        self.cursor.execute("""SELECT
+        (SELECT COALESCE(MAX(EventID), 0) FROM Events WHERE Ladder=%s),
+        (SELECT COUNT(*) FROM Players WHERE Ladder=%s),
+        (SELECT COALESCE(MAX(PlayerID), 0) FROM Players WHERE Ladder=%s),
+        (SELECT COALESCE(MAX(ChallengeID), 0) FROM Challenges),
+        (SELECT COUNT(*) FROM Challenges WHERE State='pending');""", (ladder, ladder, ladder,))
+
+        return [int(value) for value in self.cursor.fetchall()[0]]
+
+    # Returns true if reads of the ladder can be answered from the restored WarmState
+    def __isWarm(self, ladder):
+        return self.warmState is not None and self.warmState.ladder == ladder
+
+    # Returns the cached data of a ladder as ladderstore.WarmState to keep it across restarts, without display names
+    # Reads from the primary, so the state is never older than its key
+    def getWarmState(self, ladder = ''):
+        if ladder == '':
+            ladder = self.getConfig('current_ladder')
+
+        self.__loadTimeouts(ladder)
+        self.__advanceTimeouts()
+
+        # Ends the current transaction, so all following reads see the same data
+        self.database.commit()
+        key = self.__getWarmStateKey(ladder)
+
+        self.cursor.execute("SELECT PlayerID, DiscordID, Rank, Tier, Wins, Losses, Titles, LastOpponent FROM Players WHERE Ladder=%s ORDER BY Rank LIMIT 100;", (ladder,))
+        ranking = RankingSnapshot(self.cursor.fetchall())
+
+        ladderState = self.__readLadderState(ladder)
+
+        timeouts = [(timerKey[1], timerKey[2], expiry) for timerKey, expiry in self.timeouts.expiries.items() if timerKey[0] == ladder]
+
+        self.cursor.execute("""SELECT c.ChallengeID, p1.DiscordID, p2.DiscordID, c.Time FROM Challenges c
+        JOIN Players p1 ON c.IssuedByID=p1.PlayerID
+        JOIN Players p2 ON c.OpponentID=p2.PlayerID
+        WHERE p1.Ladder=%s AND p2.Ladder=%s AND c.State='pending';""", (ladder, ladder,))
+        challenges = [ChallengeInfo(row[0], row[1], row[2], row[3]) for row in self.cursor.fetchall()]
+
+        return ladderstore.WarmState(ladder, key, dict(self.config), ranking, ladderState, timeouts, challenges, {})
+
+    # Answers reads of the ladder from a WarmState that was read from disk until the next change, instead of querying the database
+    # Returns false if the database or the configuration changed since the state was taken, in which case it's not used
+    def restoreWarmState(self, warmState):
+        ladder = warmState.ladder
+
+        if not warmState.config == self.config or not warmState.key == self.__getWarmStateKey(ladder):
+            return False
+
+        # Expiries are UNIX timestamps, so the timers continue where they were
+        self.timeouts.cancelWhere(lambda key: key[0] == ladder)
+        now = time.time()
+
+        for discordID, kind, expiry in warmState.timeouts:
+            if expiry > now:
+                self.timeouts.schedule((ladder, discordID, kind), expiry)
+
+        self.timeoutLadders.add(ladder)
+        self.warmState = warmState
+        return True
+
+##### IMPORT & EXPORT #####
+
+    # Columns of exported rosters and challenge histories
+    rosterColumns = ['DiscordID', 'Rank', 'Tier', 'Wins', 'Losses', 'Titles', 'Cancellations', 'LastOpponent']
+    historyColumns = ['ChallengeID', 'Challenger', 'Opponent', 'Time', 'State', 'Won']
+
+    # Number of rows that are inserted with one statement during imports
+    importBatchSize = 1000
+
+    # Runs a query on a server-side cursor and yields the rows one by one, so that large results don't have to fit in memory
+    # No other query may be run on the connection until all rows were read
+    def __streamQuery(self, sqlCommand, parameters):
+        streamCursor = self.database.cursor(MySQLdb.cursors.SSCursor)
+
+        try:
+            streamCursor.execute(sqlCommand, parameters)
+
+            for row in streamCursor:
+                yield row
+        finally:
+            streamCursor.close()
+
+    # Yields the roster of the ladder in rank order as rows of rosterColumns
+    def streamRoster(self, ladder = ''):
+        if ladder == '':
+            ladder = self.getConfig('current_ladder')
+
+        return self.__streamQuery("""SELECT p.DiscordID, p.Rank, p.Tier, p.Wins, p.Losses, p.Titles, p.Cancellations, lo.DiscordID FROM Players p
+        LEFT JOIN Players lo ON p.LastOpponent=lo.PlayerID
+        WHERE p.Ladder=%s ORDER BY p.Rank;""", (ladder,))
+
+    # Yields all challenges of the ladder in the order they were issued as rows of historyColumns
+    def streamChallengeHistory(self, ladder = ''):
+        if ladder == '':
+            ladder = self.getConfig('current_ladder')
+
+        return self.__streamQuery("""SELECT c.ChallengeID, p1.DiscordID, p2.DiscordID, c.Time, c.State, c.Won FROM Challenges c
+        JOIN Players p1 ON c.IssuedByID=p1.PlayerID
+        JOIN Players p2 ON c.OpponentID=p2.PlayerID
+        WHERE p1.Ladder=%s AND p2.Ladder=%s ORDER BY c.ChallengeID;""", (ladder, ladder,))
+
+    # Adds players from an iterable of dictionaries with rosterColumns as keys, returns the number of added players
+    # Players are ranked in the given order below the existing players. Players that are already signed up are skipped.
+    @readWrite
+    def importRoster(self, rows, ladder = ''):
+        if ladder == '':
+            ladder = self.getConfig('current_ladder')
+
+        # Invalid rows abort the whole import
+        try:
+            return self.__importRoster(rows, ladder)
+        except:
+            self.database.rollback()
+            raise
+
+    def __importRoster(self, rows, ladder):
+        self.cursor.execute("SELECT MAX(Rank) FROM Players WHERE Ladder=%s FOR UPDATE;", (ladder,))
+        lowestRank = self.cursor.fetchall()[0][0]
+        if lowestRank is None:
+            lowestRank = 0
+
+        self.cursor.execute("SELECT DiscordID FROM Players WHERE Ladder=%s;", (ladder,))
+        signedUpIDs = set([row[0] for row in self.cursor.fetchall()])
+
+        tierLayout = self.getTierIndex(ladder, lowestRank).layout
+        now = self.__getDatabaseTime()
+        rank = lowestRank
+        batch = []
+        lastOpponents = []
+
+        for row in rows:
+            discordID = int(row['DiscordID'])
+            if discordID in signedUpIDs:
+                continue
+
+            signedUpIDs.add(discordID)
+            rank += 1
+
+            batch += [(discordID, ladder, tierLayout.getTier(rank, rank), rank, int(row.get('Wins') or 0), int(row.get('Losses') or 0), int(row.get('Titles') or 0), int(row.get('Cancellations') or 0))]
+
+            if row.get('LastOpponent') not in (None, ''):
+                lastOpponents += [(int(row['LastOpponent']), discordID)]
+
+            if len(batch) >= LadderDatabase.importBatchSize:
+                self.__insertRosterBatch(batch, now)
+                batch = []
+
+        if len(batch) > 0:
+            self.__insertRosterBatch(batch, now)
+
+        # Tiers that depend on the ladder size can only be assigned once the final size is known
+        if tierLayout.dependsOnPlayerCount():
+            self.__updateAllTiers(ladder)
+
+        # Last opponents are stored as PlayerID, which is only known after all players were inserted
+        for i in range(0, len(lastOpponents), LadderDatabase.importBatchSize):
+            self.cursor.executemany("""UPDATE Players p JOIN Players lo ON lo.DiscordID=%s AND lo.Ladder=p.Ladder
+            SET p.LastOpponent=lo.PlayerID WHERE p.DiscordID=%s AND p.Ladder=%s;""",
+            [(opponentID, discordID, ladder) for opponentID, discordID in lastOpponents[i:i + LadderDatabase.importBatchSize]])
+
+        # Imported players aren't in the event log, so replays have to start after the import
+        self.__writeCurrentSnapshot(ladder)
+        self.__commit(ladder)
+
+        return rank - lowestRank
+
+    # Timeouts start as the given database time. Only placeholders in VALUES, so mysqlclient sends the batch as one multi-row insert.
+    def __insertRosterBatch(self, batch, now):
+        self.cursor.executemany("""INSERT INTO Players (DiscordID, Ladder, Tier, Rank, Wins, Losses, Titles, Cancellations, OutgoingTimeoutUntil, IngoingTimeoutUntil)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s);""", [(*row, now, now) for row in batch])
+
+    # Adds challenges from an iterable of dictionaries with historyColumns as keys, returns the number of added challenges
+    # Both players must already be signed up for the ladder, other challenges are skipped. ChallengeIDs are newly assigned.
+    @readWrite
+    def importChallengeHistory(self, rows, ladder = ''):
+        if ladder == '':
+            ladder = self.getConfig('current_ladder')
+
+        # Invalid rows abort the whole import
+        try:
+            return self.__importChallengeHistory(rows, ladder)
+        except:
+            self.database.rollback()
+            raise
+
+    def __importChallengeHistory(self, rows, ladder):
+        self.cursor.execute("SELECT DiscordID, PlayerID FROM Players WHERE Ladder=%s;", (ladder,))
+        playerIDs = dict(self.cursor.fetchall())
+
+        imported = 0
+        batch = []
+
+        for row in rows:
+            challengerID = playerIDs.get(int(row['Challenger']))
+            opponentID = playerIDs.get(int(row['Opponent']))
+
+            if challengerID is None or opponentID is None:
+                continue
+
+            won = row.get('Won')
+            if won in (None, ''):
+                won = None
+            else:
+                won = int(won)
+
+            batch += [(challengerID, opponentID, str(row['Time']), row.get('State') or 'played', won)]
+
+            if len(batch) >= LadderDatabase.importBatchSize:
+                self.__insertHistoryBatch(batch)
+                imported += len(batch)
+                batch = []
+
+        if len(batch) > 0:
+            self.__insertHistoryBatch(batch)
+            imported += len(batch)
+
+        self.__commit(ladder)
+        return imported
+
+    def __insertHistoryBatch(self, batch):
+        self.cursor.executemany("INSERT INTO Challenges (IssuedByID, OpponentID, Time, State, Won) VALUES (%s, %s, %s, %s, %s);", batch)
+
+
+##### CONFIGURATION #####
+
+    # Default value of every configuration attribute
+    defaultConfig = [
+        ('ranking_channel', 0),
+        ('general_channel', 0),
+        ('ladder_role', 0),
+        ('admin_role', 0),
+        ('challenge_timeout', 3),
+        ('current_ladder', 'default'),
+        ('num_cancels', 3),
+        ('outgoing_cooldown', 1),
+        ('challenge_protection', 1),
+        ('ranking_message', 0),
+        ('signup_only', 0),
+        ('rank_range', 3),
+        ('show_ratings', 0),
+        ('rating_initial', 1500),
+        ('rating_k_factor', 32),
+        ('snapshot_interval', 100),
+        ('tier_layout', 'pyramid'),
+        ('user_rate_limit', '5/10'),
+        ('guild_rate_limit', '60/10'),
+        ('replica_max_lag', 5),
+        ('watchdog_threshold', 0),
+        ('notify_challengeable', 0),
+        ('matchmaking_interval', 0),
+        ('announce_movements', 0),
+        ('warm_state_interval', 0),
+        ('trace_sample_rate', 0),
+        ('trace_slow_ms', 0)
+    ]
+
+    # Creates 'Config' table if it doesn't exist yet
+    def __initConfigTable(self):
+        if not self.__doesTableExist('Config'):
+            self.cursor.execute("""
+            CREATE TABLE Config (
+                ConfigID INT AUTO_INCREMENT,
+                Ladder varchar(255),
+                Name varchar(255) NOT NULL,
+                Value varchar(255) NOT NULL,
+                PRIMARY KEY (ConfigID)
+            );""")
+
+            print('Created table "Config".')
+
+        # Adds attributes that were introduced after the table was created
+        self.cursor.execute("SELECT DISTINCT Name FROM Config;")
+        existingNames = [row[0] for row in self.cursor.fetchall()]
+        missingConfig = [(name, value) for name, value in LadderDatabase.defaultConfig if name not in existingNames]
+
+        if len(missingConfig) > 0:
+            self.cursor.executemany("INSERT INTO Config (Name, Value) VALUES (%s, %s);", missingConfig)
+            self.database.commit()
+
+    # Loads all configuration attributes into memory with one query
+    # Changes made through setConfig are kept in sync, changes made directly in the database need a restart
+    def __loadConfig(self):
+        self.cursor.execute("SELECT Name, Value FROM Config ORDER BY ConfigID;")
+        config = {}
+
+        for name, value in self.cursor.fetchall():
+            if name not in config:
+                config[name] = value
+
+        self.config = config
+
+    # Gets the value of a configuration attribute by name
+    def getConfig(self, name, ladder = ''):
+        if ladder == '':
+            if name not in self.config:
+                raise Exception(f"Invalid configuration name '{name}' for ladder '{ladder}'")
+
+            return self.config[name]
+        else:
+            self.cursor.execute("SELECT Value FROM Config WHERE Name=%s AND Ladder=%s LIMIT 1;", (name, ladder,))
+
+        result = self.cursor.fetchall()
+        if len(result) == 0:
+            raise Exception(f"Invalid configuration name '{name}' for ladder '{ladder}'")
+        else:
+            return result[0][0]
+
+    # Sets the value of a configuration attribute by name
+    @readWrite
+    def setConfig(self, name, value, ladder = ''):
+        if ladder == '':
+            self.cursor.execute("UPDATE Config SET Value=%s WHERE Name=%s;", (value, name,))
+
+            if name in self.config:
+                self.config[name] = str(value)
+
+            if name == 'replica_max_lag' and self.replicas is not None:
+                self.replicas.setMaxLag(float(value))
+        else:
+            self.cursor.execute("UPDATE Config SET Value=%s WHERE Name=%s AND Ladder=%s;", (value, name, ladder,))
+
+        self.__commit(ladder if not ladder == '' else None)
+
+    # Checks if a user is a ladder admin
+    def isLadderAdmin(self, member):
+        adminRoleID = int(self.getConfig('admin_role'))
         for role in member.roles:
             if role.id == adminRoleID:
                 return True
@@ -718,6 +2067,8 @@ class LadderDatabase:
 
 
 class ChallengeInfo:
+    __slots__ = ('challengeID', 'challenger', 'opponent', 'deadline', 'won')
+
     def __init__(self, challengeID, challengerDiscordID, opponentDiscordID, deadline: datetime.datetime, won = None):
         self.challengeID = challengeID
         self.challenger = challengerDiscordID
@@ -726,11 +2077,15 @@ class ChallengeInfo:
         self.won = won
 
 class TimeoutInfo:
+    __slots__ = ('outgoingTimeout', 'incomingTimeout')
+
     def __init__(self, challengeTimeoutDeadline, protectionDeadline):
         self.outgoingTimeout = challengeTimeoutDeadline
         self.incomingTimeout = protectionDeadline
 
 class PlayerInfo:
+    __slots__ = ('playerID', 'discordID', 'rank', 'tier', 'wins', 'losses', 'titles', 'lastOpponent')
+
     def __init__(self, playerID, discordID, rank, tier, wins, losses, titles, lastOpponentID):
         self.playerID = playerID
         self.discordID = discordID
@@ -742,8 +2097,92 @@ class PlayerInfo:
         self.lastOpponent = lastOpponentID
 
 class CancelInfo:
+    __slots__ = ('challenger', 'challengerCancels', 'opponent', 'opponentCancels')
+
     def __init__(self, challenger, challengerCancels, opponent, opponentCancels):
         self.challenger = challenger
         self.challengerCancels = challengerCancels
         self.opponent = opponent
         self.opponentCancels = opponentCancels
+
+class PlayerStats:
+    __slots__ = ('discordID', 'currentStreak', 'longestWinStreak', 'longestLossStreak', 'recentForm')
+    formLength = 10
+
+    def __init__(self, discordID, currentStreak = 0, longestWinStreak = 0, longestLossStreak = 0, recentForm = ''):
+        self.discordID = discordID
+        self.currentStreak = currentStreak
+        self.longestWinStreak = longestWinStreak
+        self.longestLossStreak = longestLossStreak
+        self.recentForm = recentForm
+
+    # Returns streaks and form as list, as stored in report events
+    def toList(self):
+        return [self.currentStreak, self.longestWinStreak, self.longestLossStreak, self.recentForm]
+
+    # Updates streaks and form with the result of a new game
+    def addResult(self, won):
+        if won:
+            self.currentStreak = self.currentStreak + 1 if self.currentStreak > 0 else 1
+            self.longestWinStreak = max(self.longestWinStreak, self.currentStreak)
+            self.recentForm = (self.recentForm + 'W')[-PlayerStats.formLength:]
+        else:
+            self.currentStreak = self.currentStreak - 1 if self.currentStreak < 0 else -1
+            self.longestLossStreak = max(self.longestLossStreak, -self.currentStreak)
+            self.recentForm = (self.recentForm + 'L')[-PlayerStats.formLength:]
+
+class HeadToHeadInfo:
+    __slots__ = ('discordID', 'opponent', 'wins', 'losses')
+
+    def __init__(self, discordID, opponentDiscordID, wins, losses):
+        self.discordID = discordID
+        self.opponent = opponentDiscordID
+        self.wins = wins
+        self.losses = losses
+
+class TierRecordInfo:
+    __slots__ = ('tier', 'wins', 'losses')
+
+    def __init__(self, tier, wins, losses):
+        self.tier = tier
+        self.wins = wins
+        self.losses = losses
+
+# Ranking of a ladder stored column by column in typed arrays, which takes a fraction of the memory of one PlayerInfo per player
+# Indexing or iterating creates PlayerInfo records on demand
+class RankingSnapshot:
+    __slots__ = ('playerIDs', 'discordIDs', 'ranks', 'tiers', 'wins', 'losses', 'titles', 'lastOpponents')
+
+    # Creates the snapshot from (PlayerID, DiscordID, Rank, Tier, Wins, Losses, Titles, LastOpponent) rows ordered by rank
+    def __init__(self, rows = ()):
+        self.playerIDs = array.array('q')
+        self.discordIDs = array.array('q')
+        self.ranks = array.array('i')
+        self.tiers = array.array('i')
+        self.wins = array.array('i')
+        self.losses = array.array('i')
+        self.titles = array.array('i')
+        # 0 if the player didn't play yet
+        self.lastOpponents = array.array('q')
+
+        for row in rows:
+            self.playerIDs.append(row[0])
+            self.discordIDs.append(row[1])
+            self.ranks.append(row[2])
+            self.tiers.append(row[3])
+            self.wins.append(row[4])
+            self.losses.append(row[5])
+            self.titles.append(row[6])
+            self.lastOpponents.append(row[7] if row[7] is not None else 0)
+
+    def __len__(self):
+        return len(self.ranks)
+
+    def __getitem__(self, index):
+        lastOpponent = self.lastOpponents[index]
+        return PlayerInfo(self.playerIDs[index], self.discordIDs[index], self.ranks[index], self.tiers[index], self.wins[index], self.losses[index],
+        self.titles[index], lastOpponent if not lastOpponent == 0 else None)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
@@ -0,0 +1,135 @@
+import ladderrules
+
+# Changes of the ranking between two updates of the ranking message.
+# RankingTracker keeps the ladder state of the last update (see ladderevents.LadderState) and applies the events that were logged since,
+# so a reported game costs O(1) no matter how large the ladder is. Kicks, signups and shuffles move up to every player below them anyway.
+# Anything that isn't in the event log (imports, disputes, season changes, manual edits) is detected by comparing the tracked state
+# with the displayed ranking, after which the tracker starts over from the database.
+
+
+class RankingDiff:
+    def __init__(self):
+        # (winner Discord ID, loser Discord ID, new rank of the winner) of every game that swapped ranks
+        self.swaps = []
+        # (Discord ID, old tier, new tier) of every player who changed tier
+        self.tierChanges = []
+        # Discord ID of the player who took #1, None if #1 didn't change hands
+        self.newChampion = None
+        # Discord IDs of kicked players
+        self.kicks = []
+
+        # Ranks whose row in the ranking changed
+        self.changedRanks = set()
+        # True if every row may have changed, e.g. after a shuffle
+        self.changedAll = False
+
+    def hasAnnouncements(self):
+        return len(self.swaps) > 0 or len(self.tierChanges) > 0 or self.newChampion is not None or len(self.kicks) > 0
+
+class RankingTracker:
+    def __init__(self):
+        self.ladder = None
+        self.state = None
+        # Last event that is included in state
+        self.lastEventID = None
+
+    def reset(self, ladder, state, lastEventID):
+        self.ladder = ladder
+        self.state = state
+        self.lastEventID = lastEventID
+
+    # Applies (EventID, type, data) events and returns the changes, or None if they can't be followed and the tracker has to be reset
+    # getTierIndex(playerCount) returns the laddertiers.TierIndex of the ladder with the given number of players
+    def applyEvents(self, events, getTierIndex):
+        diff = RankingDiff()
+
+        for eventID, eventType, data in events:
+            # Disputes replay part of the history, which isn't mirrored here
+            if eventType == 'dispute':
+                return None
+
+            # Games of players the tracker doesn't know about mean that it missed something
+            if eventType == 'report' and not (data['challenger'] in self.state.players and data['opponent'] in self.state.players):
+                return None
+
+            if eventType == 'report':
+                self.__applyReport(data, diff, getTierIndex)
+            elif eventType in ['signup', 'kick', 'shuffle']:
+                self.__applyRankChanges(eventType, data, diff, getTierIndex)
+
+            self.lastEventID = eventID
+
+        return diff
+
+    def __applyReport(self, data, diff, getTierIndex):
+        challenger = self.state.players[data['challenger']]
+        opponent = self.state.players[data['opponent']]
+
+        tierIndex = getTierIndex(len(self.state.players))
+        oldRanks = (challenger.rank, opponent.rank)
+        swapped = ladderrules.shouldSwapRanks(challenger.rank, opponent.rank, data['won'])
+
+        self.state.applyEvent('report', data)
+
+        # Both rows show a new record, even if the ranks stayed
+        diff.changedRanks.update([challenger.rank, opponent.rank])
+
+        if not swapped:
+            return
+
+        winner, loser = (challenger, opponent) if data['won'] else (opponent, challenger)
+        diff.swaps += [(winner.discordID, loser.discordID, winner.rank)]
+
+        if winner.rank == 1:
+            diff.newChampion = winner.discordID
+
+        for player, oldRank in zip((challenger, opponent), oldRanks):
+            oldTier = tierIndex.getTier(oldRank)
+            newTier = tierIndex.getTier(player.rank)
+
+            if not oldTier == newTier:
+                diff.tierChanges += [(player.discordID, oldTier, newTier)]
+
+    def __applyRankChanges(self, eventType, data, diff, getTierIndex):
+        oldTierIndex = getTierIndex(len(self.state.players))
+        oldRanks = dict([(playerID, player.rank) for playerID, player in self.state.players.items()])
+
+        if eventType == 'kick':
+            kickedPlayer = self.state.players.get(data['playerID'])
+            if kickedPlayer is not None:
+                diff.kicks += [kickedPlayer.discordID]
+                diff.changedRanks.add(kickedPlayer.rank)
+
+        self.state.applyEvent(eventType, data)
+
+        if eventType == 'shuffle':
+            diff.changedAll = True
+            return
+
+        newTierIndex = getTierIndex(len(self.state.players))
+
+        for playerID, player in self.state.players.items():
+            oldRank = oldRanks.get(playerID)
+
+            if oldRank is None or not oldRank == player.rank:
+                diff.changedRanks.add(player.rank)
+
+            if oldRank is not None and not oldTierIndex.getTier(oldRank) == newTierIndex.getTier(player.rank):
+                diff.tierChanges += [(player.discordID, oldTierIndex.getTier(oldRank), newTierIndex.getTier(player.rank))]
+
+        # The row of the last rank disappears after a kick
+        if eventType == 'kick':
+            diff.changedRanks.add(len(self.state.players) + 1)
+
+    # Returns true if the tracked state agrees with a RankingSnapshot read from the database
+    def matches(self, ladder, ranking):
+        if not self.ladder == ladder or self.state is None:
+            return False
+
+        for i in range(len(ranking)):
+            player = self.state.players.get(ranking.playerIDs[i])
+
+            if player is None or not (player.rank, player.wins, player.losses, player.titles) == (ranking.ranks[i], ranking.wins[i], ranking.losses[i], ranking.titles[i]):
+                return False
+
+        return True
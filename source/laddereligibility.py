@@ -0,0 +1,65 @@
+# NumPy is only needed to evaluate all pairs of large ladders at once. Without it the same pairs are found in plain Python.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Decides for all pairs of players of a ladder at once who could challenge whom right now.
+# Players are indexed by rank - 1. The rank and tier condition (ladderrules.isPossibleChallenge) only depends on the size of the ladder,
+# the tier layout and 'rank_range', so it's computed once as a boolean matrix and reused. Timeouts, pending challenges and last opponents
+# change with every game and are applied to it as row and column masks.
+
+
+class EligibilityMatrix:
+    def __init__(self, tierIndex, rankRange):
+        self.playerCount = tierIndex.playerCount
+
+        # challengeableRanks[i] is the (first, last) rank the player with rank i + 1 could challenge, or None
+        self.challengeableRanks = [tierIndex.getChallengeableRanks(rank, rankRange) for rank in range(1, self.playerCount + 1)]
+
+        # rankMask[i, j] is true if the player with rank i + 1 could challenge the one with rank j + 1 based on rank and tier
+        self.rankMask = None
+
+        if numpy is not None:
+            firstRanks = numpy.array([ranks[0] if ranks is not None else 1 for ranks in self.challengeableRanks], dtype = numpy.int64)
+            lastRanks = numpy.array([ranks[1] if ranks is not None else 0 for ranks in self.challengeableRanks], dtype = numpy.int64)
+            ranks = numpy.arange(1, self.playerCount + 1, dtype = numpy.int64)
+
+            self.rankMask = (ranks[numpy.newaxis, :] >= firstRanks[:, numpy.newaxis]) & (ranks[numpy.newaxis, :] <= lastRanks[:, numpy.newaxis])
+
+            # Small ladders with skipped tiers can put #1 into its own range
+            numpy.fill_diagonal(self.rankMask, False)
+
+    # Returns every challenge that could be issued right now as (challenger rank, opponent rank), ordered by challenger rank.
+    # canChallenge[i]: The player with rank i + 1 isn't on cooldown and not in a pending challenge
+    # canBeChallenged[i]: The player with rank i + 1 isn't protected and not in a pending challenge
+    # lastOpponentRanks[i]: Rank of the last opponent of the player with rank i + 1, 0 if there is none
+    def getOpenMatchups(self, canChallenge, canBeChallenged, lastOpponentRanks):
+        if self.rankMask is None:
+            return self.__getOpenMatchupsPython(canChallenge, canBeChallenged, lastOpponentRanks)
+
+        canChallenge = numpy.asarray(canChallenge, dtype = bool)
+        canBeChallenged = numpy.asarray(canBeChallenged, dtype = bool)
+        lastOpponentRanks = numpy.asarray(lastOpponentRanks, dtype = numpy.int64)
+
+        mask = self.rankMask & canChallenge[:, numpy.newaxis] & canBeChallenged[numpy.newaxis, :]
+
+        # Nobody can challenge their last opponent again
+        challengers = numpy.flatnonzero(lastOpponentRanks > 0)
+        mask[challengers, lastOpponentRanks[challengers] - 1] = False
+
+        challengerIndices, opponentIndices = numpy.nonzero(mask)
+        return list(zip((challengerIndices + 1).tolist(), (opponentIndices + 1).tolist()))
+
+    def __getOpenMatchupsPython(self, canChallenge, canBeChallenged, lastOpponentRanks):
+        matchups = []
+
+        for i, ranks in enumerate(self.challengeableRanks):
+            if ranks is None or not canChallenge[i]:
+                continue
+
+            for opponentRank in range(ranks[0], ranks[1] + 1):
+                if canBeChallenged[opponentRank - 1] and not opponentRank == lastOpponentRanks[i] and not opponentRank == i + 1:
+                    matchups += [(i + 1, opponentRank)]
+
+        return matchups
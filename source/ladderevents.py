@@ -0,0 +1,106 @@
+import json
+
+import ladderrules
+
+# Event-sourced model of a ladder.
+# Every mutation of a ladder is stored as an event. Replaying the events on top of a snapshot reproduces the ladder state,
+# which allows taking back a single event exactly, no matter what happened afterwards.
+
+# Events that change the ranking. 'timeout' and 'dispute' events are only logged for reference.
+eventTypes = ['signup', 'kick', 'report', 'shuffle', 'timeout', 'dispute']
+
+
+class PlayerState:
+    __slots__ = ('discordID', 'rank', 'wins', 'losses', 'titles', 'lastOpponent')
+
+    def __init__(self, discordID, rank, wins = 0, losses = 0, titles = 0, lastOpponent = None):
+        self.discordID = discordID
+        self.rank = rank
+        self.wins = wins
+        self.losses = losses
+        self.titles = titles
+        self.lastOpponent = lastOpponent
+
+class LadderState:
+    def __init__(self):
+        # Maps Players.PlayerID -> PlayerState
+        self.players = {}
+
+    # Creates a state from the data column of a snapshot
+    @staticmethod
+    def fromSnapshot(data):
+        state = LadderState()
+
+        for row in json.loads(data):
+            state.players[row[0]] = PlayerState(*row[1:])
+
+        return state
+
+    # Returns the compact representation of the state stored in snapshots
+    def toSnapshot(self):
+        rows = []
+
+        for playerID, player in self.players.items():
+            rows += [[playerID, player.discordID, player.rank, player.wins, player.losses, player.titles, player.lastOpponent]]
+
+        return json.dumps(rows, separators = (',', ':'))
+
+    # Returns true if both states have the same players with the same ranks, records and last opponents
+    def matches(self, other):
+        if not self.players.keys() == other.players.keys():
+            return False
+
+        for playerID, player in self.players.items():
+            otherPlayer = other.players[playerID]
+
+            if not (player.rank, player.wins, player.losses, player.titles, player.lastOpponent) == (otherPlayer.rank, otherPlayer.wins, otherPlayer.losses, otherPlayer.titles, otherPlayer.lastOpponent):
+                return False
+
+        return True
+
+    # Applies an event to the state. Mirrors the changes LadderDatabase makes for the same operation.
+    def applyEvent(self, eventType, data):
+        if eventType == 'signup':
+            self.players[data['playerID']] = PlayerState(data['discordID'], data['rank'])
+
+        elif eventType == 'kick':
+            kickedPlayer = self.players.pop(data['playerID'], None)
+
+            # Moves all players below the kicked player up by one rank
+            if kickedPlayer is not None and kickedPlayer.rank is not None:
+                for player in self.players.values():
+                    if player.rank > kickedPlayer.rank:
+                        player.rank -= 1
+
+        elif eventType == 'report':
+            challenger = self.players[data['challenger']]
+            opponent = self.players[data['opponent']]
+            won = data['won']
+
+            if won:
+                challenger.wins += 1
+                opponent.losses += 1
+            else:
+                challenger.losses += 1
+                opponent.wins += 1
+
+            if ladderrules.shouldSwapRanks(challenger.rank, opponent.rank, won):
+                challenger.rank, opponent.rank = opponent.rank, challenger.rank
+
+            winner = challenger if won else opponent
+            if winner.rank == 1:
+                winner.titles += 1
+
+            challenger.lastOpponent = data['opponent']
+            opponent.lastOpponent = data['challenger']
+
+        elif eventType == 'shuffle':
+            for rankIndex, playerID in enumerate(data['order']):
+                if playerID in self.players:
+                    self.players[playerID].rank = rankIndex + 1
+
+def encodeEventData(data):
+    return json.dumps(data, separators = (',', ':'))
+
+def decodeEventData(data):
+    return json.loads(data)
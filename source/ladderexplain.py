@@ -0,0 +1,349 @@
+import argparse
+import datetime
+import random
+import sys
+import time
+import traceback
+
+import MySQLdb
+import MySQLdb.cursors
+
+import ladderdb
+
+# Query plan check for every SQL statement LadderDatabase issues.
+# Seeds a realistic dataset into a scratch database, runs the ladder operations the bot uses while recording their statements,
+# and then checks the EXPLAIN output of every recorded statement. Statements of methods that run on every command fail the check
+# when a table access reads more than --max-rows rows or needs a filesort or a temporary table.
+# Exits with 1 if any statement fails, so it can be run before merging changes to LadderDatabase.
+#
+# Use a scratch database! Every run adds several ladders with thousands of players. A local container works fine:
+#   docker run -d -p 3306:3306 -e MYSQL_ROOT_PASSWORD=ladder -e MYSQL_DATABASE=ladder mysql:5.7
+#   python ladderexplain.py --credentials MySQLTest.token
+
+
+# Methods that are only used by admins or offline tools: Their plans are shown, but never fail the check
+coldMethods = set(['importRoster', 'importChallengeHistory', 'streamRoster', 'streamChallengeHistory', 'recomputeRatings', 'updateAllTiers',
+'shuffleLadder', 'checkIntegrity', 'reverseReport', 'cancelAllOverdueChallenges', 'kickPlayers'])
+
+# Methods that work on the whole ladder by design: Their statements may read every player of the ladder, but not more
+ladderWideMethods = set(['getRanking', 'getRatings', 'getLadderVersion', 'addPlayers', 'getOpenMatchups'])
+
+# Private LadderDatabase functions that read the whole ladder only once every 'snapshot_interval' events, or once per ladder
+amortizedFunctions = set(['__readLadderState', '__writeSnapshot', '__writeCurrentSnapshot', '__loadTimeouts'])
+
+# Methods whose sorts are accepted: getMostPlayedOpponents sorts the few opponents of a single player by games played
+acceptedSorts = set(['getMostPlayedOpponents'])
+
+# Statements that are explained, everything else (DDL, SHOW, ...) is skipped
+explainedStatements = ('SELECT', 'UPDATE', 'DELETE', 'INSERT')
+
+
+# Cursor that records every statement before running it
+class RecordingCursor:
+    def __init__(self, cursor, recorder):
+        self.cursor = cursor
+        self.recorder = recorder
+
+    def execute(self, query, args = None):
+        self.recorder.record(query, args)
+        return self.cursor.execute(query, args)
+
+    def executemany(self, query, args):
+        args = list(args)
+        if len(args) > 0:
+            self.recorder.record(query, args[0])
+
+        return self.cursor.executemany(query, args)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+# Connection that hands out recording cursors
+class RecordingConnection:
+    def __init__(self, connection, recorder):
+        self.connection = connection
+        self.recorder = recorder
+
+    def cursor(self, *args):
+        return RecordingCursor(self.connection.cursor(*args), self.recorder)
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+class RecordedStatement:
+    def __init__(self, method, query, args, amortized):
+        self.method = method
+        self.query = query
+        # Arguments of the first execution, used for EXPLAIN
+        self.args = args
+        # Whether the statement was issued by one of the amortizedFunctions
+        self.amortized = amortized
+        self.executions = 0
+
+class StatementRecorder:
+    def __init__(self):
+        # Public LadderDatabase method that is currently running
+        self.method = None
+        # Maps (method, normalized query) -> RecordedStatement
+        self.statements = {}
+
+    def record(self, query, args):
+        key = (self.method, ' '.join(query.split()))
+
+        if key not in self.statements:
+            functionNames = set([frame.name for frame in traceback.extract_stack()])
+            self.statements[key] = RecordedStatement(self.method, query, args, len(functionNames & amortizedFunctions) > 0)
+
+        self.statements[key].executions += 1
+
+    # Makes the database record all statements it runs from now on
+    def attach(self, db):
+        db.cursor = RecordingCursor(db.cursor, self)
+        db.database = RecordingConnection(db.database, self)
+
+
+class PlanCheck:
+    def __init__(self, db, ladder, players, maxRows):
+        self.db = db
+        self.ladder = ladder
+        self.players = players
+        self.maxRows = maxRows
+        self.recorder = StatementRecorder()
+
+    # Runs a public LadderDatabase method and attributes its statements to it
+    def run(self, method, *args):
+        self.recorder.method = method
+        result = getattr(self.db, method)(*args)
+
+        # Consumes streamed results, so their statements complete
+        if method.startswith('stream'):
+            result = list(result)
+
+        self.recorder.method = None
+        return result
+
+    # Adds a ladder with players, history, pending challenges and statistics
+    def seedLadder(self, ladder, playerCount, challengeCount, rng):
+        firstID = rng.randrange(10**17, 10**18)
+        discordIDs = [firstID + i for i in range(playerCount)]
+
+        self.run('importRoster', [{'DiscordID': discordID, 'Wins': rng.randint(0, 50), 'Losses': rng.randint(0, 50)} for discordID in discordIDs], ladder)
+
+        start = datetime.datetime.now() - datetime.timedelta(days = 365)
+        history = []
+
+        for i in range(challengeCount):
+            challenger, opponent = rng.sample(discordIDs, 2)
+            state = rng.choices(['played', 'cancelled', 'denied', 'timeout'], [90, 4, 3, 3])[0]
+            won = rng.randint(0, 1) if state == 'played' else None
+            history += [{'Challenger': challenger, 'Opponent': opponent, 'Time': start + datetime.timedelta(minutes = i), 'State': state, 'Won': won}]
+
+        # A few games are still in progress
+        busyIDs = rng.sample(discordIDs, playerCount // 10)
+        for i in range(0, len(busyIDs) - 1, 2):
+            history += [{'Challenger': busyIDs[i], 'Opponent': busyIDs[i + 1], 'Time': datetime.datetime.now() + datetime.timedelta(hours = 3), 'State': 'pending', 'Won': None}]
+
+        self.run('importChallengeHistory', history, ladder)
+
+        # Statistics are usually built up game by game, so they are inserted directly
+        cursor = self.db.database.connection.cursor()
+        cursor.executemany("INSERT INTO PlayerStats (DiscordID, Ladder, CurrentStreak, LongestWinStreak, LongestLossStreak, RecentForm) VALUES (%s, %s, %s, %s, %s, %s);",
+        [(discordID, ladder, rng.randint(-5, 5), rng.randint(0, 10), rng.randint(0, 10), 'WLWLW') for discordID in discordIDs])
+        cursor.executemany("INSERT IGNORE INTO HeadToHead (DiscordID, OpponentDiscordID, Ladder, Wins, Losses) VALUES (%s, %s, %s, %s, %s);",
+        [(row['Challenger'], row['Opponent'], ladder, 1, 0) for row in history] + [(row['Opponent'], row['Challenger'], ladder, 0, 1) for row in history])
+        cursor.executemany("INSERT IGNORE INTO TierRecords (DiscordID, Ladder, Tier, Wins, Losses) VALUES (%s, %s, %s, %s, %s);",
+        [(discordID, ladder, tier, rng.randint(0, 20), rng.randint(0, 20)) for discordID in discordIDs for tier in range(1, 4)])
+        cursor.close()
+        self.db.database.commit()
+
+        return discordIDs
+
+    def seed(self, otherLadders, challengesPerPlayer, rng):
+        for i in range(otherLadders):
+            print(f"Seeding ladder {i + 1} of {otherLadders + 1}...")
+            self.seedLadder(f"{self.ladder}-other{i}", self.players, self.players * challengesPerPlayer, rng)
+
+        print(f"Seeding ladder {otherLadders + 1} of {otherLadders + 1}...")
+        discordIDs = self.seedLadder(self.ladder, self.players, self.players * challengesPerPlayer, rng)
+        self.db.recomputeRatings(self.ladder)
+
+        # Table statistics decide the plans, so they have to be up to date
+        cursor = self.db.database.connection.cursor()
+        for tableName in ['Players', 'Challenges', 'PlayerStats', 'HeadToHead', 'TierRecords', 'Ratings', 'RatingChanges', 'Events', 'Snapshots', 'Config']:
+            cursor.execute(f"ANALYZE TABLE {tableName};")
+            cursor.fetchall()
+        cursor.close()
+
+        return discordIDs
+
+    # Runs everything the bot does during a season on the seeded ladder
+    def exercise(self, discordIDs, games, rng):
+        ladder = self.ladder
+
+        for discordID in rng.sample(discordIDs, 20):
+            opponentID = rng.choice(discordIDs)
+
+            self.run('isPlayerSignedUp', discordID, ladder)
+            self.run('getPlayerInfo', discordID, ladder)
+            self.run('getPlayerByRank', rng.randint(1, len(discordIDs)), ladder)
+            self.run('getTimeoutInfo', discordID, ladder)
+            self.run('hasChallengeTimeout', discordID, ladder)
+            self.run('hasChallengeProtection', discordID, ladder)
+            self.run('getActiveChallenge', discordID, ladder)
+            self.run('getLastPlayedChallenge', discordID, ladder)
+            self.run('getPossibleChallenges', discordID, ladder)
+            self.run('canChallengeBasedOnRank', discordID, opponentID, ladder)
+            self.run('getPlayerStats', discordID, ladder)
+            self.run('getHeadToHead', discordID, opponentID, ladder)
+            self.run('getMostPlayedOpponents', discordID, 5, ladder)
+            self.run('getTierRecords', discordID, ladder)
+            self.run('getRating', self.db.getPlayerInfo(discordID, ladder).playerID)
+
+        self.run('getRanking', ladder)
+        self.run('getRatings', ladder)
+        self.run('getLowestRank', ladder)
+        self.run('getLadderVersion', ladder)
+        self.run('getOpenMatchups', ladder)
+
+        # Plays games between players that can challenge each other
+        played = 0
+        lastChallenge = None
+
+        for discordID in rng.sample(discordIDs, len(discordIDs)):
+            if played >= games:
+                break
+
+            if self.db.getActiveChallenge(discordID, ladder) is not None:
+                continue
+
+            possibleChallenges = self.db.getPossibleChallenges(discordID, ladder)
+            if len(possibleChallenges) == 0:
+                continue
+
+            self.run('addChallenge', discordID, rng.choice(possibleChallenges), ladder)
+            lastChallenge = self.run('getActiveChallenge', discordID, ladder)
+            self.run('reportResult', lastChallenge, rng.random() < 0.5, ladder)
+            self.run('giveChallengeCooldown', discordID, 1, ladder)
+            self.run('giveChallengeProtection', lastChallenge.opponent, 1, ladder)
+            self.run('getLadderVersion', ladder)
+            played += 1
+
+        if lastChallenge is not None:
+            disputedChallenge = self.run('getLastPlayedChallenge', lastChallenge.challenger, ladder)
+            self.run('reverseReport', lastChallenge.challenger, disputedChallenge, ladder)
+
+        # Cancels a game
+        for discordID in discordIDs:
+            if self.db.getActiveChallenge(discordID, ladder) is not None:
+                self.run('cancelActiveChallenge', discordID, ladder)
+                self.run('updateCancelCounter', discordID, 1, ladder)
+                break
+
+        # Signups and kicks
+        newIDs = [discordIDs[-1] + i + 1 for i in range(5)]
+        self.run('addPlayers', newIDs, ladder)
+        self.run('kickPlayers', [newIDs[0], discordIDs[len(discordIDs) // 2]], ladder)
+
+        # Admin and maintenance operations
+        self.run('cancelAllOverdueChallenges', ladder)
+        self.run('checkIntegrity', ladder)
+        self.run('streamRoster', ladder)
+        self.run('streamChallengeHistory', ladder)
+        self.run('recomputeRatings', ladder)
+        self.run('updateAllTiers', ladder)
+        self.run('shuffleLadder', ladder)
+
+    # Returns the EXPLAIN rows of a statement as dictionaries
+    def explain(self, statement):
+        cursor = self.db.database.connection.cursor(MySQLdb.cursors.DictCursor)
+
+        try:
+            cursor.execute('EXPLAIN ' + statement.query.strip(), statement.args)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    # Returns the reasons why a plan fails the check
+    def checkPlan(self, statement, plan):
+        if statement.method in coldMethods:
+            return []
+
+        # Estimates are not exact, so ladder-wide statements get some headroom
+        maxRows = self.maxRows
+        if statement.method in ladderWideMethods or statement.amortized:
+            maxRows = max(maxRows, int(self.players * 1.5))
+
+        problems = []
+
+        for row in plan:
+            rows = row.get('rows') or 0
+            extra = row.get('Extra') or ''
+
+            if rows > maxRows:
+                problems += [f"reads ~{rows} rows of {row.get('table')} (access type {row.get('type')}, key {row.get('key')})"]
+            if statement.method in acceptedSorts:
+                continue
+
+            if 'Using filesort' in extra:
+                problems += [f"sorts {row.get('table')} with a filesort"]
+            if 'Using temporary' in extra:
+                problems += [f"uses a temporary table for {row.get('table')}"]
+
+        return problems
+
+    # Explains all recorded statements, prints the results and returns the number of failed statements
+    def report(self, verbose):
+        failures = 0
+
+        for statement in sorted(self.recorder.statements.values(), key = lambda statement: (str(statement.method), statement.query)):
+            if statement.method is None or not statement.query.strip().upper().startswith(explainedStatements):
+                continue
+
+            plan = self.explain(statement)
+            problems = self.checkPlan(statement, plan)
+            query = ' '.join(statement.query.split())
+
+            if len(problems) > 0:
+                failures += 1
+                print(f"FAIL {statement.method}: {query[:150]}")
+                for problem in problems:
+                    print(f"     {problem}")
+            elif verbose:
+                status = 'cold' if statement.method in coldMethods else 'ok'
+                print(f"{status:<4} {statement.method}: {query[:150]}")
+
+            if len(problems) > 0 or verbose:
+                for row in plan:
+                    print(f"       {row.get('table')}: type={row.get('type')} key={row.get('key')} rows={row.get('rows')} extra={row.get('Extra')}")
+
+        print(f"{len(self.recorder.statements)} statements recorded, {failures} failed the plan check")
+        return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Checks the query plans of all LadderDatabase statements against a seeded scratch database.')
+    parser.add_argument('--players', type = int, default = 5000, help = 'Number of players per seeded ladder')
+    parser.add_argument('--other-ladders', type = int, default = 3, help = 'Number of additional ladders, so queries have to filter by ladder')
+    parser.add_argument('--challenges-per-player', type = int, default = 20, help = 'Number of historical challenges per player')
+    parser.add_argument('--games', type = int, default = 200, help = 'Number of games played through LadderDatabase')
+    parser.add_argument('--max-rows', type = int, default = 1000, help = 'Maximum estimated rows per table access on hot paths')
+    parser.add_argument('--seed', type = int, default = 0, help = 'Seed of the generated dataset')
+    parser.add_argument('--verbose', action = 'store_true', help = 'Shows the plans of all statements, not only the failed ones')
+    parser.add_argument('--credentials', default = 'MySQL.token', help = 'MySQL token file of a scratch database')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    db = ladderdb.LadderDatabase(args.credentials)
+    check = PlanCheck(db, f"explain-{int(time.time())}", args.players, args.max_rows)
+
+    check.recorder.attach(db)
+    discordIDs = check.seed(args.other_ladders, args.challenges_per_player, rng)
+
+    print('Running ladder operations...')
+    check.exercise(discordIDs, args.games, rng)
+
+    if check.report(args.verbose) > 0:
+        sys.exit(1)
@@ -0,0 +1,92 @@
+import csv
+import datetime
+import json
+import re
+
+# Reads and writes ladder rosters and challenge histories as CSV or JSON Lines files.
+# Rows are streamed one at a time in both directions, so files of any size are handled in constant memory.
+
+exportKinds = ['roster', 'history']
+
+# Returns the file format based on the file name: 'csv' or 'jsonl'
+def getFormat(fileName):
+    if fileName.lower().endswith('.csv'):
+        return 'csv'
+    elif fileName.lower().endswith('.jsonl') or fileName.lower().endswith('.json'):
+        return 'jsonl'
+    else:
+        raise ValueError(f"Unsupported file type '{fileName}', use .csv or .jsonl")
+
+# Returns the name of an export file. Characters that aren't allowed in file names on every system are replaced, e.g. '/' in ladder names.
+def getExportFileName(ladder, kind, fileFormat):
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', f"{ladder}-{kind}") + f".{fileFormat}"
+
+def _toValue(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep = ' ')
+    else:
+        return value
+
+# Writes rows (tuples in the order of columns) to an open text file and returns the number of rows written
+def writeRows(fileObject, fileFormat, columns, rows):
+    count = 0
+
+    if fileFormat == 'csv':
+        writer = csv.writer(fileObject)
+        writer.writerow(columns)
+
+        for row in rows:
+            writer.writerow(['' if value is None else _toValue(value) for value in row])
+            count += 1
+    else:
+        for row in rows:
+            fileObject.write(json.dumps(dict(zip(columns, [_toValue(value) for value in row]))) + '\n')
+            count += 1
+
+    return count
+
+# Yields the rows of an open text file as dictionaries
+def readRows(fileObject, fileFormat):
+    if fileFormat == 'csv':
+        for row in csv.DictReader(fileObject):
+            yield row
+    else:
+        for line in fileObject:
+            if not line.strip() == '':
+                yield json.loads(line)
+
+# Number of rows between two progress reports
+progressInterval = 10000
+
+# Yields the rows and, if report is given, calls it with a progress message after every progressInterval rows
+def reportProgress(rows, report, verb):
+    count = 0
+
+    for row in rows:
+        yield row
+        count += 1
+
+        if report is not None and count % progressInterval == 0:
+            report(f"{verb} {count} rows...")
+
+# Exports the roster or challenge history of a ladder to a file and returns the number of exported rows
+def exportToFile(db, kind, fileName, ladder = '', report = None):
+    if kind == 'roster':
+        columns = db.rosterColumns
+        rows = db.streamRoster(ladder)
+    else:
+        columns = db.historyColumns
+        rows = db.streamChallengeHistory(ladder)
+
+    with open(fileName, 'w', newline = '', encoding = 'utf-8') as fileObject:
+        return writeRows(fileObject, getFormat(fileName), columns, reportProgress(rows, report, 'Exported'))
+
+# Imports a roster or challenge history from a file into a ladder and returns the number of imported rows
+def importFromFile(db, kind, fileName, ladder = '', report = None):
+    with open(fileName, 'r', newline = '', encoding = 'utf-8') as fileObject:
+        rows = reportProgress(readRows(fileObject, getFormat(fileName)), report, 'Read')
+
+        if kind == 'roster':
+            return db.importRoster(rows, ladder)
+        else:
+            return db.importChallengeHistory(rows, ladder)
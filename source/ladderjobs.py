@@ -0,0 +1,173 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import multiprocessing
+import queue
+
+import ladderdb
+import ladderio
+
+# Runs heavy admin operations (shuffles, rating recalculations, integrity checks, imports, exports, season rollovers)
+# in a pool of worker processes with their own database connections, so they don't block the event loop of the bot.
+# Jobs of the same ladder run one after another. Workers send progress messages back through a queue.
+# The bot doesn't change a ladder while a job of it runs: Commands that change it wait until the job is done (see changingLadder)
+# and a job only starts once the running ones are done. Otherwise the bot's writes could be overwritten by the job or wait for its row locks,
+# which blocks the event loop.
+# Workers write to the database behind the back of the bot's LadderDatabase, so the bot has to call LadderDatabase.refresh after every job.
+
+
+# Database connection of a worker process, see initWorker
+workerDatabase = None
+
+def initWorker(credentialFile):
+    global workerDatabase
+    workerDatabase = ladderdb.LadderDatabase(credentialFile)
+
+def shuffleJob(db, report, ladder):
+    db.shuffleLadder(ladder)
+
+def recomputeRatingsJob(db, report, ladder):
+    db.recomputeRatings(ladder)
+
+def updateTiersJob(db, report, ladder):
+    db.updateAllTiers(ladder)
+
+def integrityJob(db, report, ladder):
+    return db.checkIntegrity(ladder)
+
+def exportJob(db, report, ladder, kind, fileName):
+    return ladderio.exportToFile(db, kind, fileName, ladder, report)
+
+def importJob(db, report, ladder, kind, fileName):
+    count = ladderio.importFromFile(db, kind, fileName, ladder, report)
+
+    # Ratings depend on the whole history
+    if kind == 'history':
+        report(f"Imported {count} games, recalculating ratings...")
+        db.recomputeRatings(ladder)
+
+    return count
+
+def seasonJob(db, report, ladder, newLadder, seeding):
+    return db.startSeason(newLadder, seeding)
+
+# Jobs by name. Every job gets the worker's LadderDatabase, a function to report progress and the ladder, followed by its own arguments.
+jobs = {
+    'shuffle': shuffleJob,
+    'recomputeRatings': recomputeRatingsJob,
+    'updateTiers': updateTiersJob,
+    'integrity': integrityJob,
+    'export': exportJob,
+    'import': importJob,
+    'season': seasonJob
+}
+
+# Runs a job in a worker process
+def runJob(jobID, name, ladder, args, progressQueue):
+    # The worker might have cached configuration or read snapshots from before the bot changed something
+    workerDatabase.refresh(ladder)
+
+    def report(message):
+        progressQueue.put((jobID, message))
+
+    return jobs[name](workerDatabase, report, ladder, *args)
+
+class JobRunner:
+    # Number of worker processes
+    workerCount = 2
+
+    # Seconds between two checks for progress messages
+    progressInterval = 1.0
+
+    def __init__(self, credentialFile):
+        # New processes instead of forks, so workers don't inherit the connections and the event loop of the bot
+        context = multiprocessing.get_context('spawn')
+
+        self.manager = context.Manager()
+        self.progressQueue = self.manager.Queue()
+        self.pool = concurrent.futures.ProcessPoolExecutor(JobRunner.workerCount, mp_context = context, initializer = initWorker, initargs = (credentialFile,))
+
+        self.ladderLocks = {}
+        # Maps ladder -> number of changes of the bot to the ladder that are running, see changingLadder
+        self.ladderChanges = {}
+        # Maps ladder -> condition that is notified when a job or a change of the ladder ends
+        self.ladderConditions = {}
+        self.nextJobID = 0
+        # Maps job ID -> coroutine function that is awaited with every progress message of the job
+        self.progressCallbacks = {}
+
+    # Runs a job and returns its result, exceptions of the job are raised here
+    # Waits until all earlier jobs of the same ladder and the running changes of the bot (see changingLadder) finished
+    async def run(self, name, ladder, args, progress):
+        lock = self.ladderLocks.setdefault(ladder, asyncio.Lock())
+        condition = self.ladderConditions.setdefault(ladder, asyncio.Condition())
+
+        try:
+            async with lock:
+                # New changes wait while the lock is held, so the running ones are done eventually
+                async with condition:
+                    await condition.wait_for(lambda: self.ladderChanges.get(ladder, 0) == 0)
+
+                jobID = self.nextJobID
+                self.nextJobID += 1
+                self.progressCallbacks[jobID] = progress
+
+                future = asyncio.get_event_loop().run_in_executor(self.pool, runJob, jobID, name, ladder, args, self.progressQueue)
+
+                try:
+                    while not future.done():
+                        await asyncio.wait([future], timeout = JobRunner.progressInterval)
+                        await self.__forwardProgress()
+
+                    return future.result()
+                finally:
+                    await self.__forwardProgress()
+                    del self.progressCallbacks[jobID]
+        finally:
+            # Changes that waited for the job can start now
+            async with condition:
+                condition.notify_all()
+
+    def isBusy(self, ladder):
+        lock = self.ladderLocks.get(ladder)
+        return lock is not None and lock.locked()
+
+    # Waits until no job of the ladder is running or waiting and keeps new jobs from starting until finishLadderChange is called
+    async def startLadderChange(self, ladder):
+        condition = self.ladderConditions.setdefault(ladder, asyncio.Condition())
+
+        async with condition:
+            await condition.wait_for(lambda: not self.isBusy(ladder))
+            self.ladderChanges[ladder] = self.ladderChanges.get(ladder, 0) + 1
+
+    async def finishLadderChange(self, ladder):
+        condition = self.ladderConditions[ladder]
+
+        async with condition:
+            self.ladderChanges[ladder] -= 1
+            condition.notify_all()
+
+    # Runs the code in the async with block while no job of the ladder is running
+    @contextlib.asynccontextmanager
+    async def changingLadder(self, ladder):
+        await self.startLadderChange(ladder)
+
+        try:
+            yield
+        finally:
+            await self.finishLadderChange(ladder)
+
+    async def __forwardProgress(self):
+        while True:
+            try:
+                jobID, message = self.progressQueue.get_nowait()
+            except queue.Empty:
+                return
+
+            callback = self.progressCallbacks.get(jobID)
+            if callback is not None:
+                await callback(message)
+
+    def shutdown(self):
+        self.pool.shutdown(wait = False)
+        self.manager.shutdown()
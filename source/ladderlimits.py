@@ -0,0 +1,113 @@
+import time
+
+from discord.ext import commands
+
+# In-memory command rate limiting with token buckets.
+# Rejections don't touch the database or the Discord API, so spam never reaches either.
+
+
+# Raised by the rate limit check when a command is rejected
+class RateLimited(commands.CheckFailure):
+    def __init__(self, retryAfter, notify):
+        super().__init__(f"Rate limited, retry in {retryAfter:.1f} seconds")
+        self.retryAfter = retryAfter
+        # Whether this is the first rejection since the bucket last allowed a command
+        self.notify = notify
+
+class TokenBucket:
+    def __init__(self, capacity, refillSeconds):
+        self.capacity = capacity
+        # Tokens added per second
+        self.refillRate = capacity / refillSeconds
+        self.tokens = capacity
+        self.lastUpdate = time.monotonic()
+        self.rejected = False
+
+    def __refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.lastUpdate) * self.refillRate)
+        self.lastUpdate = now
+
+    # Takes one token, returns false if there is none left
+    def consume(self, now):
+        self.__refill(now)
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            self.rejected = False
+            return True
+        else:
+            return False
+
+    # Gives a token back that was taken for a command that was rejected elsewhere
+    def refund(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    # Returns the number of seconds until the next token is available
+    def getRetryAfter(self):
+        return max(0, (1 - self.tokens) / self.refillRate)
+
+    def isFull(self, now):
+        self.__refill(now)
+        return self.tokens >= self.capacity
+
+# Parses a rate limit configuration of the form '<commands>/<seconds>', e.g. '5/10'
+def parseRateLimit(text):
+    try:
+        capacity, seconds = str(text).split('/')
+        capacity = int(capacity)
+        seconds = float(seconds)
+    except ValueError:
+        raise ValueError(f"Invalid rate limit '{text}', use <commands>/<seconds>")
+
+    if capacity < 1 or seconds <= 0:
+        raise ValueError(f"Invalid rate limit '{text}', use <commands>/<seconds>")
+
+    return capacity, seconds
+
+class RateLimiter:
+    # Buckets of idle users are dropped once there are this many
+    maxBuckets = 10000
+
+    def __init__(self, userLimit, guildLimit):
+        self.setLimits(userLimit, guildLimit)
+
+    # Sets the budgets as (capacity, seconds) tuples. Existing buckets are reset.
+    def setLimits(self, userLimit, guildLimit):
+        self.userLimit = userLimit
+        self.guildLimit = guildLimit
+        self.userBuckets = {}
+        self.guildBuckets = {}
+
+    def __getBucket(self, buckets, key, limit, now):
+        bucket = buckets.get(key)
+
+        if bucket is None:
+            if len(buckets) >= RateLimiter.maxBuckets:
+                self.__pruneBuckets(buckets, now)
+
+            bucket = TokenBucket(limit[0], limit[1])
+            buckets[key] = bucket
+
+        return bucket
+
+    # Removes all buckets that are full again, they behave the same as new ones
+    def __pruneBuckets(self, buckets, now):
+        for key in [key for key, bucket in buckets.items() if bucket.isFull(now)]:
+            del buckets[key]
+
+    # Takes a token from the user's and the guild's bucket or raises RateLimited
+    def check(self, userID, guildID):
+        now = time.monotonic()
+
+        userBucket = self.__getBucket(self.userBuckets, userID, self.userLimit, now)
+        if not userBucket.consume(now):
+            notify = not userBucket.rejected
+            userBucket.rejected = True
+            raise RateLimited(userBucket.getRetryAfter(), notify)
+
+        guildBucket = self.__getBucket(self.guildBuckets, guildID, self.guildLimit, now)
+        if not guildBucket.consume(now):
+            userBucket.refund()
+            notify = not guildBucket.rejected
+            guildBucket.rejected = True
+            raise RateLimited(guildBucket.getRetryAfter(), notify)
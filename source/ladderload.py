@@ -0,0 +1,383 @@
+import argparse
+import asyncio
+import itertools
+import random
+import time
+
+import discord
+from discord.ext import commands
+
+import ladderdb
+import ladderlimits
+import main
+
+# Offline load test for the bot commands.
+# A simulated guild with members, roles and channels sends command messages through the real commands.Bot dispatch of main.py,
+# so PlayerCommands and AdminCommands run exactly like on Discord. Only the Discord API is replaced by fakes with a configurable latency.
+# It measures the latency of every command, replies that arrive out of order and violations of the ranking integrity.
+#
+# Use a scratch database! The global configuration is changed while the test runs (and restored afterwards),
+# and every run plays its games in a new ladder.
+#
+# Example: python ladderload.py --players 200 --commands 5000 --concurrency 500 --credentials MySQLTest.token
+
+
+# Snowflake-like IDs for all fake Discord objects
+fakeIDs = itertools.count(10**17)
+
+class FakeResponse:
+    def __init__(self, status, reason):
+        self.status = status
+        self.reason = reason
+
+class FakeRole:
+    def __init__(self, name):
+        self.id = next(fakeIDs)
+        self.name = name
+        self.mention = f"<@&{self.id}>"
+
+class FakeMember:
+    def __init__(self, guild, name, roles = []):
+        self.id = next(fakeIDs)
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{self.id}>"
+        self.guild = guild
+        self.roles = list(roles)
+        self.bot = False
+
+    async def add_roles(self, *roles, reason = None):
+        await self.guild.apiCall()
+
+        for role in roles:
+            if role not in self.roles:
+                self.roles += [role]
+
+    async def remove_roles(self, *roles, reason = None):
+        await self.guild.apiCall()
+        self.roles = [role for role in self.roles if role not in roles]
+
+class FakeMessage:
+    def __init__(self, channel, author, content = '', embed = None):
+        self.id = next(fakeIDs)
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.embed = embed
+        self.attachments = []
+        self.mentions = []
+        self._state = None
+
+    async def edit(self, content = None, embed = None):
+        await self.guild.apiCall()
+
+        if content is not None:
+            self.content = content
+        if embed is not None:
+            self.embed = embed
+
+class FakeTextChannel:
+    def __init__(self, guild, name):
+        self.id = next(fakeIDs)
+        self.name = name
+        self.guild = guild
+        self.mention = f"<#{self.id}>"
+        # Maps message ID -> FakeMessage of all messages sent by the bot
+        self.messages = {}
+
+    async def send(self, content = None, embed = None, **kwargs):
+        await self.guild.apiCall()
+
+        message = FakeMessage(self, self.guild.botMember, content or '', embed)
+        self.messages[message.id] = message
+        return message
+
+    async def fetch_message(self, messageID):
+        await self.guild.apiCall()
+
+        if messageID not in self.messages:
+            raise discord.errors.NotFound(FakeResponse(404, 'Not Found'), 'Unknown Message')
+
+        return self.messages[messageID]
+
+class FakeGuild:
+    def __init__(self, playerCount, apiLatency):
+        self.id = next(fakeIDs)
+        self.name = 'Load Test'
+        self.chunked = True
+        # Seconds every Discord API call takes
+        self.apiLatency = apiLatency
+        self.apiCalls = 0
+
+        self.ladderRole = FakeRole('1v1')
+        self.adminRole = FakeRole('Ladder Admin')
+        self.roles = [self.ladderRole, self.adminRole]
+
+        self.generalChannel = FakeTextChannel(self, '1v1-general')
+        self.rankingChannel = FakeTextChannel(self, '1v1-ranking')
+        self.channels = {self.generalChannel.id: self.generalChannel, self.rankingChannel.id: self.rankingChannel}
+
+        self.botMember = FakeMember(self, 'ladderbot')
+        self.admin = FakeMember(self, 'admin', [self.adminRole])
+        self.players = [FakeMember(self, f"player{i}") for i in range(playerCount)]
+        self.members = {member.id: member for member in [self.botMember, self.admin] + self.players}
+
+    async def apiCall(self):
+        self.apiCalls += 1
+        await asyncio.sleep(self.apiLatency)
+
+    async def chunk(self):
+        pass
+
+    def get_member(self, memberID):
+        return self.members.get(memberID)
+
+    def get_member_named(self, name):
+        for member in self.members.values():
+            if member.name == name:
+                return member
+
+        return None
+
+    def get_channel(self, channelID):
+        return self.channels.get(channelID)
+
+    def get_role(self, roleID):
+        for role in self.roles:
+            if role.id == roleID:
+                return role
+
+        return None
+
+# Context whose replies go to the fake channel instead of the Discord API
+class FakeContext(commands.Context):
+    async def send(self, content = None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+
+# Returns the value at the given share of a sorted list
+def percentile(sortedValues, share):
+    return sortedValues[min(len(sortedValues) - 1, int(share * len(sortedValues)))]
+
+class LoadTest:
+    # Share of each kind of command in the generated load
+    commandWeights = [('status', 25), ('challenge', 30), ('report', 25), ('profile', 14), ('cancel', 5), ('ping', 1)]
+
+    def __init__(self, db, guild, ladder, concurrency, checkEvery, seed):
+        self.db = db
+        self.guild = guild
+        self.ladder = ladder
+        self.concurrency = concurrency
+        # Number of finished commands between two integrity checks
+        self.checkEvery = checkEvery
+        self.rng = random.Random(seed)
+
+        # Players ordered by rank as of the last integrity check, used to pick opponents that can likely be challenged
+        self.rankOrder = []
+
+        # Maps command name -> latencies in seconds
+        self.latencies = {}
+        # Maps error name -> count
+        self.errors = {}
+        # Number of commands issued and the highest finished command per user, to detect replies that overtook each other
+        self.issued = {}
+        self.lastFinished = {}
+        self.orderingAnomalies = 0
+        # Maps violation -> number of checks it was found in
+        self.violations = {}
+        self.integrityChecks = 0
+        self.finished = 0
+
+    # Points the bot of main.py at the database and the fake guild
+    def setUpBot(self):
+        main.db = self.db
+        main.rateLimiter = ladderlimits.RateLimiter((10**9, 1), (10**9, 1))
+        main.responseCache.clear()
+        main.startup.setState('ready')
+        main.startup.databaseReady.set()
+
+        main.bot._connection.user = self.guild.botMember
+        main.bot.owner_id = self.guild.admin.id
+        main.bot.add_listener(self.onCommandError, 'on_command_error')
+
+    # Configures the scratch database for the test and returns the previous values
+    def setUpConfig(self):
+        config = {
+            'current_ladder': self.ladder,
+            'general_channel': self.guild.generalChannel.id,
+            'ranking_channel': self.guild.rankingChannel.id,
+            'ranking_message': 0,
+            'ladder_role': self.guild.ladderRole.id,
+            'admin_role': self.guild.adminRole.id,
+            'signup_only': 0,
+            'outgoing_cooldown': 0,
+            'challenge_protection': 0,
+            'num_cancels': 10**6
+        }
+
+        previousConfig = {name: self.db.getConfig(name) for name in config}
+        for name, value in config.items():
+            self.db.setConfig(name, value)
+
+        return previousConfig
+
+    async def onCommandError(self, ctx, error):
+        error = getattr(error, 'original', error)
+        errorName = type(error).__name__
+        self.errors[errorName] = self.errors.get(errorName, 0) + 1
+
+    # Sends a message as the member through the bot's command dispatch and records latency and reply order
+    async def invoke(self, member, content):
+        sequence = self.issued.get(member.id, 0)
+        self.issued[member.id] = sequence + 1
+
+        message = FakeMessage(self.guild.generalChannel, member, content)
+        start = time.perf_counter()
+
+        ctx = await main.bot.get_context(message, cls = FakeContext)
+        await main.bot.invoke(ctx)
+
+        latency = time.perf_counter() - start
+        commandName = ctx.command.qualified_name if ctx.command is not None else 'unknown'
+        self.latencies.setdefault(commandName, []).append(latency)
+
+        # A later command of the same user finished first
+        if sequence < self.lastFinished.get(member.id, -1):
+            self.orderingAnomalies += 1
+        else:
+            self.lastFinished[member.id] = sequence
+
+        self.finished += 1
+        if self.finished % self.checkEvery == 0:
+            self.checkIntegrity()
+
+    def checkIntegrity(self):
+        self.integrityChecks += 1
+
+        for violation in self.db.checkIntegrity(self.ladder):
+            self.violations[violation] = self.violations.get(violation, 0) + 1
+
+        rankedIDs = [row[0] for row in self.db.streamRoster(self.ladder)]
+        self.rankOrder = [self.guild.get_member(discordID) for discordID in rankedIDs if self.guild.get_member(discordID) is not None]
+
+    # Returns the author and content of a random command
+    def nextCommand(self):
+        kinds = [kind for kind, _ in LoadTest.commandWeights]
+        weights = [weight for _, weight in LoadTest.commandWeights]
+        kind = self.rng.choices(kinds, weights)[0]
+        prefix = main.prefix
+
+        if kind == 'ping':
+            return self.guild.admin, f"{prefix}ping"
+
+        players = self.rankOrder if len(self.rankOrder) > 1 else self.guild.players
+        index = self.rng.randrange(len(players))
+        member = players[index]
+
+        if kind == 'challenge':
+            # Mostly challenges one of the next few players above, like real players do
+            if index > 0 and self.rng.random() < 0.9:
+                opponent = players[self.rng.randint(max(0, index - 3), index - 1)]
+            else:
+                opponent = self.rng.choice(players)
+
+            return member, f"{prefix}challenge {opponent.mention}"
+        elif kind == 'report':
+            return member, f"{prefix}report {self.rng.choice(['W', 'L'])}"
+        elif kind == 'profile':
+            return member, f"{prefix}profile"
+        elif kind == 'cancel':
+            return member, f"{prefix}cancel"
+        else:
+            return member, f"{prefix}challenge"
+
+    async def signUpAll(self):
+        await asyncio.gather(*[self.invoke(member, f"{main.prefix}signup") for member in self.guild.players])
+
+        # Waits until the signup queue added everyone
+        while len(main.signupQueue.pending) > 0 or main.signupQueue.flushTask is not None:
+            await asyncio.sleep(0.1)
+
+        self.checkIntegrity()
+
+    async def runCommands(self, commandCount):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def runCommand():
+            async with semaphore:
+                member, content = self.nextCommand()
+                await self.invoke(member, content)
+
+        await asyncio.gather(*[runCommand() for _ in range(commandCount)])
+
+        # Lets error listeners that were dispatched as tasks finish
+        await asyncio.sleep(0)
+        self.checkIntegrity()
+
+    # Returns true if the ranking message shows the final state of the ladder
+    def isRankingMessageCurrent(self):
+        messageID = int(self.db.getConfig('ranking_message'))
+        rankingMessage = self.guild.rankingChannel.messages.get(messageID)
+
+        if rankingMessage is None or rankingMessage.embed is None:
+            return False
+
+        return rankingMessage.embed.to_dict() == main.generateRankingEmbed(self.guild).to_dict()
+
+    def printReport(self, duration):
+        print(f"{self.finished} commands in {duration:.1f}s ({self.finished / max(duration, 1e-9):.0f}/s), {self.guild.apiCalls} simulated API calls")
+        print(f"{'command':<12} {'count':>7} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}   (ms)")
+
+        for commandName, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            mean = sum(latencies) / len(latencies)
+            values = [mean, percentile(latencies, 0.5), percentile(latencies, 0.95), percentile(latencies, 0.99), latencies[-1]]
+            print(f"{commandName:<12} {len(latencies):>7} " + ' '.join([f"{value * 1000:>9.1f}" for value in values]))
+
+        print(f"Replies out of order: {self.orderingAnomalies}")
+
+        if len(self.errors) > 0:
+            print('Command errors: ' + ', '.join([f"{name} x{count}" for name, count in sorted(self.errors.items())]))
+
+        print(f"Integrity violations: {len(self.violations)} in {self.integrityChecks} checks")
+        for violation, count in sorted(self.violations.items(), key = lambda item: -item[1])[:10]:
+            print(f"    {violation} (found {count} times)")
+
+        print(f"Ranking message up to date: {'yes' if self.isRankingMessageCurrent() else 'NO'}")
+
+
+async def runLoadTest(args):
+    db = ladderdb.LadderDatabase(args.credentials)
+    guild = FakeGuild(args.players, args.api_latency / 1000)
+    loadTest = LoadTest(db, guild, args.ladder or f"loadtest-{int(time.time())}", args.concurrency, args.check_every, args.seed)
+
+    loadTest.setUpBot()
+    previousConfig = loadTest.setUpConfig()
+
+    try:
+        print(f"Signing up {args.players} players in ladder '{loadTest.ladder}'...")
+        await loadTest.signUpAll()
+
+        print(f"Sending {args.commands} commands, at most {args.concurrency} at once...")
+        start = time.perf_counter()
+        await loadTest.runCommands(args.commands)
+        loadTest.printReport(time.perf_counter() - start)
+    finally:
+        for name, value in previousConfig.items():
+            db.setConfig(name, value)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Load tests the bot commands against a simulated Discord guild.')
+    parser.add_argument('--players', type = int, default = 100, help = 'Number of simulated players')
+    parser.add_argument('--commands', type = int, default = 2000, help = 'Number of commands sent after the signups')
+    parser.add_argument('--concurrency', type = int, default = 200, help = 'Maximum number of commands in progress at once')
+    parser.add_argument('--api-latency', type = float, default = 50, help = 'Milliseconds every simulated Discord API call takes')
+    parser.add_argument('--check-every', type = int, default = 100, help = 'Number of finished commands between two integrity checks')
+    parser.add_argument('--ladder', default = '', help = 'Name of the ladder to play in, a new one by default')
+    parser.add_argument('--seed', type = int, default = 0, help = 'Seed of the generated commands')
+    parser.add_argument('--credentials', default = 'MySQL.token', help = 'MySQL token file of a scratch database')
+    args = parser.parse_args()
+
+    main.bot.loop.run_until_complete(runLoadTest(args))
@@ -0,0 +1,164 @@
+# Matchmaking suggestions for idle players.
+# Every challenge that could be issued right now (see LadderDatabase.getOpenMatchupRanks) connects two players, which makes the ladder
+# an undirected graph. The suggestions are a maximum matching of that graph, found with Edmonds' blossom algorithm, so nobody is
+# suggested for two games and no further game could be added by rearranging the others.
+# The matching starts from the games with the closest ranks, rematches of the last game last, and keeps them wherever possible.
+# Among matchings of the maximum size it's not guaranteed to be the one with the closest ranks overall.
+
+
+# Returns a maximum matching of an undirected graph as list with the matched vertex of every vertex, -1 if unmatched
+# adjacency[v] lists the neighbours of vertex v, every edge has to be listed at both of its vertices
+# match: Matching to start from, e.g. a greedy one. It's extended in place.
+def maximumMatching(adjacency, match = None):
+    vertexCount = len(adjacency)
+
+    if match is None:
+        match = [-1] * vertexCount
+
+    # A vertex without augmenting path never gets one later, so every free vertex only needs one search
+    for root in range(vertexCount):
+        if match[root] == -1 and len(adjacency[root]) > 0:
+            path = findAugmentingPath(adjacency, match, root)
+
+            if path is not None:
+                augment(match, *path)
+
+    return match
+
+# Searches an augmenting path from a free vertex with a breadth-first search that contracts odd cycles (blossoms)
+# Returns (free vertex the path ends in, parent of every inner vertex on it), None if there is no path
+def findAugmentingPath(adjacency, match, root):
+    vertexCount = len(adjacency)
+    # Outer vertices of the alternating tree, their matched partners are the inner vertices
+    used = [False] * vertexCount
+    parent = [-1] * vertexCount
+    # Vertices of a contracted blossom point to the blossom's base
+    base = list(range(vertexCount))
+
+    used[root] = True
+    queue = [root]
+    head = 0
+
+    # Returns the base of the closest common ancestor of two outer vertices
+    def lowestCommonAncestor(a, b):
+        visited = [False] * vertexCount
+
+        while True:
+            a = base[a]
+            visited[a] = True
+
+            if match[a] == -1:
+                break
+
+            a = parent[match[a]]
+
+        while True:
+            b = base[b]
+
+            if visited[b]:
+                return b
+
+            b = parent[match[b]]
+
+    # Marks the bases on the path from v to the blossom base and points the inner vertices on it back across the new edge
+    def markPath(v, blossomBase, child, inBlossom):
+        while not base[v] == blossomBase:
+            inBlossom[base[v]] = True
+            inBlossom[base[match[v]]] = True
+            parent[v] = child
+            child = match[v]
+            v = parent[match[v]]
+
+    while head < len(queue):
+        v = queue[head]
+        head += 1
+
+        for to in adjacency[v]:
+            if base[v] == base[to] or match[v] == to:
+                continue
+
+            if to == root or (not match[to] == -1 and not parent[match[to]] == -1):
+                # Odd cycle, contracted into its base
+                blossomBase = lowestCommonAncestor(v, to)
+                inBlossom = [False] * vertexCount
+
+                markPath(v, blossomBase, to, inBlossom)
+                markPath(to, blossomBase, v, inBlossom)
+
+                for i in range(vertexCount):
+                    if inBlossom[base[i]]:
+                        base[i] = blossomBase
+
+                        if not used[i]:
+                            used[i] = True
+                            queue.append(i)
+
+            elif parent[to] == -1:
+                parent[to] = v
+
+                if match[to] == -1:
+                    return to, parent
+
+                used[match[to]] = True
+                queue.append(match[to])
+
+    return None
+
+# Flips the matched and unmatched edges along the path found by findAugmentingPath
+def augment(match, end, parent):
+    v = end
+
+    while not v == -1:
+        parentVertex = parent[v]
+        nextVertex = match[parentVertex]
+
+        match[v] = parentVertex
+        match[parentVertex] = v
+        v = nextVertex
+
+# Returns suggested games as (challenger rank, opponent rank) in which every player appears at most once
+# possibleChallenges: Every challenge that could be issued as (challenger rank, opponent rank)
+# lastOpponentRanks[i]: Rank of the last opponent of the player with rank i + 1, 0 if there is none
+def suggestGames(possibleChallenges, lastOpponentRanks):
+    if len(possibleChallenges) == 0:
+        return []
+
+    playerCount = len(lastOpponentRanks)
+
+    # Maps (lower rank, higher rank) -> suggested challenger rank
+    # If both could challenge each other, the lower ranked player challenges, as they have a rank to gain
+    challengers = {}
+    for challengerRank, opponentRank in possibleChallenges:
+        pair = (min(challengerRank, opponentRank), max(challengerRank, opponentRank))
+        challengers[pair] = max(challengers.get(pair, 0), challengerRank)
+
+    # Prefers close ranks and players that didn't just play against each other
+    def preference(pair):
+        isRematch = lastOpponentRanks[pair[0] - 1] == pair[1] or lastOpponentRanks[pair[1] - 1] == pair[0]
+        return (isRematch, pair[1] - pair[0], pair)
+
+    pairs = sorted(challengers.keys(), key = preference)
+
+    adjacency = [[] for _ in range(playerCount)]
+    match = [-1] * playerCount
+
+    for first, second in pairs:
+        adjacency[first - 1].append(second - 1)
+        adjacency[second - 1].append(first - 1)
+
+        # Greedy start with the preferred games
+        if match[first - 1] == -1 and match[second - 1] == -1:
+            match[first - 1] = second - 1
+            match[second - 1] = first - 1
+
+    match = maximumMatching(adjacency, match)
+
+    games = []
+    for index, partner in enumerate(match):
+        if index < partner:
+            pair = (index + 1, partner + 1)
+            challenger = challengers[pair]
+            games += [(challenger, pair[0] if challenger == pair[1] else pair[1])]
+
+    games.sort()
+    return games
@@ -0,0 +1,98 @@
+import math
+
+# NumPy is only needed for fast full-history recomputes. Without it the same replay runs in plain Python.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Returns the expected score of player A against player B (1 = certain win, 0 = certain loss)
+def expectedScore(ratingA, ratingB):
+    return 1 / (1 + math.pow(10, (ratingB - ratingA) / 400))
+
+# Returns the rating change of player A after a game against player B
+# Player B's rating changes by the same amount in the other direction
+def ratingChange(ratingA, ratingB, wonA, kFactor):
+    scoreA = 1 if wonA else 0
+    return kFactor * (scoreA - expectedScore(ratingA, ratingB))
+
+
+# Replays a list of games in order and returns the final ratings and the rating change of every game.
+# games: List of (playerA, playerB, wonA) tuples in the order they were played. Players can be any hashable ID.
+# Returns a dictionary mapping player ID -> rating and a list with player A's rating change for every game.
+def replayGames(games, initialRating, kFactor):
+    if numpy is None:
+        return _replayGamesPython(games, initialRating, kFactor)
+    else:
+        return _replayGamesVectorized(games, initialRating, kFactor)
+
+def _replayGamesPython(games, initialRating, kFactor):
+    ratings = {}
+    changes = []
+
+    for playerA, playerB, wonA in games:
+        ratingA = ratings.get(playerA, initialRating)
+        ratingB = ratings.get(playerB, initialRating)
+
+        change = ratingChange(ratingA, ratingB, wonA, kFactor)
+        ratings[playerA] = ratingA + change
+        ratings[playerB] = ratingB - change
+        changes += [change]
+
+    return ratings, changes
+
+# Elo is sequential, but two games only depend on each other if they share a player.
+# Every game is therefore put into the earliest layer after the last game of both its players.
+# Games within a layer have no players in common and are updated together as one array operation.
+def _replayGamesVectorized(games, initialRating, kFactor):
+    if len(games) == 0:
+        return {}, []
+
+    # Maps player IDs to array indices
+    playerIndex = {}
+    indicesA = numpy.empty(len(games), dtype = numpy.int64)
+    indicesB = numpy.empty(len(games), dtype = numpy.int64)
+    scores = numpy.empty(len(games), dtype = numpy.float64)
+    layers = numpy.empty(len(games), dtype = numpy.int64)
+    playerDepth = []
+
+    for i, (playerA, playerB, wonA) in enumerate(games):
+        for player in (playerA, playerB):
+            if player not in playerIndex:
+                playerIndex[player] = len(playerIndex)
+                playerDepth += [0]
+
+        indexA = playerIndex[playerA]
+        indexB = playerIndex[playerB]
+        layer = max(playerDepth[indexA], playerDepth[indexB])
+        playerDepth[indexA] = layer + 1
+        playerDepth[indexB] = layer + 1
+
+        indicesA[i] = indexA
+        indicesB[i] = indexB
+        scores[i] = 1.0 if wonA else 0.0
+        layers[i] = layer
+
+    ratings = numpy.full(len(playerIndex), float(initialRating))
+    changes = numpy.empty(len(games), dtype = numpy.float64)
+
+    # Processes one layer at a time in the original game order
+    order = numpy.argsort(layers, kind = 'stable')
+    boundaries = numpy.flatnonzero(numpy.diff(layers[order])) + 1
+
+    for gameIndices in numpy.split(order, boundaries):
+        layerA = indicesA[gameIndices]
+        layerB = indicesB[gameIndices]
+
+        expected = 1 / (1 + numpy.power(10.0, (ratings[layerB] - ratings[layerA]) / 400))
+        layerChanges = kFactor * (scores[gameIndices] - expected)
+
+        ratings[layerA] += layerChanges
+        ratings[layerB] -= layerChanges
+        changes[gameIndices] = layerChanges
+
+    finalRatings = {}
+    for player, index in playerIndex.items():
+        finalRatings[player] = float(ratings[index])
+
+    return finalRatings, changes.tolist()
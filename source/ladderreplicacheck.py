@@ -0,0 +1,178 @@
+import argparse
+import sys
+import time
+
+import ladderdb
+import ladderreplicas
+
+# Checks the read replica routing of LadderDatabase (see ladderreplicas.py) against two local MySQL instances, a primary and a replica of it.
+# Adds a few players to a new scratch ladder, then checks which server answers the reads of different users before and after the
+# read-your-writes window, inside readFromPrimary, after a refresh and while replication is stopped. Exits with 1 if any check fails.
+#
+# Two local instances with GTID replication, the replica is reached on 127.0.0.2 because token files can't hold a port:
+#   docker network create ladder
+#   docker run -d --name ladder-primary --network ladder -p 127.0.0.1:3306:3306 -e MYSQL_ROOT_PASSWORD=ladder -e MYSQL_DATABASE=ladder \
+#       mysql:8.0 --server-id=1 --log-bin=mysql-bin --gtid-mode=ON --enforce-gtid-consistency=ON
+#   docker run -d --name ladder-replica --network ladder -p 127.0.0.2:3306:3306 -e MYSQL_ROOT_PASSWORD=ladder -e MYSQL_DATABASE=ladder \
+#       mysql:8.0 --server-id=2 --gtid-mode=ON --enforce-gtid-consistency=ON --read-only=ON
+#   docker exec ladder-replica mysql -uroot -pladder -e "CHANGE REPLICATION SOURCE TO SOURCE_HOST='ladder-primary', SOURCE_USER='root',
+#       SOURCE_PASSWORD='ladder', SOURCE_AUTO_POSITION=1, GET_SOURCE_PUBLIC_KEY=1; START REPLICA;"
+#   python ladderreplicacheck.py --credentials MySQLTest.token --replica-credentials MySQLReplicaTest.token
+
+
+# Cursor that counts the statements it runs
+class CountingCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.count = 0
+
+    def execute(self, query, args = None):
+        self.count += 1
+        return self.cursor.execute(query, args)
+
+    def executemany(self, query, args):
+        self.count += 1
+        return self.cursor.executemany(query, args)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+class ReplicaCheck:
+    def __init__(self, db, ladder):
+        self.db = db
+        self.ladder = ladder
+        self.replica = db.replicas.replicas[0]
+        self.failures = 0
+
+        db.cursor = CountingCursor(db.cursor)
+        self.replica.cursor = CountingCursor(self.replica.cursor)
+
+    # Waits until the replica reports a lag within the bound, returns false if it doesn't within the timeout
+    def waitForReplica(self, timeout):
+        end = time.monotonic() + timeout
+
+        while time.monotonic() < end:
+            lag = self.replica.getLag(time.monotonic(), 0)
+            if lag is not None and lag <= self.db.replicas.maxLag:
+                return True
+
+            time.sleep(0.5)
+
+        return False
+
+    # Runs a read as the given users (None: unknown, like background tasks)
+    # Returns its result and the server that answered it: 'primary', 'replica', 'both' or None if it didn't query
+    def read(self, users, method, *args):
+        primaryCount = self.db.cursor.count
+        replicaCount = self.replica.cursor.count
+
+        token = ladderreplicas.currentUsers.set(users)
+        try:
+            result = getattr(self.db, method)(*args, self.ladder)
+        finally:
+            ladderreplicas.currentUsers.reset(token)
+
+        usedReplica = self.replica.cursor.count > replicaCount
+        usedPrimary = self.db.cursor.count > primaryCount
+
+        if usedReplica and usedPrimary:
+            server = 'both'
+        elif usedReplica:
+            server = 'replica'
+        elif usedPrimary:
+            server = 'primary'
+        else:
+            server = None
+
+        return result, server
+
+    def check(self, description, condition):
+        print(f"{'ok  ' if condition else 'FAIL'} {description}")
+
+        if not condition:
+            self.failures += 1
+
+    def setReplication(self, running):
+        cursor = self.replica.database.cursor()
+
+        try:
+            cursor.execute("START REPLICA;" if running else "STOP REPLICA;")
+        finally:
+            cursor.close()
+
+        # The lag is checked at most once per interval
+        time.sleep(ladderreplicas.ReplicaPool.lagCheckInterval + 0.5)
+
+    def run(self, discordIDs):
+        writer, reader = discordIDs[0], discordIDs[1]
+
+        token = ladderreplicas.currentUsers.set((writer,))
+        try:
+            self.db.addPlayers(discordIDs, self.ladder)
+        finally:
+            ladderreplicas.currentUsers.reset(token)
+
+        signedUp, server = self.read((writer,), 'isPlayerSignedUp', writer)
+        self.check("The writer reads their own write from the primary", signedUp and server == 'primary')
+
+        _, server = self.read((reader,), 'getPlayerInfo', reader)
+        self.check("Other users read from the replica during the writer's window", server == 'replica')
+
+        _, server = self.read(None, 'getRanking')
+        self.check("Reads without a known user don't wait for the writes of users", server == 'replica')
+
+        with ladderreplicas.readFromPrimary():
+            _, server = self.read((reader,), 'getRanking')
+        self.check("Reads inside readFromPrimary use the primary", server == 'primary')
+
+        time.sleep(self.db.replicas.getWriteWindow())
+
+        signedUp, server = self.read((writer,), 'isPlayerSignedUp', writer)
+        self.check("After the window, the writer reads their write from the replica", signedUp and server == 'replica')
+
+        _, server = self.read((reader,), 'getPossibleChallenges', discordIDs[-1])
+        self.check("getPossibleChallenges is answered by the replica alone", server == 'replica')
+
+        self.db.refresh(self.ladder)
+        _, server = self.read(None, 'getRanking')
+        self.check("After a refresh, everyone reads from the primary", server == 'primary')
+
+        time.sleep(self.db.replicas.getWriteWindow())
+        self.setReplication(False)
+
+        try:
+            _, server = self.read((reader,), 'getRanking')
+            self.check("Reads use the primary while replication is stopped", server == 'primary')
+        finally:
+            self.setReplication(True)
+
+        token = ladderreplicas.currentUsers.set((writer,))
+        try:
+            self.db.kickPlayers(discordIDs, self.ladder)
+        finally:
+            ladderreplicas.currentUsers.reset(token)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Checks the read replica routing of LadderDatabase against a primary and a replica.')
+    parser.add_argument('--credentials', default = 'MySQLTest.token', help = 'MySQL token file of the primary, use a scratch database')
+    parser.add_argument('--replica-credentials', default = 'MySQLReplicaTest.token', help = 'MySQL token file of a replica of the primary')
+    parser.add_argument('--timeout', type = float, default = 30, help = 'Seconds to wait for the replica to catch up')
+    args = parser.parse_args()
+
+    db = ladderdb.LadderDatabase(args.credentials, [args.replica_credentials])
+    check = ReplicaCheck(db, f"replicas-{int(time.time())}")
+
+    if not check.waitForReplica(args.timeout):
+        print(f"The replica isn't replicating or lags more than {db.replicas.maxLag} seconds")
+        sys.exit(1)
+
+    firstID = int(time.time() * 1000) * 1000
+    check.run([firstID + i for i in range(4)])
+
+    print(f"{check.failures} checks failed")
+    if check.failures > 0:
+        sys.exit(1)
@@ -0,0 +1,156 @@
+import contextlib
+import contextvars
+import time
+
+import MySQLdb
+import MySQLdb.cursors
+
+# Optional MySQL read replicas for the read-only queries of LadderDatabase.
+# A replica is only used while its replication lag is within the configured bound ('replica_max_lag').
+# Reads of users who wrote something within that bound go to the primary, so users always see their own changes.
+# Everyone else may read data that is up to the bound old. Writes without a known user (background tasks, admin jobs)
+# send all reads to the primary for the same time. Results that are cached until the next change are read from the primary too,
+# see readFromPrimary.
+
+
+# Discord IDs of the users the code that currently runs acts for, None if unknown. Set for every command, see main.py.
+currentUsers = contextvars.ContextVar('currentUsers', default = None)
+
+# True while all reads have to use the primary, see readFromPrimary
+primaryOnly = contextvars.ContextVar('primaryOnly', default = False)
+
+# Sends all reads in the with block to the primary
+# Used to fill caches that are keyed by the ladder version: a replica might not have the change that bumped the version yet
+@contextlib.contextmanager
+def readFromPrimary():
+    token = primaryOnly.set(True)
+
+    try:
+        yield
+    finally:
+        primaryOnly.reset(token)
+
+
+class Replica:
+    def __init__(self, host, user, password, databaseName):
+        self.host = host
+        self.database = MySQLdb.connect(host = host, user = user, passwd = password, db = databaseName)
+        # Without autocommit, every connection would keep reading the snapshot of its first query
+        self.database.autocommit(True)
+        self.cursor = self.database.cursor()
+
+        self.lag = None
+        self.lastLagCheck = None
+        # MySQL 8.4 removed SHOW SLAVE STATUS, servers before 8.0.22 don't have SHOW REPLICA STATUS
+        self.useReplicaStatus = True
+
+    # Returns the replication lag in seconds, or None if the replica isn't replicating
+    def getLag(self, now, checkInterval):
+        if self.lastLagCheck is not None and now - self.lastLagCheck < checkInterval:
+            return self.lag
+
+        self.lastLagCheck = now
+
+        status = self.__getStatus()
+
+        if len(status) == 0:
+            self.lag = None
+        elif 'Seconds_Behind_Source' in status[0]:
+            self.lag = status[0]['Seconds_Behind_Source']
+        else:
+            self.lag = status[0]['Seconds_Behind_Master']
+
+        return self.lag
+
+    # Returns the rows of the replica status, empty if the server isn't a replica or the status can't be read
+    def __getStatus(self):
+        statusCursor = self.database.cursor(MySQLdb.cursors.DictCursor)
+
+        try:
+            if self.useReplicaStatus:
+                try:
+                    statusCursor.execute("SHOW REPLICA STATUS;")
+                    return statusCursor.fetchall()
+                except MySQLdb.ProgrammingError:
+                    self.useReplicaStatus = False
+
+            statusCursor.execute("SHOW SLAVE STATUS;")
+            return statusCursor.fetchall()
+        except MySQLdb.Error as error:
+            print(f"Could not check replica {self.host}: {error}")
+            return ()
+        finally:
+            statusCursor.close()
+
+class ReplicaPool:
+    # Replication lag is checked at most this often per replica (seconds)
+    lagCheckInterval = 1.0
+
+    # Number of users with recent writes above which the ones whose window is over are dropped
+    maxTrackedUsers = 1000
+
+    def __init__(self, credentials, maxLag):
+        self.replicas = [Replica(*replicaCredentials) for replicaCredentials in credentials]
+        self.maxLag = maxLag
+        # Time of the last write without a known user
+        self.lastWrite = None
+        # Maps Discord ID -> time of the last write of the user
+        self.lastUserWrites = {}
+        self.nextReplica = 0
+
+    def setMaxLag(self, maxLag):
+        self.maxLag = maxLag
+
+    # Seconds after a write in which replicas might not have it yet
+    # The reported lag is rounded down to full seconds and can be up to one check interval old
+    def getWriteWindow(self):
+        return self.maxLag + 1 + ReplicaPool.lagCheckInterval
+
+    # Called after every write on the primary, for the users in currentUsers or for everyone
+    def markWrite(self, everyone = False):
+        now = time.monotonic()
+        users = None if everyone else currentUsers.get()
+
+        if users is None:
+            self.lastWrite = now
+            return
+
+        for user in users:
+            self.lastUserWrites[user] = now
+
+        # Forgets users whose window is over
+        if len(self.lastUserWrites) > ReplicaPool.maxTrackedUsers:
+            self.lastUserWrites = dict([(user, writeTime) for user, writeTime in self.lastUserWrites.items() if now - writeTime <= self.getWriteWindow()])
+
+    # Returns true if the current users might not see their own writes on a replica yet
+    def isInWriteWindow(self, now):
+        window = self.getWriteWindow()
+
+        if self.lastWrite is not None and now - self.lastWrite <= window:
+            return True
+
+        # Reads without a known user, e.g. of background tasks, don't wait for the writes of users
+        users = currentUsers.get()
+        if users is None:
+            return False
+
+        return any([user in self.lastUserWrites and now - self.lastUserWrites[user] <= window for user in users])
+
+    # Returns the cursor of a replica that is recent enough, or None if the primary has to be used
+    def getCursor(self):
+        now = time.monotonic()
+
+        # Read-your-writes: Right after a write, replicas might not have it yet
+        if primaryOnly.get() or self.isInWriteWindow(now):
+            return None
+
+        # Round-robin over the replicas that are within the staleness bound
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(self.nextReplica + i) % len(self.replicas)]
+            lag = replica.getLag(now, ReplicaPool.lagCheckInterval)
+
+            if lag is not None and lag <= self.maxLag:
+                self.nextReplica = (self.nextReplica + i + 1) % len(self.replicas)
+                return replica.cursor
+
+        return None
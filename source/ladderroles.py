@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import time
+
+import discord
+
+# Synchronizes the ladder role with the roster of the current ladder.
+# The members holding the role are compared with the Players table, then the missing roles are added and the surplus ones removed.
+# discord.py already waits for exhausted rate limit buckets, so the sync only sends a few changes at a time and backs off when
+# Discord still answers with 429 or a server error. A checkpoint file records that a sync is running. A sync that was interrupted
+# by a restart is resumed on the next start by comparing again, which skips every change that was already made.
+
+
+# Returns (Discord IDs that need the role, Discord IDs that need to lose it), both sorted
+# Players who left the server can't get the role and are skipped
+def diffRoleHolders(holderIDs, rosterIDs, memberIDs):
+    adds = sorted((rosterIDs - holderIDs) & memberIDs)
+    removes = sorted(holderIDs - rosterIDs)
+
+    return adds, removes
+
+class RoleSyncResult:
+    def __init__(self, addCount, removeCount):
+        self.addCount = addCount
+        self.removeCount = removeCount
+        self.added = 0
+        self.removed = 0
+        # Changes that weren't needed anymore when they were due, e.g. because the player signed up in the meantime
+        self.skipped = 0
+        # Discord IDs of the members whose role couldn't be changed
+        self.failed = []
+
+    def getDoneCount(self):
+        return self.added + self.removed + self.skipped + len(self.failed)
+
+class RoleSync:
+    # Attempts per role change while Discord is rate limiting or unavailable
+    maxAttempts = 5
+
+    # Seconds before the first retry, doubled with every retry
+    retryDelay = 2
+
+    # Seconds between two progress messages
+    progressInterval = 15
+
+    # concurrency: Number of role changes that are sent to Discord at the same time
+    def __init__(self, checkpointFile, concurrency):
+        self.checkpointFile = checkpointFile
+        self.concurrency = concurrency
+        self.running = False
+
+    # Returns the ID of the channel of a sync that was interrupted, None if there is none
+    def loadCheckpoint(self):
+        try:
+            with open(self.checkpointFile, 'r') as file:
+                return json.load(file)['channelID']
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError):
+            self.__clearCheckpoint()
+            return None
+
+    def __saveCheckpoint(self, channelID):
+        with open(self.checkpointFile, 'w') as file:
+            json.dump({'channelID': channelID}, file)
+
+    def __clearCheckpoint(self):
+        if os.path.exists(self.checkpointFile):
+            os.remove(self.checkpointFile)
+
+    # Gives the role to all members in rosterIDs and takes it from everyone else, returns a RoleSyncResult
+    # isPlayer(discordID) tells whether a member is signed up right now, so players who joined or left during the sync aren't changed back
+    # progress is a coroutine function that is awaited with progress messages. The channel with the given ID gets them after a restart.
+    async def run(self, guild, role, rosterIDs, isPlayer, channelID, progress):
+        self.running = True
+        self.__saveCheckpoint(channelID)
+
+        try:
+            holderIDs = set([member.id for member in role.members])
+            memberIDs = set([member.id for member in guild.members])
+            adds, removes = diffRoleHolders(holderIDs, rosterIDs, memberIDs)
+
+            result = RoleSyncResult(len(adds), len(removes))
+            changeCount = len(adds) + len(removes)
+
+            if changeCount == 0:
+                self.__clearCheckpoint()
+                return result
+
+            await progress(f"Adding the ladder role to {len(adds)} members and removing it from {len(removes)} members...")
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+            lastProgress = time.monotonic()
+
+            async def applyChange(discordID, add):
+                nonlocal lastProgress
+
+                async with semaphore:
+                    if not isPlayer(discordID) == add:
+                        result.skipped += 1
+                    elif not await self.__changeRole(guild, role, discordID, add):
+                        result.failed += [discordID]
+                    elif add:
+                        result.added += 1
+                    else:
+                        result.removed += 1
+
+                if time.monotonic() - lastProgress >= RoleSync.progressInterval:
+                    lastProgress = time.monotonic()
+                    await progress(f"{result.getDoneCount()} of {changeCount} role changes done...")
+
+            changes = [(discordID, True) for discordID in adds] + [(discordID, False) for discordID in removes]
+            await asyncio.gather(*[applyChange(discordID, add) for discordID, add in changes])
+        finally:
+            self.running = False
+
+        # Only reached if the sync wasn't interrupted
+        self.__clearCheckpoint()
+        return result
+
+    # Adds or removes the role of a member, returns false if that wasn't possible
+    async def __changeRole(self, guild, role, discordID, add):
+        member = guild.get_member(discordID)
+        if member is None:
+            return False
+
+        delay = RoleSync.retryDelay
+
+        for attempt in range(RoleSync.maxAttempts):
+            try:
+                if add:
+                    await member.add_roles(role, reason = 'Role sync: Signed up for 1v1 ladder')
+                else:
+                    await member.remove_roles(role, reason = 'Role sync: Not in the 1v1 ladder')
+
+                return True
+            except discord.HTTPException as error:
+                # Missing permissions or members that left don't change by trying again
+                if not (error.status == 429 or error.status >= 500) or attempt == RoleSync.maxAttempts - 1:
+                    return False
+
+                await asyncio.sleep(delay)
+                delay *= 2
+
+        return False
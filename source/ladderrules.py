@@ -0,0 +1,75 @@
+import math
+import random
+
+# Ladder rules that don't depend on the database.
+# They are used by LadderDatabase as well as by the offline simulator, so both always follow the same rules.
+
+# Calculates which tier a rank is
+def convertToTier(rank):
+    return round(math.sqrt(2*rank - 1))
+
+# Returns if a player with the given rank and tier is allowed to challenge a player with the other rank and tier
+def canChallengeBasedOnRank(challengerRank, challengerTier, opponentRank, opponentTier, rankRange):
+    # The #1 player can only challenge tier 2
+    if challengerRank == 1:
+        return opponentTier == 2 or opponentTier == 3
+
+    # Others can challenge all players below them
+    if challengerRank < opponentRank:
+        return True
+
+    # You can always challenge people in your own tier
+    if challengerTier == opponentTier:
+        return True
+
+    # You can't challenge players more than one tier above you
+    if challengerTier > opponentTier + 1:
+        return False
+
+    # You can challenge player more 3 or less ranks above you
+    if challengerRank <= opponentRank + rankRange:
+        return True
+
+    # In all other cases, you can challenge!
+    return True
+
+# Returns if the opponent would be listed as possible challenge for the challenger.
+# This is the rank and tier condition of LadderDatabase.getPossibleChallenges:
+# Higher ranked players in the same tier or up to rankRange ranks above in the tier above.
+def isPossibleChallenge(challengerRank, challengerTier, opponentRank, opponentTier, rankRange):
+    if challengerRank == 1:
+        return opponentTier == 2 or opponentTier == 3
+
+    if opponentRank >= challengerRank:
+        return False
+
+    return opponentTier == challengerTier or (opponentTier == challengerTier - 1 and opponentRank >= challengerRank - rankRange)
+
+# Returns true if the players switch ranks after a game, which is the case when the lower ranked player won
+def shouldSwapRanks(challengerRank, opponentRank, challengerWon):
+    if challengerWon:
+        return challengerRank > opponentRank
+    else:
+        return opponentRank > challengerRank
+
+# Ways to seed a new season from the final standings of the previous one:
+# keep: Same order as before
+# compress: Same order, but players who didn't play a single game move below everyone who did
+# shuffle: Random order
+seedingPolicies = ['keep', 'compress', 'shuffle']
+
+# Returns the keys of the players in the order they start the new season
+# players is a list of (key, number of games played) in the order of the final standings
+def seedNextSeason(players, policy):
+    if policy == 'keep':
+        return [key for key, gamesPlayed in players]
+
+    if policy == 'compress':
+        return [key for key, gamesPlayed in players if gamesPlayed > 0] + [key for key, gamesPlayed in players if not gamesPlayed > 0]
+
+    if policy == 'shuffle':
+        keys = [key for key, gamesPlayed in players]
+        random.shuffle(keys)
+        return keys
+
+    raise ValueError(f"Unknown seeding policy '{policy}'")
@@ -0,0 +1,232 @@
+import argparse
+import concurrent.futures
+import heapq
+import itertools
+import math
+import random
+
+import ladderrules
+import laddertiers
+
+# Offline Monte Carlo simulator for ladder rule changes.
+# Simulates seasons of synthetic players with a hidden skill value under the same challenge and swap rules the bot uses,
+# and measures how fast the ranking converges to the true skill order and how stable it is afterwards.
+#
+# Example: python laddersim.py --players 40 --seasons 2000 --rank-range 2 3 4 --cooldown 1 24
+
+
+class RuleSet:
+    def __init__(self, rankRange = 3, challengeProtection = 1, outgoingCooldown = 1, challengeTimeout = 3, tierLayout = 'pyramid'):
+        self.rankRange = rankRange
+        self.challengeProtection = challengeProtection
+        self.outgoingCooldown = outgoingCooldown
+        self.challengeTimeout = challengeTimeout
+        # Value of 'tier_layout', see laddertiers.parseTierLayout
+        self.tierLayout = tierLayout
+
+    def __str__(self):
+        return f"tier_layout={self.tierLayout} rank_range={self.rankRange} challenge_protection={self.challengeProtection}h outgoing_cooldown={self.outgoingCooldown}h challenge_timeout={self.challengeTimeout}h"
+
+class SimulationSettings:
+    def __init__(self, playerCount = 40, days = 60, activity = 1/24, skillScale = 1.0, convergenceThreshold = 0.9):
+        self.playerCount = playerCount
+        self.days = days
+        # Probability per hour that an idle player issues a challenge
+        self.activity = activity
+        # How strongly the skill difference decides games (0 = coin flip)
+        self.skillScale = skillScale
+        # Spearman correlation between ranking and skill order at which the ladder counts as converged
+        self.convergenceThreshold = convergenceThreshold
+
+class SeasonResult:
+    def __init__(self, convergenceDay, finalCorrelation, rankStability, gamesPlayed):
+        self.convergenceDay = convergenceDay
+        self.finalCorrelation = finalCorrelation
+        self.rankStability = rankStability
+        self.gamesPlayed = gamesPlayed
+
+class RuleSetSummary:
+    def __init__(self, ruleSet, results):
+        convergedResults = [result for result in results if result.convergenceDay is not None]
+
+        self.ruleSet = ruleSet
+        self.seasons = len(results)
+        self.convergedShare = len(convergedResults) / len(results)
+        self.meanConvergenceDay = None
+        if len(convergedResults) > 0:
+            self.meanConvergenceDay = sum(result.convergenceDay for result in convergedResults) / len(convergedResults)
+        self.meanFinalCorrelation = sum(result.finalCorrelation for result in results) / len(results)
+        self.meanRankStability = sum(result.rankStability for result in results) / len(results)
+        self.meanGamesPlayed = sum(result.gamesPlayed for result in results) / len(results)
+
+
+# Returns the Spearman rank correlation between the current ranking and the true skill order
+def rankCorrelation(ranking, skillOrder):
+    playerCount = len(ranking)
+    if playerCount < 2:
+        return 1.0
+
+    squaredDifferences = 0
+    for rankIndex, player in enumerate(ranking):
+        squaredDifferences += (rankIndex - skillOrder[player]) ** 2
+
+    return 1 - 6 * squaredDifferences / (playerCount * (playerCount ** 2 - 1))
+
+# Simulates one season and returns its SeasonResult
+def simulateSeason(ruleSet, settings, seed):
+    rng = random.Random(seed)
+    playerCount = settings.playerCount
+    hours = settings.days * 24
+
+    # Players start in a random order, like after a shuffle at the end of the signup period
+    skills = [rng.gauss(0, 1) for _ in range(playerCount)]
+    ranking = list(range(playerCount))
+    rng.shuffle(ranking)
+
+    skillOrder = [0] * playerCount
+    for position, player in enumerate(sorted(range(playerCount), key = lambda player: -skills[player])):
+        skillOrder[player] = position
+
+    rankOf = [0] * playerCount
+    for rankIndex, player in enumerate(ranking):
+        rankOf[player] = rankIndex + 1
+
+    # Nobody joins or leaves during a simulated season, so the tier table is fixed
+    tierIndex = laddertiers.TierIndex(laddertiers.parseTierLayout(ruleSet.tierLayout), playerCount)
+
+    outgoingTimeoutUntil = [0] * playerCount
+    ingoingTimeoutUntil = [0] * playerCount
+    lastOpponent = [None] * playerCount
+    busy = [False] * playerCount
+    pendingGames = []
+
+    convergenceDay = None
+    correlation = rankCorrelation(ranking, skillOrder)
+    rankMovement = 0
+    gamesPlayed = 0
+
+    for hour in range(hours):
+        # 1. Plays all games that are due
+        while len(pendingGames) > 0 and pendingGames[0][0] <= hour:
+            _, challenger, opponent = heapq.heappop(pendingGames)
+
+            winProbability = 1 / (1 + math.exp(-settings.skillScale * (skills[challenger] - skills[opponent])))
+            challengerWon = rng.random() < winProbability
+
+            challengerRank = rankOf[challenger]
+            opponentRank = rankOf[opponent]
+
+            if ladderrules.shouldSwapRanks(challengerRank, opponentRank, challengerWon):
+                rankOf[challenger] = opponentRank
+                rankOf[opponent] = challengerRank
+                ranking[opponentRank - 1] = challenger
+                ranking[challengerRank - 1] = opponent
+
+                # Only movement in the second half of the season counts towards stability
+                if hour >= hours // 2:
+                    rankMovement += 2 * abs(challengerRank - opponentRank)
+
+            # Same cooldowns as after a reported game
+            outgoingTimeoutUntil[challenger] = hour + ruleSet.outgoingCooldown
+            ingoingTimeoutUntil[challenger] = hour
+            ingoingTimeoutUntil[opponent] = hour + ruleSet.challengeProtection
+            outgoingTimeoutUntil[opponent] = hour
+
+            lastOpponent[challenger] = opponent
+            lastOpponent[opponent] = challenger
+            busy[challenger] = False
+            busy[opponent] = False
+            gamesPlayed += 1
+
+        # 2. Idle players issue new challenges
+        for challenger in rng.sample(range(playerCount), playerCount):
+            if busy[challenger] or outgoingTimeoutUntil[challenger] > hour or rng.random() >= settings.activity:
+                continue
+
+            challengeableRanks = tierIndex.getChallengeableRanks(rankOf[challenger], ruleSet.rankRange)
+            if challengeableRanks is None:
+                continue
+
+            candidates = []
+            for opponentRank in range(challengeableRanks[0], challengeableRanks[1] + 1):
+                opponent = ranking[opponentRank - 1]
+
+                if opponent == challenger or busy[opponent] or ingoingTimeoutUntil[opponent] > hour or lastOpponent[challenger] == opponent:
+                    continue
+
+                candidates += [opponent]
+
+            if len(candidates) == 0:
+                continue
+
+            opponent = rng.choice(candidates)
+            busy[challenger] = True
+            busy[opponent] = True
+            heapq.heappush(pendingGames, (hour + rng.randint(1, max(ruleSet.challengeTimeout, 1)), challenger, opponent))
+
+        # 3. Measures convergence once per day
+        if hour % 24 == 23:
+            correlation = rankCorrelation(ranking, skillOrder)
+
+            if convergenceDay is None and correlation >= settings.convergenceThreshold:
+                convergenceDay = (hour + 1) // 24
+
+    # Average number of ranks a player moved per day in the second half of the season
+    rankStability = rankMovement / (playerCount * max(settings.days - settings.days // 2, 1))
+
+    return SeasonResult(convergenceDay, correlation, rankStability, gamesPlayed)
+
+def _simulateSeasonTask(task):
+    ruleSet, settings, seed = task
+    return simulateSeason(ruleSet, settings, seed)
+
+# Simulates the given number of seasons for every rule set, spread across a process pool
+# Returns one RuleSetSummary per rule set
+def simulateRuleSets(ruleSets, settings, seasons, workers = None, seed = 0):
+    tasks = []
+    for ruleSet in ruleSets:
+        # Every rule set plays the same seeds so that results are directly comparable
+        tasks += [(ruleSet, settings, seed + season) for season in range(seasons)]
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers = workers) as executor:
+        results = list(executor.map(_simulateSeasonTask, tasks, chunksize = max(1, seasons // 16)))
+
+    summaries = []
+    for i, ruleSet in enumerate(ruleSets):
+        summaries += [RuleSetSummary(ruleSet, results[i*seasons:(i+1)*seasons])]
+
+    return summaries
+
+def printSummaries(summaries):
+    for summary in summaries:
+        convergenceStr = 'never'
+        if summary.meanConvergenceDay is not None:
+            convergenceStr = f"day {summary.meanConvergenceDay:.1f}"
+
+        print(summary.ruleSet)
+        print(f"    converged: {summary.convergedShare*100:.1f}% of {summary.seasons} seasons, on average at {convergenceStr}")
+        print(f"    final correlation: {summary.meanFinalCorrelation:.3f}, rank movement per player and day: {summary.meanRankStability:.3f}, games: {summary.meanGamesPlayed:.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Simulates ladder seasons to compare rule sets.')
+    parser.add_argument('--players', type = int, default = 40, help = 'Number of players per season')
+    parser.add_argument('--seasons', type = int, default = 1000, help = 'Number of simulated seasons per rule set')
+    parser.add_argument('--days', type = int, default = 60, help = 'Length of a season in days')
+    parser.add_argument('--activity', type = float, default = 1/24, help = 'Probability per hour that an idle player challenges someone')
+    parser.add_argument('--skill-scale', type = float, default = 1.0, help = 'How strongly skill decides games')
+    parser.add_argument('--threshold', type = float, default = 0.9, help = 'Rank correlation that counts as converged')
+    parser.add_argument('--tier-layout', nargs = '+', default = ['pyramid'], help = 'Values of tier_layout to compare')
+    parser.add_argument('--rank-range', type = int, nargs = '+', default = [3], help = 'Values of rank_range to compare')
+    parser.add_argument('--protection', type = int, nargs = '+', default = [1], help = 'Values of challenge_protection (hours) to compare')
+    parser.add_argument('--cooldown', type = int, nargs = '+', default = [1], help = 'Values of outgoing_cooldown (hours) to compare')
+    parser.add_argument('--timeout', type = int, default = 3, help = 'challenge_timeout in hours')
+    parser.add_argument('--workers', type = int, default = None, help = 'Number of worker processes')
+    parser.add_argument('--seed', type = int, default = 0, help = 'Seed of the first season')
+    args = parser.parse_args()
+
+    settings = SimulationSettings(args.players, args.days, args.activity, args.skill_scale, args.threshold)
+    ruleSets = [RuleSet(rankRange, protection, cooldown, args.timeout, tierLayout) for tierLayout, rankRange, protection, cooldown
+    in itertools.product(args.tier_layout, args.rank_range, args.protection, args.cooldown)]
+
+    printSummaries(simulateRuleSets(ruleSets, settings, args.seasons, args.workers, args.seed))
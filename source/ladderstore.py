@@ -0,0 +1,126 @@
+import datetime
+import json
+import os
+import struct
+import tempfile
+import zlib
+
+import ladderevents
+
+# Local snapshot of the bot's caches, written on shutdown and at intervals, so a restarted bot doesn't start cold.
+# The file only holds copies of database rows: the configuration, the ranking, the ladder state, running cooldowns and protections,
+# pending challenges and the display names of the players. It's only used if the database still has the same key (see
+# LadderDatabase.getWarmState) and configuration, otherwise the bot reads everything from the database as usual.
+# Layout: magic, format version and header length, the JSON header, then the zlib compressed columns of the ranking.
+
+magic = b'LDWS'
+formatVersion = 1
+prefixFormat = '<4sHI'
+
+
+class WarmState:
+    def __init__(self, ladder, key, config, ranking, ladderState, timeouts, challenges, names):
+        self.ladder = ladder
+        # Values that change with every change of the cached data, see LadderDatabase.getWarmState
+        self.key = key
+        self.config = config
+        # ladderdb.RankingSnapshot of the top 100
+        self.ranking = ranking
+        # ladderevents.LadderState of all players
+        self.ladderState = ladderState
+        # (Discord ID, 'outgoing' or 'ingoing', expiry timestamp) of running cooldowns and protections
+        self.timeouts = timeouts
+        # ladderdb.ChallengeInfo of all pending challenges
+        self.challenges = challenges
+        # Maps Discord ID -> display name
+        self.names = names
+
+        # Maps Discord ID -> latest pending challenge of the player
+        self.activeChallenges = {}
+        for challenge in sorted(challenges, key = lambda challenge: challenge.deadline):
+            self.activeChallenges[challenge.challenger] = challenge
+            self.activeChallenges[challenge.opponent] = challenge
+
+    # Returns the ID of the last event of the ladder that's included in the state
+    def getLastEventID(self):
+        return self.key[0]
+
+# Returns the file contents for a WarmState
+def encodeWarmState(state):
+    ranking = state.ranking
+    columns = [getattr(ranking, name) for name in ranking.__slots__]
+
+    header = {
+        'ladder': state.ladder,
+        'key': state.key,
+        'config': state.config,
+        'rankingSize': len(ranking),
+        'ladderState': state.ladderState.toSnapshot(),
+        'timeouts': state.timeouts,
+        'challenges': [[challenge.challengeID, challenge.challenger, challenge.opponent, challenge.deadline.isoformat()] for challenge in state.challenges],
+        'names': list(state.names.items())
+    }
+    headerData = json.dumps(header, separators = (',', ':')).encode('utf-8')
+    rankingData = zlib.compress(b''.join([column.tobytes() for column in columns]))
+
+    return struct.pack(prefixFormat, magic, formatVersion, len(headerData)) + headerData + rankingData
+
+# Returns the WarmState stored in the given file contents, or None if they were written by another version or are damaged
+# rankingType and challengeType create the empty RankingSnapshot and the ChallengeInfo objects, to avoid importing ladderdb here
+def decodeWarmState(data, rankingType, challengeType):
+    prefixSize = struct.calcsize(prefixFormat)
+    if len(data) < prefixSize:
+        return None
+
+    fileMagic, fileVersion, headerSize = struct.unpack_from(prefixFormat, data)
+    if not fileMagic == magic or not fileVersion == formatVersion:
+        return None
+
+    try:
+        header = json.loads(data[prefixSize:prefixSize + headerSize].decode('utf-8'))
+        rankingData = zlib.decompress(data[prefixSize + headerSize:])
+    except (ValueError, zlib.error):
+        return None
+
+    ranking = rankingType()
+    offset = 0
+
+    for name in ranking.__slots__:
+        column = getattr(ranking, name)
+        size = header['rankingSize'] * column.itemsize
+
+        column.frombytes(rankingData[offset:offset + size])
+        offset += size
+
+    if not offset == len(rankingData):
+        return None
+
+    challenges = [challengeType(row[0], row[1], row[2], datetime.datetime.fromisoformat(row[3])) for row in header['challenges']]
+    timeouts = [tuple(timeout) for timeout in header['timeouts']]
+
+    return WarmState(header['ladder'], header['key'], header['config'], ranking, ladderevents.LadderState.fromSnapshot(header['ladderState']),
+    timeouts, challenges, dict(header['names']))
+
+# Writes the state to the given file. The old file is replaced at once, so a crash while writing doesn't leave a broken file behind.
+def writeFile(fileName, state):
+    directory = os.path.dirname(os.path.abspath(fileName))
+    fileDescriptor, temporaryName = tempfile.mkstemp(dir = directory, suffix = '.tmp')
+
+    try:
+        with os.fdopen(fileDescriptor, 'wb') as file:
+            file.write(encodeWarmState(state))
+
+        os.replace(temporaryName, fileName)
+    except:
+        os.remove(temporaryName)
+        raise
+
+# Reads the state from the given file, None if there is no usable file
+def readFile(fileName, rankingType, challengeType):
+    try:
+        with open(fileName, 'rb') as file:
+            data = file.read()
+    except FileNotFoundError:
+        return None
+
+    return decodeWarmState(data, rankingType, challengeType)
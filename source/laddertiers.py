@@ -0,0 +1,170 @@
+import ladderrules
+
+# Tier layouts decide how many ranks each tier has.
+# The layout of a ladder is configured with 'tier_layout':
+#   pyramid                Tier n has n ranks (default)
+#   fixed:<size>           Every tier has the same number of ranks, e.g. fixed:8
+#   percent:<p1>,<p2>,...  Tiers have the given share of the ladder, top tier first, e.g. percent:10,20,30,40
+
+
+class PyramidLayout:
+    def getTier(self, rank, playerCount):
+        return ladderrules.convertToTier(rank)
+
+    def dependsOnPlayerCount(self):
+        return False
+
+class FixedLayout:
+    def __init__(self, size):
+        if size < 1:
+            raise ValueError(f"Tier size must be positive, not {size}")
+
+        self.size = size
+
+    def getTier(self, rank, playerCount):
+        return (rank - 1) // self.size + 1
+
+    def dependsOnPlayerCount(self):
+        return False
+
+class PercentageLayout:
+    def __init__(self, percentages):
+        if len(percentages) == 0 or min(percentages) <= 0:
+            raise ValueError(f"Invalid tier percentages {percentages}")
+
+        # Upper end of each tier as share of the ladder
+        total = sum(percentages)
+        self.upperShares = []
+        share = 0
+        for percentage in percentages:
+            share += percentage / total
+            self.upperShares += [share]
+
+    def getTier(self, rank, playerCount):
+        if playerCount < 1:
+            return 1
+
+        for tierIndex, upperShare in enumerate(self.upperShares):
+            if rank <= round(upperShare * playerCount):
+                return tierIndex + 1
+
+        return len(self.upperShares)
+
+    def dependsOnPlayerCount(self):
+        return True
+
+# Creates a tier layout from the value of the 'tier_layout' configuration
+def parseTierLayout(text):
+    text = str(text).strip().lower()
+
+    try:
+        if text == '' or text == 'pyramid':
+            return PyramidLayout()
+        elif text.startswith('fixed:'):
+            return FixedLayout(int(text[6:]))
+        elif text.startswith('percent:'):
+            return PercentageLayout([float(value) for value in text[8:].split(',')])
+    except ValueError:
+        pass
+
+    raise ValueError(f"Invalid tier layout '{text}'")
+
+
+# Precomputed rank -> tier and tier -> [first, last] rank table of a ladder with a given number of players
+class TierIndex:
+    def __init__(self, layout, playerCount):
+        self.layout = layout
+        self.playerCount = playerCount
+
+        # rankToTier[rank] is the tier of that rank, index 0 is unused
+        self.rankToTier = [0]
+        # tierBounds[tier] is the (first, last) rank of that tier, index 0 is unused
+        self.tierBounds = [(0, 0)]
+
+        for rank in range(1, playerCount + 1):
+            tier = layout.getTier(rank, playerCount)
+            self.rankToTier += [tier]
+
+            # Layouts can skip tiers for small ladders, those tiers are empty
+            while len(self.tierBounds) <= tier:
+                self.tierBounds += [(rank, rank - 1)]
+
+            first, _ = self.tierBounds[tier]
+            self.tierBounds[tier] = (first, rank)
+
+    # Returns the tier of a rank. Ranks beyond the indexed ladder size are calculated directly.
+    def getTier(self, rank):
+        if 0 < rank <= self.playerCount:
+            return self.rankToTier[rank]
+        else:
+            return self.layout.getTier(rank, max(self.playerCount, rank))
+
+    # Returns the first and last rank of a tier, or None if the tier is empty
+    def getBounds(self, tier):
+        if tier < 1 or tier >= len(self.tierBounds):
+            return None
+
+        first, last = self.tierBounds[tier]
+        if last < first:
+            return None
+
+        return (first, last)
+
+    # Returns the ranks (in the new index) of all players whose tier changes when the ladder changes from this index to newIndex.
+    # Both indices must use the same layout. If players were removed at removedRanks, everyone below them moved up.
+    # Players added at the end of the ladder are skipped.
+    def getChangedRanks(self, newIndex, removedRanks = None):
+        removedRanks = sorted(removedRanks or [])
+
+        # Without size dependent tiers, only players that moved up across a tier boundary change tier
+        if not self.layout.dependsOnPlayerCount():
+            if len(removedRanks) == 0:
+                return []
+
+            # With a single removed player, those are exactly the players that were first in their tier
+            if len(removedRanks) == 1:
+                firstRanks = [bounds[0] for bounds in self.tierBounds[1:] if bounds[0] <= bounds[1]]
+                return [firstRank - 1 for firstRank in firstRanks if removedRanks[0] <= firstRank - 1 <= newIndex.playerCount]
+
+        changedRanks = []
+        removedAbove = 0
+
+        for rank in range(1, newIndex.playerCount + 1):
+            # Finds the rank this player had before the removals
+            while removedAbove < len(removedRanks) and removedRanks[removedAbove] <= rank + removedAbove:
+                removedAbove += 1
+
+            oldRank = rank + removedAbove
+            if oldRank > self.playerCount:
+                continue
+
+            if not self.getTier(oldRank) == newIndex.getTier(rank):
+                changedRanks += [rank]
+
+        return changedRanks
+
+    # Returns the range of ranks [first, last] a player with the given rank could challenge, or None if there is none.
+    # This is the rank and tier condition of ladderrules.isPossibleChallenge as one contiguous range.
+    def getChallengeableRanks(self, rank, rankRange):
+        if rank == 1:
+            tier2 = self.getBounds(2)
+            tier3 = self.getBounds(3)
+
+            # Small ladders can skip tier 2 while tier 3 has players
+            if tier2 is None and tier3 is None:
+                return None
+
+            return (tier2[0] if tier2 is not None else tier3[0], tier3[1] if tier3 is not None else tier2[1])
+
+        tier = self.getTier(rank)
+        ownTier = self.getBounds(tier)
+        firstRank = ownTier[0] if ownTier is not None else rank
+
+        upperTier = self.getBounds(tier - 1)
+        if upperTier is not None:
+            firstRank = min(firstRank, max(upperTier[0], rank - rankRange))
+
+        if firstRank > rank - 1:
+            return None
+
+        return (firstRank, rank - 1)
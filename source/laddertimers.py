@@ -0,0 +1,136 @@
+import math
+
+# Hierarchical timer wheel for the challenge cooldowns and protections of all players.
+# Expiries are UNIX timestamps (seconds, UTC), so they don't depend on the time zone of the bot or the database server.
+# Level 0 has one slot per tick, every higher level has slots that are slotCount times as long. A timer is put into the lowest
+# level whose range covers it and moves down a level whenever the slot it's in is reached, so advancing the wheel only touches
+# the timers that are due soon instead of all of them.
+
+
+class TimerWheel:
+    def __init__(self, now, tickLength = 1.0, slotCount = 64, levelCount = 4):
+        self.tickLength = tickLength
+        self.slotCount = slotCount
+        self.levelCount = levelCount
+
+        self.currentTick = int(math.floor(now / tickLength))
+        # levels[level][slot] is a set of keys
+        self.levels = [[set() for _ in range(slotCount)] for _ in range(levelCount)]
+        # Timers that are further away than the highest level reaches
+        self.overflow = set()
+
+        # Maps key -> expiry timestamp
+        self.expiries = {}
+        # Maps key -> tick at which the timer fires
+        self.expiryTicks = {}
+        # Maps key -> set the key is currently in
+        self.locations = {}
+
+    def __len__(self):
+        return len(self.expiries)
+
+    # Returns the timestamp at which the timer with the given key runs out, or None if there is no such timer
+    def getExpiry(self, key):
+        return self.expiries.get(key)
+
+    # Returns true if the timer with the given key is still running at the given time
+    def isRunning(self, key, now):
+        expiry = self.expiries.get(key)
+        return expiry is not None and expiry > now
+
+    # Starts a timer that runs out at the given timestamp, replacing any timer with the same key
+    def schedule(self, key, expiry):
+        self.cancel(key)
+
+        self.expiries[key] = expiry
+        self.expiryTicks[key] = int(math.ceil(expiry / self.tickLength))
+        self.__insert(key)
+
+    def cancel(self, key):
+        if key not in self.expiries:
+            return
+
+        self.locations.pop(key).discard(key)
+        del self.expiries[key]
+        del self.expiryTicks[key]
+
+    # Removes all timers whose key matches the given predicate
+    def cancelWhere(self, predicate):
+        for key in [key for key in self.expiries if predicate(key)]:
+            self.cancel(key)
+
+    # Puts a timer into its slot. Timers that are already due fire on the next tick, or on the current one while it's being advanced to.
+    def __insert(self, key, earliestTick = None):
+        if earliestTick is None:
+            earliestTick = self.currentTick + 1
+
+        expiryTick = max(self.expiryTicks[key], earliestTick)
+        delta = expiryTick - self.currentTick
+
+        slots = None
+        span = 1
+        for level in range(self.levelCount):
+            if delta < span * self.slotCount:
+                slots = self.levels[level]
+                break
+
+            span *= self.slotCount
+
+        if slots is None:
+            target = self.overflow
+        else:
+            target = slots[(expiryTick // span) % self.slotCount]
+
+        target.add(key)
+        self.locations[key] = target
+
+    # Advances the wheel to the given time and returns the keys of all timers that ran out, in the order of their expiry
+    def advance(self, now):
+        targetTick = int(math.floor(now / self.tickLength))
+        expired = []
+
+        # Nothing to do for the skipped ticks
+        if len(self.expiries) == 0:
+            self.currentTick = max(self.currentTick, targetTick)
+            return expired
+
+        while self.currentTick < targetTick:
+            self.currentTick += 1
+            self.__cascade()
+
+            slot = self.levels[0][self.currentTick % self.slotCount]
+            if len(slot) == 0:
+                continue
+
+            due = sorted(slot, key = lambda key: self.expiries[key])
+            for key in due:
+                self.cancel(key)
+
+            expired += due
+
+            if len(self.expiries) == 0:
+                self.currentTick = targetTick
+
+        return expired
+
+    # Moves the timers of the slots that were reached on this tick one or more levels down
+    def __cascade(self):
+        span = 1
+
+        for level in range(1, self.levelCount + 1):
+            span *= self.slotCount
+
+            if not self.currentTick % span == 0:
+                return
+
+            if level == self.levelCount:
+                keys = self.overflow
+                self.overflow = set()
+            else:
+                slots = self.levels[level]
+                slot = (self.currentTick // span) % self.slotCount
+                keys = slots[slot]
+                slots[slot] = set()
+
+            for key in keys:
+                self.__insert(key, self.currentTick)
@@ -0,0 +1,203 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import time
+
+# Span based tracing of commands. Every command is the root span of a trace, the LadderDatabase methods and Discord HTTP requests
+# it calls are its child spans. Finished traces are appended to a file, one OTLP/JSON trace export request per line, so they can be
+# read by OpenTelemetry tools (e.g. the otlpjsonfile receiver of the collector).
+# A trace is kept if it was sampled when it started or if it took longer than the slow threshold. Without either, nothing is recorded.
+
+
+# Span the code that currently runs belongs to, None outside of traced commands
+currentSpan = contextvars.ContextVar('currentSpan', default = None)
+
+class Trace:
+    def __init__(self, sampled):
+        self.traceID = os.urandom(16).hex()
+        self.sampled = sampled
+        # Finished spans, the root span comes last
+        self.spans = []
+
+class Span:
+    __slots__ = ('trace', 'spanID', 'parentSpanID', 'name', 'kind', 'start', 'end', 'attributes', 'error')
+
+    def __init__(self, trace, parentSpanID, name, kind, attributes):
+        self.trace = trace
+        self.spanID = os.urandom(8).hex()
+        self.parentSpanID = parentSpanID
+        self.name = name
+        # 'SERVER' for commands, 'CLIENT' for requests to Discord, 'INTERNAL' otherwise
+        self.kind = kind
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = attributes
+        # Message of the exception the span ended with, None if it succeeded
+        self.error = None
+
+    def finish(self, error = None):
+        self.end = time.time_ns()
+
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+        self.trace.spans.append(self)
+
+    # Returns the span in OTLP/JSON format
+    def toJSON(self):
+        span = {
+            'traceId': self.trace.traceID,
+            'spanId': self.spanID,
+            'name': self.name,
+            'kind': f"SPAN_KIND_{self.kind}",
+            'startTimeUnixNano': str(self.start),
+            'endTimeUnixNano': str(self.end),
+            'attributes': [{'key': key, 'value': toAttributeValue(value)} for key, value in self.attributes.items()],
+            'status': {'code': 'STATUS_CODE_OK'} if self.error is None else {'code': 'STATUS_CODE_ERROR', 'message': self.error}
+        }
+
+        if self.parentSpanID is not None:
+            span['parentSpanId'] = self.parentSpanID
+
+        return span
+
+def toAttributeValue(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    elif isinstance(value, int):
+        return {'intValue': str(value)}
+    elif isinstance(value, float):
+        return {'doubleValue': value}
+    else:
+        return {'stringValue': str(value)}
+
+class Tracer:
+    def __init__(self, fileName, serviceName, sampleRate = 0, slowThreshold = 0):
+        self.fileName = fileName
+        self.serviceName = serviceName
+        self.setSampling(sampleRate, slowThreshold)
+
+    # sampleRate: Share of traces that are kept, between 0 and 1
+    # slowThreshold: Traces that take longer than this many seconds are always kept, 0 to disable
+    def setSampling(self, sampleRate, slowThreshold):
+        self.sampleRate = sampleRate
+        self.slowThreshold = slowThreshold
+
+    def isEnabled(self):
+        return self.sampleRate > 0 or self.slowThreshold > 0
+
+    # Starts a new trace and makes its root span the current span. Returns the span and a token for finishTrace, or None if tracing is disabled.
+    def startTrace(self, name, attributes = {}):
+        if not self.isEnabled():
+            return None
+
+        span = Span(Trace(random.random() < self.sampleRate), None, name, 'SERVER', dict(attributes))
+        return span, currentSpan.set(span)
+
+    # Ends the trace started by startTrace and writes it to the file if it's kept
+    def finishTrace(self, handle, error = None):
+        if handle is None:
+            return
+
+        span, token = handle
+        currentSpan.reset(token)
+        span.finish(error)
+
+        if span.trace.sampled or (self.slowThreshold > 0 and (span.end - span.start) / 1e9 >= self.slowThreshold):
+            self.__write(span.trace)
+
+    # Starts a child span of the current span, None if no trace is being recorded
+    def startSpan(self, name, kind = 'INTERNAL', attributes = {}):
+        parent = currentSpan.get()
+        if parent is None:
+            return None
+
+        span = Span(parent.trace, parent.spanID, name, kind, dict(attributes))
+        return span, currentSpan.set(span)
+
+    def finishSpan(self, handle, error = None):
+        if handle is None:
+            return
+
+        span, token = handle
+        currentSpan.reset(token)
+        span.finish(error)
+
+    # Replaces the public methods of an object with wrappers that record a span for every call
+    def instrument(self, obj, prefix, exclude = []):
+        for name, method in inspect.getmembers(obj, inspect.ismethod):
+            if name.startswith('_') or name in exclude:
+                continue
+
+            setattr(obj, name, self.__wrap(method, f"{prefix}.{name}"))
+
+    # Records a span for every request of a discord.py HTTPClient
+    def instrumentHTTP(self, http):
+        request = http.request
+
+        @functools.wraps(request)
+        async def tracedRequest(route, **kwargs):
+            handle = self.startSpan(f"{route.method} {route.path}", 'CLIENT', {'http.method': route.method, 'http.route': route.path})
+
+            try:
+                result = await request(route, **kwargs)
+            except Exception as error:
+                if handle is not None and hasattr(error, 'status'):
+                    handle[0].attributes['http.status_code'] = error.status
+
+                self.finishSpan(handle, error)
+                raise
+
+            self.finishSpan(handle)
+            return result
+
+        http.request = tracedRequest
+
+    def __wrap(self, method, spanName):
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def tracedCoroutine(*args, **kwargs):
+                handle = self.startSpan(spanName)
+
+                try:
+                    result = await method(*args, **kwargs)
+                except Exception as error:
+                    self.finishSpan(handle, error)
+                    raise
+
+                self.finishSpan(handle)
+                return result
+
+            return tracedCoroutine
+
+        @functools.wraps(method)
+        def tracedMethod(*args, **kwargs):
+            handle = self.startSpan(spanName)
+
+            try:
+                result = method(*args, **kwargs)
+            except Exception as error:
+                self.finishSpan(handle, error)
+                raise
+
+            self.finishSpan(handle)
+            return result
+
+        return tracedMethod
+
+    def __write(self, trace):
+        request = {
+            'resourceSpans': [{
+                'resource': {'attributes': [{'key': 'service.name', 'value': toAttributeValue(self.serviceName)}]},
+                'scopeSpans': [{
+                    'scope': {'name': 'laddertrace'},
+                    'spans': [span.toJSON() for span in trace.spans]
+                }]
+            }]
+        }
+
+        with open(self.fileName, 'a') as file:
+            file.write(json.dumps(request, separators = (',', ':')) + '\n')
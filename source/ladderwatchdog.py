@@ -0,0 +1,152 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+
+# Watchdog that detects when the event loop is blocked, e.g. by a slow synchronous database query inside a command.
+# A task on the loop records a heartbeat, a separate thread checks it. When the heartbeat is late by more than the threshold,
+# the thread captures the stack of the loop thread and attributes the stall to the command and LadderDatabase method on it.
+# The command is the one that was invoked in the task that's running on the loop (see setCommand), so background tasks show up by the name of their function.
+
+
+class Stall:
+    def __init__(self, start, stack, command, method):
+        # time.monotonic() of the last heartbeat before the stall
+        self.start = start
+        self.stack = stack
+        self.command = command
+        self.method = method
+        self.duration = 0
+
+# Returns the handler of the bot and the LadderDatabase method (outermost public method in ladderdb.py) in a stack
+# The handler is the given command if it's known, otherwise the innermost function in main.py. The module level code of main.py only runs the bot.
+def attributeStack(stack, command = None):
+    handler = None
+    method = None
+
+    for frame in stack:
+        fileName = os.path.basename(frame.filename)
+
+        if fileName == 'main.py' and not frame.name == '<module>':
+            handler = frame.name
+        elif fileName == 'ladderdb.py' and method is None and not frame.name.startswith('_') and not frame.name == 'wrapper':
+            method = frame.name
+
+    if command is None:
+        command = handler
+
+    return command, method
+
+class LoopWatchdog:
+    # Seconds between two heartbeats and between two checks of the watchdog thread
+    checkInterval = 0.05
+
+    def __init__(self, threshold):
+        # Stalls longer than this many seconds are logged
+        self.threshold = threshold
+        self.running = False
+        # Increased on every start, so the thread of a previous start ends even if the watchdog is restarted quickly
+        self.generation = 0
+        self.lastBeat = None
+        self.loop = None
+        self.loopThreadID = None
+        self.heartbeatTask = None
+
+        # Maps task -> name of the command that was invoked in it
+        self.taskCommands = weakref.WeakKeyDictionary()
+
+        # Stall that is still going on
+        self.currentStall = None
+        # Maps (command, method) -> [number of stalls, total seconds, longest stall in seconds]
+        self.blockers = {}
+
+    # Starts the watchdog, has to be called from the event loop
+    def start(self):
+        if self.running:
+            return
+
+        self.running = True
+        self.generation += 1
+        self.loop = asyncio.get_event_loop()
+        self.loopThreadID = threading.get_ident()
+        self.lastBeat = time.monotonic()
+        self.heartbeatTask = asyncio.ensure_future(self.__beat())
+
+        thread = threading.Thread(target = self.__watch, args = (self.generation,), name = 'LoopWatchdog', daemon = True)
+        thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+
+        self.running = False
+        self.heartbeatTask.cancel()
+
+    # Remembers the command that runs in the current task, has to be called from the event loop
+    def setCommand(self, command):
+        task = asyncio.current_task()
+
+        if task is not None:
+            self.taskCommands[task] = command
+
+    # Changes the threshold in seconds, a threshold of 0 stops the watchdog
+    def setThreshold(self, threshold):
+        self.threshold = threshold
+
+        if threshold > 0:
+            self.start()
+        else:
+            self.stop()
+
+    async def __beat(self):
+        while self.running:
+            self.lastBeat = time.monotonic()
+            await asyncio.sleep(LoopWatchdog.checkInterval)
+
+    def __watch(self, generation):
+        while self.running and self.generation == generation:
+            time.sleep(LoopWatchdog.checkInterval)
+
+            lastBeat = self.lastBeat
+            stall = self.currentStall
+
+            # The loop is running again, the stall is over
+            if stall is not None and not lastBeat == stall.start:
+                stall.duration = lastBeat - stall.start - LoopWatchdog.checkInterval
+                self.currentStall = None
+                self.__logStall(stall)
+                continue
+
+            if stall is None and time.monotonic() - lastBeat - LoopWatchdog.checkInterval > self.threshold:
+                frame = sys._current_frames().get(self.loopThreadID)
+                if frame is None:
+                    continue
+
+                # Only reads which task is running, which is safe from another thread
+                task = asyncio.current_task(self.loop)
+                command = self.taskCommands.get(task) if task is not None else None
+
+                stack = traceback.extract_stack(frame)
+                command, method = attributeStack(stack, command)
+                self.currentStall = Stall(lastBeat, stack, command, method)
+
+    def __logStall(self, stall):
+        key = (stall.command, stall.method)
+        blocker = self.blockers.setdefault(key, [0, 0, 0])
+        blocker[0] += 1
+        blocker[1] += stall.duration
+        blocker[2] = max(blocker[2], stall.duration)
+
+        methodStr = f"LadderDatabase.{stall.method}" if stall.method is not None else 'no database call'
+        print(f"Event loop blocked for {stall.duration * 1000:.0f} ms in '{stall.command}' ({methodStr}):", file = sys.stderr)
+        print(''.join(traceback.format_list(stall.stack)), file = sys.stderr)
+
+    # Returns (command, method, number of stalls, total seconds, longest stall in seconds) of the handlers that blocked the loop the longest
+    def getWorstBlockers(self, limit = 10):
+        blockers = [(command, method, count, total, longest) for (command, method), (count, total, longest) in self.blockers.items()]
+        blockers.sort(key = lambda blocker: -blocker[3])
+
+        return blockers[:limit]
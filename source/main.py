@@ -1,32 +1,347 @@
 import discord
 from discord import Colour, Embed
 from discord.ext import commands
+import MySQLdb
 
+import asyncio
 import datetime
-
+import math
+import os
+import sys
+import tempfile
+import time
+import traceback
+
+import laddercache
 import ladderdb
-
-# Reads Discord bot token from token file
-try:
-    discordTokenFile = open('Discord.token', 'r')
-    discordToken = discordTokenFile.read()
-    discordTokenFile.close()
-except:
-    print('Could not read Discord token file')
-    sys.exit('Invalid Discord token file or data')
+import ladderdiff
+import ladderio
+import ladderjobs
+import ladderlimits
+import ladderreplicas
+import laddermatching
+import ladderroles
+import ladderrules
+import ladderstore
+import laddertiers
+import laddertrace
+import ladderwatchdog
 
 # Initializes Bot
 prefix = '.1v1'
 bot = commands.Bot(command_prefix=prefix)
 
 
-# Initializes database
-db = ladderdb.LadderDatabase('MySQL.token')
-print('Successfully connected to database')
+# Database, command rate limits and runner for heavy admin jobs, all are set by initDatabase while the bot logs in
+db = None
+rateLimiter = None
+jobRunner = None
+
+# Cached ranking message, see getRankingMessage
+rankingMessageCache = None
+
+# Rendered ranking embeds and challenge status messages by ladder version
+responseCache = laddercache.ResponseCache()
+
+# Ranking state of the last ranking update, see getRankingDiff
+rankingTracker = ladderdiff.RankingTracker()
+
+# Rendered tier fields of the last ranking embed and the layout they were rendered with, see generateRankingEmbed
+rankingFields = {}
+rankingFieldsKey = None
+
+# Display names of players by Discord ID, see getMemberName
+memberNames = {}
+
+# File that keeps the caches across restarts, enabled with 'warm_state_interval'. See ladderstore.py.
+warmStateFile = 'WarmState.cache'
+
+# Logs commands that block the event loop, enabled with 'watchdog_threshold'
+watchdog = ladderwatchdog.LoopWatchdog(0)
+
+# Records commands with their database and Discord API calls, enabled with 'trace_sample_rate' or 'trace_slow_ms'
+tracer = laddertrace.Tracer('Traces.jsonl', 'ladderbot')
+
+
+# Tracks how far the startup got. Commands that arrive before the database is ready wait for it.
+class StartupState:
+    def __init__(self):
+        # 'starting': connecting to the database, 'warming': database ready, filling caches, 'ready': fully started
+        self.state = 'starting'
+        self.databaseReady = asyncio.Event()
+
+    def setState(self, state):
+        self.state = state
+        print(f"Startup state: {state}")
+
+startup = StartupState()
+
+# Connects to the database and checks the schema in a worker thread, so it runs while the bot connects to Discord
+async def initDatabase():
+    global db, rateLimiter, jobRunner
+
+    # Every file named MySQLReplica<...>.token holds the credentials of a read replica
+    replicaFiles = sorted([fileName for fileName in os.listdir('.') if fileName.startswith('MySQLReplica') and fileName.endswith('.token')])
+
+    try:
+        db = await bot.loop.run_in_executor(None, ladderdb.LadderDatabase, 'MySQL.token', replicaFiles)
+    except:
+        print('Could not connect to database')
+        traceback.print_exc()
+        await bot.close()
+        return
+
+    print('Successfully connected to database')
+    if len(replicaFiles) > 0:
+        print(f"Using {len(replicaFiles)} read replicas")
+
+    # Starts the worker processes for admin jobs, they connect to the database themselves
+    try:
+        jobRunner = await bot.loop.run_in_executor(None, ladderjobs.JobRunner, 'MySQL.token')
+    except:
+        print('Could not start job workers')
+        traceback.print_exc()
+        await bot.close()
+        return
+
+    rateLimiter = ladderlimits.RateLimiter(ladderlimits.parseRateLimit(db.getConfig('user_rate_limit')), ladderlimits.parseRateLimit(db.getConfig('guild_rate_limit')))
+
+    watchdog.setThreshold(int(db.getConfig('watchdog_threshold')) / 1000)
+
+    # getConfig only reads a dictionary, spans for it would outnumber all others
+    tracer.setSampling(float(db.getConfig('trace_sample_rate')), int(db.getConfig('trace_slow_ms')) / 1000)
+    tracer.instrument(db, 'LadderDatabase', exclude = ['getConfig'])
+    tracer.instrumentHTTP(bot.http)
+
+    if float(db.getConfig('warm_state_interval')) > 0:
+        await restoreWarmState()
+
+    startup.setState('warming')
+    startup.databaseReady.set()
+
+# Loads the caches of the last run from warmStateFile, as long as the database didn't change since
+async def restoreWarmState():
+    try:
+        warmState = await bot.loop.run_in_executor(None, ladderstore.readFile, warmStateFile, ladderdb.RankingSnapshot, ladderdb.ChallengeInfo)
+
+        if warmState is None or not await bot.loop.run_in_executor(None, db.restoreWarmState, warmState):
+            print('No usable warm state, starting with empty caches')
+            return
+    except:
+        print('Could not read warm state')
+        traceback.print_exc()
+        return
+
+    memberNames.update(warmState.names)
+    rankingTracker.reset(warmState.ladder, warmState.ladderState, warmState.getLastEventID())
+
+    print(f"Restored warm state of ladder '{warmState.ladder}'")
+
+# Writes the caches of the current ladder to warmStateFile
+def saveWarmState():
+    warmState = db.getWarmState()
+
+    for discordID in [player.discordID for player in warmState.ladderState.players.values()]:
+        if discordID in memberNames:
+            warmState.names[discordID] = memberNames[discordID]
+
+    ladderstore.writeFile(warmStateFile, warmState)
+
+# Seconds between two checks whether the warm state is due to be written
+warmStateCheckInterval = 60
+
+# Writes the warm state every 'warm_state_interval' minutes, it's also written when the bot shuts down
+async def saveWarmStatePeriodically():
+    await bot.wait_until_ready()
+    await startup.databaseReady.wait()
+
+    lastSave = time.monotonic()
+
+    while not bot.is_closed():
+        await asyncio.sleep(warmStateCheckInterval)
+
+        interval = float(db.getConfig('warm_state_interval'))
+        if interval <= 0 or time.monotonic() - lastSave < interval * 60:
+            continue
+
+        lastSave = time.monotonic()
+
+        try:
+            saveWarmState()
+        except:
+            print('Could not write warm state')
+            traceback.print_exc()
+
+# Fills the member and ranking message caches once the bot is connected, so the first commands don't start cold
+async def warmUpCaches():
+    global rankingMessageCache
+
+    await bot.wait_until_ready()
+    await startup.databaseReady.wait()
+
+    for guild in bot.guilds:
+        if not guild.chunked:
+            await guild.chunk()
+
+    rankingChannel = bot.get_channel(int(db.getConfig('ranking_channel')))
+    if rankingChannel is not None:
+        rankingMessageCache = await getRankingMessage(rankingChannel.guild)
+
+    # Continues a role sync that was interrupted by the restart
+    roleSyncChannel = bot.get_channel(roleSync.loadCheckpoint() or 0)
+    if roleSyncChannel is not None:
+        await roleSyncChannel.send("Continuing the role sync that was interrupted by a restart...")
+        bot.loop.create_task(runRoleSync(roleSyncChannel.guild, roleSyncChannel))
+
+    startup.setState('ready')
+
+# Seconds between two checks for cooldowns and protections that ran out
+timeoutCheckInterval = 1
+
+# Number of players mentioned in one notification message
+notificationBatchSize = 50
 
+# Tells players in the general channel when their protection ran out and they can be challenged again, enabled with 'notify_challengeable'
+# The timeouts are tracked in memory by the database (see laddertimers.py), so checking them doesn't need any queries
+async def notifyChallengeable():
+    await bot.wait_until_ready()
+    await startup.databaseReady.wait()
+
+    while not bot.is_closed():
+        await asyncio.sleep(timeoutCheckInterval)
+
+        ladder = db.getConfig('current_ladder')
+        expired = db.popExpiredTimeouts(ladder)
+
+        if len(expired) == 0 or int(db.getConfig('notify_challengeable')) == 0:
+            continue
+
+        generalChannel = bot.get_channel(int(db.getConfig('general_channel')))
+        if generalChannel is None:
+            continue
+
+        mentions = [f"<@{discordID}>" for timeoutLadder, discordID, kind in expired if timeoutLadder == ladder and kind == 'ingoing']
+
+        for i in range(0, len(mentions), notificationBatchSize):
+            try:
+                await generalChannel.send(f"{', '.join(mentions[i:i + notificationBatchSize])}: Your challenge protection ran out, you can be challenged again!")
+            except discord.HTTPException:
+                traceback.print_exc()
+
+
+# Seconds between two checks whether matchmaking suggestions are due
+matchmakingCheckInterval = 60
+
+# Maximum length of a message with matchmaking suggestions, Discord allows 2000 characters
+suggestionMessageLength = 1900
+
+# Posts suggested challenges for the idle players of the current ladder in the given channel
+async def postSuggestions(generalChannel):
+    # The matching runs in a worker thread, so commands are still handled while it's computed
+    matchups, discordIDs, lastOpponentRanks = db.getOpenMatchupRanks()
+    games = await bot.loop.run_in_executor(None, laddermatching.suggestGames, matchups, lastOpponentRanks)
+
+    if len(games) == 0:
+        return
+
+    message = "Looking for a game? Here are some challenges you could issue right now:"
+    for challengerRank, opponentRank in games:
+        line = f"\n<@{discordIDs[challengerRank - 1]}> could challenge <@{discordIDs[opponentRank - 1]}>"
+
+        if len(message) + len(line) > suggestionMessageLength:
+            await generalChannel.send(message)
+            message = ''
+
+        message += line
+
+    await generalChannel.send(message)
+
+# Suggests challenges to idle players in the general channel every 'matchmaking_interval' hours, see laddermatching.py
+async def postMatchmakingSuggestions():
+    await bot.wait_until_ready()
+    await startup.databaseReady.wait()
+
+    lastSuggestions = time.monotonic()
+
+    while not bot.is_closed():
+        await asyncio.sleep(matchmakingCheckInterval)
+
+        interval = float(db.getConfig('matchmaking_interval'))
+        if interval <= 0 or time.monotonic() - lastSuggestions < interval * 3600:
+            continue
+
+        lastSuggestions = time.monotonic()
+
+        generalChannel = bot.get_channel(int(db.getConfig('general_channel')))
+        if generalChannel is None or int(db.getConfig('signup_only')) == 1:
+            continue
+
+        # Failures only skip these suggestions, the next ones are posted as usual
+        try:
+            await postSuggestions(generalChannel)
+        except Exception:
+            print('Could not post matchmaking suggestions')
+            traceback.print_exc()
 
 ### HELP FUNCTIONS ###
 
+# Rejects commands of users or guilds that exceeded their rate limit before any command code runs
+@bot.check
+async def checkRateLimit(ctx: commands.Context):
+    # Queues commands until the database is ready instead of failing them
+    await startup.databaseReady.wait()
+
+    guildID = ctx.guild.id if ctx.guild is not None else 0
+    rateLimiter.check(ctx.author.id, guildID)
+    return True
+
+# Commands that change the current ladder, they don't run at the same time as admin jobs of the ladder (see ladderjobs.py)
+ladderChangingCommands = set(['dispute', 'clear', 'kick', 'strikes', 'timeout', 'leave', 'challenge', 'cancel', 'report'])
+
+# Starts the trace of a command once it passed all checks, see laddertrace.py
+# Also makes the author's own writes visible to their following reads (see ladderreplicas.py) and names the command for the watchdog
+# Commands that change the ladder wait for running admin jobs here
+@bot.before_invoke
+async def startCommandTrace(ctx: commands.Context):
+    ladderreplicas.currentUsers.set((ctx.author.id,))
+    watchdog.setCommand(ctx.command.qualified_name)
+
+    if ctx.command.qualified_name in ladderChangingCommands:
+        ladder = db.getConfig('current_ladder')
+
+        if jobRunner.isBusy(ladder):
+            await ctx.send("An admin job is running for this ladder, your command runs when it's done.")
+
+        await jobRunner.startLadderChange(ladder)
+        ctx.changedLadder = ladder
+
+    guildID = ctx.guild.id if ctx.guild is not None else 0
+    ctx.traceHandle = tracer.startTrace(f"command {ctx.command.qualified_name}", {'discord.command': ctx.command.qualified_name, 'discord.user_id': ctx.author.id, 'discord.guild_id': guildID})
+
+@bot.after_invoke
+async def finishCommandTrace(ctx: commands.Context):
+    changedLadder = getattr(ctx, 'changedLadder', None)
+    if changedLadder is not None:
+        await jobRunner.finishLadderChange(changedLadder)
+
+    handle = getattr(ctx, 'traceHandle', None)
+
+    if handle is not None and ctx.command_failed:
+        handle[0].attributes['discord.command_failed'] = True
+
+    tracer.finishTrace(handle)
+
+# Tells users once when they get rate limited and prints all other command errors like the default handler
+@bot.listen()
+async def on_command_error(ctx: commands.Context, error):
+    if isinstance(error, ladderlimits.RateLimited):
+        if error.notify:
+            await ctx.send(f"Slow down, {ctx.author.mention}! Try again in {math.ceil(error.retryAfter)} seconds.")
+        return
+
+    print(f"Ignoring exception in command {ctx.command}:", file = sys.stderr)
+    traceback.print_exception(type(error), error, error.__traceback__, file = sys.stderr)
+
 # Returns true if the author of the message has admin or owner rights and sends a message if not
 async def hasAdminRights(ctx: commands.Context, bot: commands.Bot):
     if not db.isLadderAdmin(ctx.author) and not await bot.is_owner(ctx.author):
@@ -43,6 +358,21 @@ async def isLadderPlayer(ctx: commands.Context):
     else:
         return True
 
+# Runs a heavy admin job in a worker process (see ladderjobs.py) and posts its progress in the channel of the command
+# Returns the result of the job
+async def runAdminJob(ctx: commands.Context, name, ladder, *args):
+    if jobRunner.isBusy(ladder):
+        await ctx.send("Another job is running for this ladder, yours starts when it's done.")
+
+    async def sendProgress(message):
+        await ctx.send(message)
+
+    try:
+        return await jobRunner.run(name, ladder, args, sendProgress)
+    finally:
+        # The worker changed the database without this process knowing
+        db.refresh(ladder)
+
 async def isOnlySignupAllowed(ctx: commands.Context):
     if int(db.getConfig('signup_only')) == 1:
         await ctx.send("Currently you can only sign up. Challenges will be enabled after the signup-period.")
@@ -50,32 +380,185 @@ async def isOnlySignupAllowed(ctx: commands.Context):
     else:
         return False
 
+# Cooldowns and protections are given in UTC, challenge deadlines in the local time of the database
 def timeToString(date: datetime.datetime) -> str:
+    if date.tzinfo is not None:
+        return date.astimezone(datetime.timezone.utc).strftime("%A, %b %d %Y, %H:%M UTC")
+
     return date.strftime("%A, %b %d %Y, %H:%M CEST")
 
 
+# Number of role changes that are sent to Discord at the same time
+roleUpdateConcurrency = 5
+
+# Synchronizes the ladder role with the roster, see ladderroles.py
+roleSync = ladderroles.RoleSync('RoleSync.checkpoint', roleUpdateConcurrency)
+
+# Gives the ladder role to all players of the current ladder and takes it from everyone else, reports to the given channel
+async def runRoleSync(guild, channel):
+    ladder = db.getConfig('current_ladder')
+    ladderRole = discord.utils.get(guild.roles, id = int(db.getConfig('ladder_role')))
+
+    if ladderRole is None:
+        await channel.send("The ladder role doesn't exist! Set it with .1v1config ladder_role first.")
+        return
+
+    # The comparison needs every member of the server
+    if not guild.chunked:
+        await guild.chunk()
+
+    async def sendProgress(message):
+        await channel.send(message)
+
+    rosterIDs = db.getRosterDiscordIDs(ladder)
+    result = await roleSync.run(guild, ladderRole, rosterIDs, lambda discordID: db.isPlayerSignedUp(discordID, ladder), channel.id, sendProgress)
+
+    message = f"Role sync done! Added the ladder role to {result.added} members and removed it from {result.removed} members."
+    if len(result.failed) > 0:
+        message += f"\nCouldn't change the role of {len(result.failed)} members: {', '.join([f'<@{discordID}>' for discordID in result.failed[:20]])}"
+
+    await channel.send(message)
+
 # Kicks the given player from the ladder and removes their role
 async def kickPlayer(ctx, player, kickedBy: str, reason = ''):
+    await kickPlayers(ctx, [player], kickedBy, reason)
 
-    # Cancels the active game if necessary
-    db.cancelActiveChallenge(player.id)
+# Kicks several players at once: One database transaction, concurrent role removals and a single ranking update
+async def kickPlayers(ctx, players, kickedBy: str, reason = ''):
+    if len(players) == 0:
+        return
 
-    # Remove target's ladder role
+    # Remove players from database and cancel their active games
+    db.kickPlayers([player.id for player in players])
+
+    # Remove targets' ladder role
     ladderRole = discord.utils.get(ctx.guild.roles, id = int(db.getConfig('ladder_role')))
     kickReason = f"Kicked from the ladder by {kickedBy}"
     if not reason == '':
         kickReason += f". Reason: '{reason}'"
-    await player.remove_roles(ladderRole, reason = kickReason)
 
-    # Remove player from database
-    db.kickPlayer(player.id)
-    
+    semaphore = asyncio.Semaphore(roleUpdateConcurrency)
+
+    async def removeRole(player):
+        async with semaphore:
+            await player.remove_roles(ladderRole, reason = kickReason)
+
+    await asyncio.gather(*[removeRole(player) for player in players])
+
     # Update standings message
     await updateRankingMessage(ctx.guild)
 
 
+# Collects signups for a short time and adds them to the ladder together
+# All queued players get their ranks in one transaction, their roles in one batch and the ranking is updated once
+class SignupQueue:
+    def __init__(self, window):
+        # Number of seconds signups are collected before they are added
+        self.window = window
+        # Maps Discord ID -> context of the signup command
+        self.pending = {}
+        self.flushTask = None
+
+    # Queues the author of the command, returns false if they are already queued
+    def add(self, ctx):
+        if ctx.author.id in self.pending:
+            return False
+
+        self.pending[ctx.author.id] = ctx
+
+        if self.flushTask is None:
+            self.flushTask = asyncio.ensure_future(self.flushLater())
+
+        return True
+
+    async def flushLater(self):
+        await asyncio.sleep(self.window)
+        self.flushTask = None
+
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Failed to add queued signups: {e}")
+
+    # Adds all queued signups to the ladder
+    async def flush(self):
+        pending = self.pending
+        self.pending = {}
+
+        if len(pending) == 0:
+            return
+
+        # The flush runs in the context of the first signup, but writes for everyone in the queue
+        ladderreplicas.currentUsers.set(tuple(pending.keys()))
+
+        # 1. Add users to database and give them a rank, after running admin jobs of the ladder
+        try:
+            async with jobRunner.changingLadder(db.getConfig('current_ladder')):
+                addedIDs = db.addPlayers(list(pending.keys()))
+        except:
+            traceback.print_exc()
+            await SignupQueue.sendPerChannel(list(pending.values()), lambda mentions: f"Sorry {mentions}, your signup failed. Please try again!")
+            return
+
+        if len(addedIDs) == 0:
+            return
+
+        signups = [pending[discordID] for discordID in addedIDs]
+        guild = signups[0].guild
+
+        # 2. Give users ladder role. The players are already in the ladder, so failures are only reported.
+        ladderRole = discord.utils.get(guild.roles, id = int(db.getConfig('ladder_role')))
+        semaphore = asyncio.Semaphore(roleUpdateConcurrency)
+        roleFailures = set()
+
+        async def addRole(member):
+            if ladderRole is None:
+                roleFailures.add(member.id)
+                return
+
+            async with semaphore:
+                try:
+                    await member.add_roles(ladderRole, reason = 'Signed up for 1v1 ladder')
+                except discord.HTTPException as e:
+                    print(f"Failed to give the ladder role to {member}: {e}")
+                    roleFailures.add(member.id)
+
+        await asyncio.gather(*[addRole(ctx.author) for ctx in signups])
+
+        # 3. Add users to ranking
+        try:
+            await updateRankingMessage(guild)
+        except:
+            traceback.print_exc()
+
+        # 4. Display success message, one per channel
+        await SignupQueue.sendPerChannel(signups, lambda mentions: f"Welcome to the 1v1 ladder, {mentions}!")
+
+        failedSignups = [ctx for ctx in signups if ctx.author.id in roleFailures]
+        await SignupQueue.sendPerChannel(failedSignups, lambda mentions: f"{mentions}: I couldn't give you the ladder role, an admin can fix it with .1v1rolesync.")
+
+    # Sends one message per channel that mentions the authors of all given commands in that channel
+    # createMessage(mentions) returns the message
+    @staticmethod
+    async def sendPerChannel(contexts, createMessage):
+        channels = {}
+        for ctx in contexts:
+            channels.setdefault(ctx.channel.id, []).append(ctx)
+
+        for channelContexts in channels.values():
+            mentions = ', '.join([ctx.author.mention for ctx in channelContexts])
+
+            try:
+                await channelContexts[0].send(createMessage(mentions))
+            except discord.HTTPException:
+                traceback.print_exc()
+
+signupQueue = SignupQueue(2)
+
+
 # Edits the ranking message with the new standings, or posts a new message if it doesn't exist
-def generateRankingEmbed(guild):
+def generateRankingEmbed(guild, ranking = None, diff = None):
+    global rankingFields, rankingFieldsKey
 
     # Initializes Embed
     embed = Embed(
@@ -88,43 +571,236 @@ def generateRankingEmbed(guild):
     embed.set_footer(text = 'European Community Championship', icon_url = 'https://i.imgur.com/u2HPdEi.png')
 
     # Gets current ranking and column paddings
-    rankedPlayers = db.getRanking()
-    rankPadding = getRankPadding(rankedPlayers)
-    namePadding = getNamePadding(guild, rankedPlayers)
-    winlossPadding = getWinLossPadding(rankedPlayers)
-    titlePadding = getTitlesPadding(rankedPlayers)
-
-    # Generates all tier fields
-    previousTier = 1
+    if ranking is None:
+        ranking = db.getRanking()
+
+    rankPadding = getRankPadding(ranking)
+    namePadding = getNamePadding(guild, ranking)
+    winlossPadding = getWinLossPadding(ranking)
+    titlePadding = getTitlesPadding(ranking)
+
+    # Gets ratings if they should be displayed
+    ratings = None
+    if int(db.getConfig('show_ratings')) == 1:
+        ratings = db.getRatings()
+
+    # Row indices of every tier in rank order
+    tierRows = {}
+    for i in range(len(ranking)):
+        tierRows.setdefault(ranking.tiers[i], []).append(i)
+
+    # Only the tiers with changed rows are rendered again, as long as the layout of the fields stays the same
+    fieldsKey = (rankPadding, namePadding, winlossPadding, titlePadding, db.configVersion, tuple(tierRows.keys()))
+    changedTiers = set(tierRows.keys())
+
+    if diff is not None and not diff.changedAll and fieldsKey == rankingFieldsKey:
+        changedTiers = set([ranking.tiers[i] for i in range(len(ranking)) if ranking.ranks[i] in diff.changedRanks])
+
+    fields = {}
+    for tier, rows in tierRows.items():
+        if tier in changedTiers or tier not in rankingFields:
+            fields[tier] = generateTierField(guild, ranking, rows, (rankPadding, namePadding, winlossPadding, titlePadding), ratings)
+        else:
+            fields[tier] = rankingFields[tier]
+
+        embed.add_field(name = f"Tier {tier}", value = fields[tier], inline = False)
+
+    rankingFields = fields
+    rankingFieldsKey = fieldsKey
+
+    return embed
+
+# Generates the text of the ranking field of one tier from the given rows of the ranking
+def generateTierField(guild, ranking, rows, paddings, ratings):
+    rankPadding, namePadding, winlossPadding, titlePadding = paddings
     tierMessage = ''
 
-    for player in rankedPlayers:
-        if player.tier > previousTier:
-            embed.add_field(name = f"Tier {previousTier}", value = f"```{tierMessage}```", inline = False)
-            tierMessage = ''
-            previousTier = player.tier
-        
-        member = guild.get_member(player.discordID)
+    # Reads the ranking column by column instead of creating a record per player
+    for i in rows:
+        discordID = ranking.discordIDs[i]
+        titles = ranking.titles[i]
 
-        rankStr = pad(str(player.rank) + '.', rankPadding + 1)
-        nameStr = pad(member.name, namePadding)
-        winlossStr = pad(f"{player.wins}-{player.losses}", winlossPadding)
+        rankStr = pad(str(ranking.ranks[i]) + '.', rankPadding + 1)
+        nameStr = pad(getMemberName(guild, discordID), namePadding)
+        winlossStr = pad(f"{ranking.wins[i]}-{ranking.losses[i]}", winlossPadding)
 
         titleStr = ''
-        if player.titles > 0:
-            titleStr = str(player.titles) + 'P'
+        if titles > 0:
+            titleStr = str(titles) + 'P'
         titleStr = pad(titleStr, titlePadding + 1)
 
         tierMessage += f"\n{rankStr} {nameStr} | {winlossStr} | {titleStr}"
 
-    if not tierMessage == '':
-        embed.add_field(name = f"Tier {previousTier}", value = f"```{tierMessage}```", inline = False)
-    
+        if ratings is not None:
+            tierMessage += f"| {round(ratings[discordID])}"
+
+    return f"```{tierMessage}```"
+
+# Returns the changes of the ranking since the last update of the ranking message, or None if they aren't known
+# The tracker starts over from the database on the first update and whenever the ranking changed in a way the event log doesn't show
+def getRankingDiff(ladder, ranking):
+    diff = None
+
+    if rankingTracker.ladder == ladder:
+        events = db.getEventsSince(rankingTracker.lastEventID, ladder)
+        diff = rankingTracker.applyEvents(events, lambda playerCount: db.getTierIndex(ladder, playerCount))
+
+    if diff is None or not rankingTracker.matches(ladder, ranking):
+        state, lastEventID = db.getLadderState(ladder)
+        rankingTracker.reset(ladder, state, lastEventID)
+        return None
+
+    return diff
+
+# Number of movements that are announced at once, the rest is summarized
+maxAnnouncements = 10
+
+# Posts the notable changes of the ranking in the general channel, enabled with 'announce_movements'
+async def announceRankingDiff(guild, diff):
+    if not diff.hasAnnouncements() or int(db.getConfig('announce_movements')) == 0:
+        return
+
+    generalChannel = guild.get_channel(int(db.getConfig('general_channel')))
+    if generalChannel is None:
+        return
+
+    def getName(discordID):
+        return getMemberName(guild, discordID)
+
+    lines = []
+
+    if diff.newChampion is not None:
+        lines += [f"{getName(diff.newChampion)} is the new #1!"]
+
+    for winnerID, loserID, rank in diff.swaps:
+        if not winnerID == diff.newChampion:
+            lines += [f"{getName(winnerID)} beat {getName(loserID)} and climbs to #{rank}."]
+
+    for discordID, oldTier, newTier in diff.tierChanges:
+        if newTier < oldTier:
+            lines += [f"{getName(discordID)} was promoted to tier {newTier}."]
+        else:
+            lines += [f"{getName(discordID)} dropped to tier {newTier}."]
+
+    for discordID in diff.kicks:
+        lines += [f"{getName(discordID)} left the ladder."]
+
+    if len(lines) > maxAnnouncements:
+        lines = lines[:maxAnnouncements] + [f"... and {len(lines) - maxAnnouncements} more changes."]
+
+    try:
+        await generalChannel.send('\n'.join(lines))
+    except discord.HTTPException:
+        traceback.print_exc()
+
+# Maximum length of the list of open matchups, Discord allows 2048 characters in an embed description
+matchupsLength = 1900
+
+# Generates the embed of the open matchups board from (challenger, opponent) Discord IDs ordered by challenger rank
+def generateMatchupsEmbed(guild, matchups):
+    embed = Embed(
+        title = "Open matchups",
+        type = 'rich',
+        colour = discord.Colour.blue()
+    )
+
+    if len(matchups) == 0:
+        embed.description = "Nobody can challenge anyone right now."
+        return embed
+
+    def getName(discordID):
+        return getMemberName(guild, discordID)
+
+    # Groups the opponents by challenger while keeping the rank order
+    challengers = []
+    opponents = {}
+    for challengerID, opponentID in matchups:
+        if challengerID not in opponents:
+            challengers += [challengerID]
+            opponents[challengerID] = []
+
+        opponents[challengerID] += [opponentID]
+
+    lines = ''
+    for i, challengerID in enumerate(challengers):
+        line = f"\n{getName(challengerID)} -> {', '.join([getName(opponentID) for opponentID in opponents[challengerID]])}"
+
+        if len(lines) + len(line) > matchupsLength:
+            lines += f"\n... and {len(challengers) - i} more players"
+            break
+
+        lines += line
+
+    embed.description = f"{len(matchups)} possible challenges:```{lines}```"
     return embed
 
+# Returns the message showing the active challenge, timeouts and possible opponents of a player
+# Messages are cached until the ladder changes
+def getChallengeStatus(guild, discordID, ladder):
+    version = db.getLadderVersion(ladder)
+    message = responseCache.get('challengeStatus', ladder, version, discordID)
+    if message is not None:
+        return message
+
+    # Read from the primary, as the message is cached for this version
+    with ladderreplicas.readFromPrimary():
+        activeChallenge = db.getActiveChallenge(discordID, ladder)
+        message = ''
+
+        # Add timeout info to message
+        timeouts = db.getTimeoutInfo(discordID, ladder)
+
+        if timeouts is not None and timeouts.outgoingTimeout is not None:
+            message += f"\nYou're on timeout and can't challenge others until {timeToString(timeouts.outgoingTimeout)}."
+    
+        if timeouts is not None and timeouts.incomingTimeout is not None:
+            message += f"\nYou're protected from challenges until {timeToString(timeouts.incomingTimeout)}."
+
+        # If user has no active challenge, display potential candidates
+        if activeChallenge is None:
+            message += "\nYou don't have any outstanding challenges!"
+
+            possibleChallenges = db.getPossibleChallenges(discordID, ladder)
+
+            if len(possibleChallenges) > 0:
+                message += "\nPlayers you could challenge: "
+
+                for potentialOpponentID in possibleChallenges:
+                    potentialOpponent = guild.get_member(potentialOpponentID)
+                    message += f"\n{potentialOpponent.name}"
+
+        elif activeChallenge.challenger == discordID:
+            opponent = guild.get_member(activeChallenge.opponent)
+            message += f"You challenged {opponent.name}. Play your game until {timeToString(activeChallenge.deadline)}!"
+        else:
+            opponent = guild.get_member(activeChallenge.challenger)
+            message += f"{opponent.name} challenged you! Play your game until {timeToString(activeChallenge.deadline)}."
+
+    if message.startswith('\n'):
+        message = message[1:]
+
+    responseCache.put('challengeStatus', ladder, version, message, discordID)
+    return message
+
 # Retrieves ranking message and updates it with the new ranking    
 async def updateRankingMessage(guild):
-    rankingEmbed = generateRankingEmbed(guild)
+    global rankingMessageCache
+
+    # The embed only changes with the ladder
+    ladder = db.getConfig('current_ladder')
+    version = db.getLadderVersion(ladder)
+    rankingEmbed = responseCache.get('ranking', ladder, version)
+
+    diff = None
+
+    if rankingEmbed is None:
+        with ladderreplicas.readFromPrimary():
+            ranking = db.getRanking(ladder)
+            diff = getRankingDiff(ladder, ranking)
+            rankingEmbed = generateRankingEmbed(guild, ranking, diff)
+
+        responseCache.put('ranking', ladder, version, rankingEmbed)
+
     rankingMessage = await getRankingMessage(guild)
 
     if rankingMessage is None:
@@ -133,40 +809,59 @@ async def updateRankingMessage(guild):
 
         rankingMessage = await rankingChannel.send(embed = rankingEmbed)
         db.setConfig('ranking_message', rankingMessage.id)
+        rankingMessageCache = rankingMessage
     else:
-        await rankingMessage.edit(embed = rankingEmbed)
+        try:
+            await rankingMessage.edit(embed = rankingEmbed)
+        except discord.errors.NotFound:
+            # The cached message was deleted in the meantime
+            rankingMessageCache = None
+            await updateRankingMessage(guild)
+
+    if diff is not None:
+        await announceRankingDiff(guild, diff)
+
+# Returns the display name of a member. Names are remembered, so they're known before the member cache is filled after a restart.
+def getMemberName(guild, discordID):
+    member = guild.get_member(discordID)
+
+    if member is not None:
+        memberNames[discordID] = member.name
+        return member.name
+
+    return memberNames.get(discordID, str(discordID))
 
 # Returns the width required for a column to fit all names
-def getNamePadding(guild, players):
+def getNamePadding(guild, ranking):
     longestName = 0
-    for playerInfo in players:
-        player = guild.get_member(playerInfo.discordID)
+    for discordID in ranking.discordIDs:
+        name = getMemberName(guild, discordID)
 
-        if len(player.name) > longestName:
-            longestName = len(player.name)
+        if len(name) > longestName:
+            longestName = len(name)
     
     return longestName
 
 # Returns the width required for a column to fit all rankings
-def getRankPadding(players):
-    rankStr = str(players[-1].rank)
+def getRankPadding(ranking):
+    rankStr = str(ranking.ranks[-1])
     return len(rankStr)
 
 # Returns the width required for a column to fit all win-loss records
-def getWinLossPadding(players):
+def getWinLossPadding(ranking):
     longestWinLoss = 0
-    for playerInfo in players:
-        winLossStr = f"{playerInfo.wins}-{playerInfo.losses}"
+    for wins, losses in zip(ranking.wins, ranking.losses):
+        winLossStr = f"{wins}-{losses}"
 
         if len(winLossStr) > longestWinLoss:
             longestWinLoss = len(winLossStr)
 
     return longestWinLoss
 
-def getTitlesPadding(players):
+def getTitlesPadding(ranking):
     longestTitle = 0
-    for playerInfo in players:
-        titleStr = str(playerInfo.titles)
+    for titles in ranking.titles:
+        titleStr = str(titles)
         
         if len(titleStr) > longestTitle:
             longestTitle = len(titleStr)
@@ -183,16 +878,23 @@ def pad(text: str, characters: int) -> str:
         return text
 
 # Returns the ranking message object or None if it can't be found
+# The message is cached, so it's only fetched again when the configured channel or message changes
 async def getRankingMessage(guild):
+    global rankingMessageCache
+
     rankingChannelID = int(db.getConfig('ranking_channel'))
     rankingMessageID = int(db.getConfig('ranking_message'))
 
+    if rankingMessageCache is not None and rankingMessageCache.id == rankingMessageID and rankingMessageCache.channel.id == rankingChannelID:
+        return rankingMessageCache
+
     rankingChannel = guild.get_channel(rankingChannelID)
 
     try:
-        rankingMessage = await rankingChannel.fetch_message(rankingMessageID)
-        return rankingMessage
+        rankingMessageCache = await rankingChannel.fetch_message(rankingMessageID)
+        return rankingMessageCache
     except discord.errors.NotFound:
+        rankingMessageCache = None
         return None
 
 def timeStrToHours(timeStr: str) -> int:
@@ -218,24 +920,56 @@ class AdminCommands(commands.Cog, name = "Admin Commands"):
     @commands.command()
     async def ping(self, ctx):
         """Responds with pong if the bot is online.
-        Updates the ranking message for the current ladder.
+        Shows the startup state and updates the ranking message for the current ladder.
+        Cached responses are discarded, e.g. to show changed member names or changes made with ladderadmin.py.
 
         Example: .1v1ping"""
 
+        global rankingFields, rankingFieldsKey
+
         # 1. Checks for admin permissions
         if not await hasAdminRights(ctx, bot):
             return
 
-        # 2. Sends pong and updates ranking
-        await ctx.send('pong')
+        # 2. Sends pong and updates ranking with every tier rendered again
+        await ctx.send(f'pong ({startup.state})')
+        responseCache.clear()
+        rankingFields = {}
+        rankingFieldsKey = None
         await updateRankingMessage(ctx.guild)
 
+    @commands.command()
+    async def stalls(self, ctx):
+        """Shows the commands and database methods that blocked the bot the longest.
+        Stalls are only recorded while 'watchdog_threshold' is set.
+
+        Example: .1v1stalls"""
+
+        # 1. Checks for admin permissions
+        if not await hasAdminRights(ctx, bot):
+            return
+
+        # 2. Lists the worst blockers
+        blockers = watchdog.getWorstBlockers()
+
+        if len(blockers) == 0:
+            await ctx.send("No stalls recorded!")
+            return
+
+        message = ''
+        for command, method, count, total, longest in blockers:
+            methodStr = f"LadderDatabase.{method}" if method is not None else '-'
+            message += f"\n{command} / {methodStr}: {count}x, {total * 1000:.0f} ms in total, longest {longest * 1000:.0f} ms"
+
+        await ctx.send(f"```{message}```")
+
     # Used by admins to dispute a reported result and reverse it
     @commands.command()
     async def dispute(self, ctx, player: commands.MemberConverter):
         """Disputes the last game result of a player.
         It will reset the match status to "pending" and reverse the effects the report had on the ranking.
-        This is not perfectly accurate and the correct match result should be reported as soon as possible.
+        The ranking is recalculated as if the game had never been reported, including all games played since.
+        The correct match result should be reported as soon as possible.
 
         Example: .1v1dispute @Player"""
 
@@ -296,6 +1030,7 @@ class AdminCommands(commands.Cog, name = "Admin Commands"):
             message = "No matches were overdue!"
         else:
             maxCancels = int(db.getConfig('num_cancels'))
+            kickedPlayers = []
 
             for game in affectedGames:
                 challenger = ctx.guild.get_member(game.challenger)
@@ -304,17 +1039,20 @@ class AdminCommands(commands.Cog, name = "Admin Commands"):
                 message += f"{challenger.mention} vs {opponent.mention} has been cancelled.\n"
 
                 if game.challengerCancels > maxCancels:
-                    await kickPlayer(ctx, challenger, "1v1 bot", f"Exceeded maximum amount of cancellations ({maxCancels})")
+                    kickedPlayers += [challenger]
                     message += f"{challenger.mention} has been kicked from the ladder for exceeding the allowed maximum number of cancellations ({maxCancels}).\n"
                 else:
                     message += f"{challenger.mention} now has {game.challengerCancels} out of {maxCancels} cancellation strikes.\n"
 
                 if game.opponentCancels > maxCancels:
-                    await kickPlayer(ctx, opponent, "1v1 bot", f"Exceeded maximum amount of cancellations ({maxCancels})")
+                    kickedPlayers += [opponent]
                     message += f"{opponent.mention} has been kicked from the ladder for exceeding the allowed maximum number of cancellations ({maxCancels}).\n"
                 else:
                     message += f"{opponent.mention} now has {game.opponentCancels} out of {maxCancels} cancellation strikes.\n"
 
+            # Kicks all players at once, so the ranking is only compacted and updated once
+            await kickPlayers(ctx, kickedPlayers, "1v1 bot", f"Exceeded maximum amount of cancellations ({maxCancels})")
+
 
         # 4. Display success message: @ users whose challenges got cancelled by this
         await ctx.send(message)
@@ -469,7 +1207,7 @@ class AdminCommands(commands.Cog, name = "Admin Commands"):
             return
 
         # 3. Shuffle the ladder
-        db.shuffleLadder()
+        await runAdminJob(ctx, 'shuffle', db.getConfig('current_ladder'))
 
         # 4. Update the ranking
         await updateRankingMessage(ctx.guild)
@@ -477,6 +1215,162 @@ class AdminCommands(commands.Cog, name = "Admin Commands"):
         # 5. Feedback
         await ctx.send("The ladder has been shuffled!")
 
+    # Used by admins to start the next season with the players of the current one
+    @commands.command()
+    async def season(self, ctx, name, seeding = 'keep'):
+        """Starts a new season and makes it the current ladder.
+        Every player of the current ladder starts in the new season, seeded by one of the following policies:
+        keep     - Same order as in the final standings
+        compress - Same order, but players who didn't play a game start below everyone who did
+        shuffle  - Random order
+        Pending challenges, cooldowns and protections carry over. Players keep their ladder role.
+        The old season is moved to the archive, so export it first if you need it.
+
+        Example: .1v1season "Season 2" compress"""
+
+        # 1. Check if user has admin role
+        if not await hasAdminRights(ctx, bot):
+            return
+
+        # 2. Check arguments
+        if seeding not in ladderrules.seedingPolicies:
+            await ctx.send(f"Usage: {prefix}season <name> {'|'.join(ladderrules.seedingPolicies)}")
+            return
+
+        # 3. Create the new season
+        try:
+            playerCount = await runAdminJob(ctx, 'season', db.getConfig('current_ladder'), name, seeding)
+        except ValueError as e:
+            await ctx.send(f"The season couldn't be started: {e}")
+            return
+
+        # 4. Update the ranking and give feedback
+        await updateRankingMessage(ctx.guild)
+        await ctx.send(f"Season '{name}' has started with {playerCount} players!")
+
+    # Used by admins to find inconsistencies in the ranking
+    @commands.command()
+    async def integrity(self, ctx):
+        """Checks that the ranks of the current ladder have no gaps or duplicates,
+        that every player is in the right tier and that nobody is in two challenges at once.
+
+        Example: .1v1integrity"""
+
+        # 1. Check if user has admin role
+        if not await hasAdminRights(ctx, bot):
+            return
+
+        # 2. Run the check and list the first violations
+        violations = await runAdminJob(ctx, 'integrity', db.getConfig('current_ladder'))
+
+        if len(violations) == 0:
+            await ctx.send("The ladder is consistent!")
+            return
+
+        message = f"Found {len(violations)} problems:"
+        for violation in violations[:20]:
+            message += f"\n{violation}"
+
+        await ctx.send(message)
+
+    # Used by admins to fix ladder roles after a season change or manual changes in the database
+    @commands.command()
+    async def rolesync(self, ctx):
+        """Gives the ladder role to every player of the current ladder and takes it from everyone else.
+        Roles are changed a few at a time to stay within Discord's rate limits. If the bot restarts during the sync, it continues afterwards.
+
+        Example: .1v1rolesync"""
+
+        # 1. Check if user has admin role
+        if not await hasAdminRights(ctx, bot):
+            return
+
+        # 2. Only one sync at a time
+        if roleSync.running:
+            await ctx.send("A role sync is already running!")
+            return
+
+        # 3. Compare roles and roster and apply the changes
+        await runRoleSync(ctx.guild, ctx.channel)
+
+    # Used by admins to back up or migrate the ladder
+    @commands.command()
+    async def export(self, ctx, kind = 'roster', fileFormat = 'csv'):
+        """Exports the roster or the challenge history of the current ladder as file.
+        Supported kinds are roster and history, supported formats are csv and jsonl.
+        Very large ladders should be exported with ladderadmin.py instead.
+
+        Example: .1v1export history jsonl"""
+
+        # 1. Check if user has admin role
+        if not await hasAdminRights(ctx, bot):
+            return
+
+        # 2. Check arguments
+        if kind not in ladderio.exportKinds or fileFormat not in ['csv', 'jsonl']:
+            await ctx.send(f"Usage: {prefix}export roster|history csv|jsonl")
+            return
+
+        # 3. Write the export to a temporary file and upload it
+        ladder = db.getConfig('current_ladder')
+        exportDirectory = tempfile.mkdtemp()
+        fileName = os.path.join(exportDirectory, ladderio.getExportFileName(ladder, kind, fileFormat))
+
+        try:
+            count = await runAdminJob(ctx, 'export', ladder, kind, fileName)
+            await ctx.send(f"Exported {count} rows.", file = discord.File(fileName))
+        finally:
+            os.remove(fileName)
+            os.rmdir(exportDirectory)
+
+    # Used by admins to seed or restore a ladder
+    @commands.command(name = 'import')
+    async def importFile(self, ctx, kind = 'roster'):
+        """Imports a roster or challenge history from an attached .csv or .jsonl file into the current ladder.
+        Imported roster players are ranked in file order below the existing players. Players that already play in the ladder are skipped.
+        Imported players don't get the ladder role automatically.
+        Imported challenges are only added if both players play in the ladder. Ratings are recalculated afterwards.
+
+        Example: .1v1import roster"""
+
+        # 1. Check if user has admin role
+        if not await hasAdminRights(ctx, bot):
+            return
+
+        # 2. Check arguments
+        if kind not in ladderio.exportKinds or len(ctx.message.attachments) == 0:
+            await ctx.send(f"Usage: {prefix}import roster|history with a .csv or .jsonl file attached")
+            return
+
+        attachment = ctx.message.attachments[0]
+
+        try:
+            ladderio.getFormat(attachment.filename)
+        except ValueError as e:
+            await ctx.send(str(e))
+            return
+
+        # 3. Download the file and import it
+        ladder = db.getConfig('current_ladder')
+        importDirectory = tempfile.mkdtemp()
+        fileName = os.path.join(importDirectory, os.path.basename(attachment.filename))
+
+        try:
+            await attachment.save(fileName)
+            count = await runAdminJob(ctx, 'import', ladder, kind, fileName)
+        except (ValueError, KeyError, MySQLdb.Error) as e:
+            # Data errors of MySQL, e.g. an unknown State, abort the import like invalid rows
+            await ctx.send(f"The file couldn't be imported: {e}")
+            return
+        finally:
+            if os.path.exists(fileName):
+                os.remove(fileName)
+            os.rmdir(importDirectory)
+
+        # 4. Update the ranking and give feedback
+        await updateRankingMessage(ctx.guild)
+        await ctx.send(f"Imported {count} rows!")
+
     # Used by admins to configure the bot
     @commands.command()
     async def config(self, ctx, name, value = ''):
@@ -488,7 +1382,7 @@ class AdminCommands(commands.Cog, name = "Admin Commands"):
 
         Name                 | Value
         ---------------------+-----------------------------------------------------------------------------------------
-        current_ladder       | Name of the current ladder. Change this to create a new ladder
+        current_ladder       | Name of the current ladder. Change this to create a new, empty ladder. See .1v1season to keep the players
         ranking_channel      | The channel to that the ranking message should be posted
         general_channel      | The channel in which players can run bot commands
         ladder_role          | Mention of the role given to ladder players
@@ -500,6 +1394,21 @@ class AdminCommands(commands.Cog, name = "Admin Commands"):
         challenge_protection | Number of hours a player can't be challenged after playing a game they got challenged for
         rank_range           | Number of ranks a player can challenge above his own rank in other tiers
         ranking_message      | ID of the ranking message to be edited by the bot. Is set by bot automatically.
+        show_ratings         | 1 if player ratings should be displayed in the ranking. 0 otherwise
+        rating_initial       | Rating of new players. Changing it recalculates all ratings
+        rating_k_factor      | Maximum rating change per game. Changing it recalculates all ratings
+        snapshot_interval    | Number of logged ladder events between two snapshots used to replay disputed games
+        tier_layout          | How ranks are split into tiers: pyramid, fixed:<size> or percent:<p1>,<p2>,... (top tier first)
+        user_rate_limit      | Commands a user can use in a given time, as <commands>/<seconds>
+        guild_rate_limit     | Commands all users of the server together can use in a given time, as <commands>/<seconds>
+        replica_max_lag      | Maximum replication lag in seconds at which read replicas are still used
+        watchdog_threshold   | Event loop stalls longer than this many milliseconds are logged with their stack. 0 to disable
+        notify_challengeable | 1 if players should be pinged in the general channel when their challenge protection runs out. 0 otherwise
+        matchmaking_interval | Hours between two posts with suggested challenges for idle players. 0 to disable
+        announce_movements   | 1 if rank swaps, promotions, relegations, new #1s and kicks should be announced in the general channel. 0 otherwise
+        warm_state_interval  | Minutes between two saves of the caches for fast restarts, they're also saved on shutdown. 0 to disable
+        trace_sample_rate    | Share of commands between 0 and 1 whose traces are written to Traces.jsonl. 0 to disable
+        trace_slow_ms        | Commands slower than this many milliseconds are always traced. 0 to disable
 
         Examples:
         .1v1config outgoing_cooldown
@@ -538,17 +1447,105 @@ class AdminCommands(commands.Cog, name = "Admin Commands"):
             if value.startswith('<#'):
                 value = value[2:-1]
 
+            if name == 'tier_layout':
+                try:
+                    laddertiers.parseTierLayout(value)
+                except ValueError:
+                    await ctx.send(f"Invalid tier layout '{value}'! Use pyramid, fixed:<size> or percent:<p1>,<p2>,...")
+                    return
+
+            if name == 'user_rate_limit' or name == 'guild_rate_limit':
+                try:
+                    ladderlimits.parseRateLimit(value)
+                except ValueError as e:
+                    await ctx.send(str(e))
+                    return
+
+            if name == 'replica_max_lag':
+                try:
+                    float(value)
+                except ValueError:
+                    await ctx.send(f"Invalid replication lag '{value}'! Use a number of seconds")
+                    return
+
+            if name == 'notify_challengeable' and value not in ['0', '1']:
+                await ctx.send(f"Invalid value '{value}'! Use 1 to enable or 0 to disable notifications")
+                return
+
+            if name == 'matchmaking_interval':
+                try:
+                    float(value)
+                except ValueError:
+                    await ctx.send(f"Invalid interval '{value}'! Use a number of hours")
+                    return
+
+            if name == 'announce_movements' and value not in ['0', '1']:
+                await ctx.send(f"Invalid value '{value}'! Use 1 to enable or 0 to disable announcements")
+                return
+
+            if name == 'warm_state_interval':
+                try:
+                    float(value)
+                except ValueError:
+                    await ctx.send(f"Invalid interval '{value}'! Use a number of minutes")
+                    return
+
+            if name == 'trace_sample_rate':
+                try:
+                    sampleRate = float(value)
+                except ValueError:
+                    sampleRate = -1
+
+                if sampleRate < 0 or sampleRate > 1:
+                    await ctx.send(f"Invalid sample rate '{value}'! Use a number between 0 and 1")
+                    return
+
+            if name == 'trace_slow_ms':
+                try:
+                    int(value)
+                except ValueError:
+                    await ctx.send(f"Invalid threshold '{value}'! Use a number of milliseconds")
+                    return
+
+            if name == 'watchdog_threshold':
+                try:
+                    int(value)
+                except ValueError:
+                    await ctx.send(f"Invalid threshold '{value}'! Use a number of milliseconds")
+                    return
+
             try:
                 db.setConfig(name, value)
             except:
                 await ctx.send(f"Invalid configuration name '{name}'!")
                 return
 
+            # Rating parameters apply to the whole history, so all ratings are recalculated
+            if name == 'rating_initial' or name == 'rating_k_factor':
+                await runAdminJob(ctx, 'recomputeRatings', db.getConfig('current_ladder'))
+                await updateRankingMessage(ctx.guild)
+
+            # Moves players into the tiers of the new layout
+            if name == 'tier_layout':
+                await runAdminJob(ctx, 'updateTiers', db.getConfig('current_ladder'))
+                await updateRankingMessage(ctx.guild)
+
+            if name == 'watchdog_threshold':
+                watchdog.setThreshold(int(value) / 1000)
+
+            if name == 'trace_sample_rate' or name == 'trace_slow_ms':
+                tracer.setSampling(float(db.getConfig('trace_sample_rate')), int(db.getConfig('trace_slow_ms')) / 1000)
+
+            if name == 'user_rate_limit' or name == 'guild_rate_limit':
+                rateLimiter.setLimits(ladderlimits.parseRateLimit(db.getConfig('user_rate_limit')), ladderlimits.parseRateLimit(db.getConfig('guild_rate_limit')))
+
         # 3. Display success message
         await ctx.send(f"Set '{name}' to '{value}'!")
 
     @commands.Cog.listener()
     async def on_member_remove(self, member):
+        await startup.databaseReady.wait()
+
         memberID = member.id
         ladder = db.getConfig('current_ladder')
 
@@ -556,11 +1553,13 @@ class AdminCommands(commands.Cog, name = "Admin Commands"):
         if not db.isPlayerSignedUp(memberID, ladder):
             return
 
-        # Cancels active challenge if necessary
-        db.cancelActiveChallenge(memberID, ladder)
+        # Waits for running admin jobs of the ladder
+        async with jobRunner.changingLadder(ladder):
+            # Cancels active challenge if necessary
+            db.cancelActiveChallenge(memberID, ladder)
 
-        # Remove player from database
-        db.kickPlayer(memberID)
+            # Remove player from database
+            db.kickPlayer(memberID)
         
         # Update standings message
         await updateRankingMessage(member.guild)
@@ -574,6 +1573,7 @@ class PlayerCommands(commands.Cog, name = "Player Commands"):
     async def signup(self, ctx):
         """Signs the user up for the current ladder.
         Gives them the ladder role and updates the rankings.
+        Signups are collected for a few seconds and then added together.
 
         Example: .1v1signup"""
 
@@ -591,18 +1591,9 @@ class PlayerCommands(commands.Cog, name = "Player Commands"):
 
         # 2b. No: Continue
 
-        # 3. Add user to database and gives them a rank
-        db.addPlayer(ctx.author.id)
-
-        # 4. Give user ladder role
-        ladderRole = discord.utils.get(ctx.guild.roles, id = int(db.getConfig('ladder_role')))
-        await ctx.author.add_roles(ladderRole, reason = 'Signed up for 1v1 ladder')
-
-        # 5. Add user to ranking
-        await updateRankingMessage(ctx.guild)
-
-        # 6. Display success message
-        await ctx.send("Welcome to the 1v1 ladder!")
+        # 3. Queue the signup, the queue adds the user, gives them the ladder role, updates the ranking and welcomes them
+        if not signupQueue.add(ctx):
+            await ctx.send("You're already signed up!")
 
 
     @commands.command()
@@ -636,6 +1627,106 @@ class PlayerCommands(commands.Cog, name = "Player Commands"):
         await ctx.send("You have left the ladder!")
 
 
+    # Used by users to look at their own or another player's statistics
+    @commands.command()
+    async def profile(self, ctx, player: commands.MemberConverter = None):
+        """Displays the record, streaks, recent form and head-to-head records of a player.
+        If no player is mentioned, the profile of the user is shown.
+        If another player is mentioned, the user's own record against them is shown as well.
+
+        Example: .1v1profile @Player"""
+
+        # 1. Check if posted in general channel
+        if not db.isGeneralChannel(ctx.channel):
+            return
+
+        if player is None:
+            player = ctx.author
+
+        # 2. Check if player is signed up
+        ladder = db.getConfig('current_ladder')
+        playerInfo = db.getPlayerInfo(player.id, ladder)
+
+        if playerInfo is None:
+            await ctx.send(f"{player.name} isn't signed up for the ladder!")
+            return
+
+        # 3. Read the precomputed statistics
+        stats = db.getPlayerStats(player.id, ladder)
+        tierRecords = db.getTierRecords(player.id, ladder)
+        opponents = db.getMostPlayedOpponents(player.id, 5, ladder)
+
+        # 4. Build and send the profile
+        embed = Embed(
+            title = f"{player.name}",
+            type = 'rich',
+            colour = discord.Colour.blue()
+        )
+
+        embed.add_field(name = 'Rank', value = f"#{playerInfo.rank} (Tier {playerInfo.tier})")
+        embed.add_field(name = 'Record', value = f"{playerInfo.wins}-{playerInfo.losses}")
+        embed.add_field(name = 'Titles', value = f"{playerInfo.titles}")
+        embed.add_field(name = 'Rating', value = f"{round(db.getRating(playerInfo.playerID))}")
+
+        streakStr = 'None'
+        if stats.currentStreak > 0:
+            streakStr = f"{stats.currentStreak} wins"
+        elif stats.currentStreak < 0:
+            streakStr = f"{-stats.currentStreak} losses"
+
+        embed.add_field(name = 'Current streak', value = streakStr)
+        embed.add_field(name = 'Longest streaks', value = f"{stats.longestWinStreak} wins / {stats.longestLossStreak} losses")
+        embed.add_field(name = 'Recent form', value = stats.recentForm if not stats.recentForm == '' else '-')
+
+        if len(tierRecords) > 0:
+            tierStr = '\n'.join([f"Tier {record.tier}: {record.wins}-{record.losses}" for record in tierRecords])
+            embed.add_field(name = 'Record by tier', value = f"```{tierStr}```", inline = False)
+
+        if len(opponents) > 0:
+            opponentStr = ''
+            for record in opponents:
+                opponent = ctx.guild.get_member(record.opponent)
+                opponentName = opponent.name if opponent is not None else str(record.opponent)
+                opponentStr += f"\n{opponentName}: {record.wins}-{record.losses}"
+
+            embed.add_field(name = 'Most played opponents', value = f"```{opponentStr}```", inline = False)
+
+        if not player.id == ctx.author.id:
+            headToHead = db.getHeadToHead(ctx.author.id, player.id, ladder)
+            embed.add_field(name = f"Your record against {player.name}", value = f"{headToHead.wins}-{headToHead.losses}", inline = False)
+
+        await ctx.send(embed = embed)
+
+
+
+    # Used by users to find someone to challenge
+    @commands.command()
+    async def matchups(self, ctx):
+        """Lists every challenge that could be issued right now, grouped by challenger.
+        Players on cooldown, with challenge protection or in a challenge are left out.
+
+        Example: .1v1matchups"""
+
+        # 1. Check if posted in general channel
+        if not db.isGeneralChannel(ctx.channel):
+            return
+
+        # 2. Check if signup-only mode is active
+        if await isOnlySignupAllowed(ctx):
+            return
+
+        # 3. Send the board, it only changes with the ladder version
+        ladder = db.getConfig('current_ladder')
+        version = db.getLadderVersion(ladder)
+        embed = responseCache.get('openMatchups', ladder, version)
+
+        if embed is None:
+            with ladderreplicas.readFromPrimary():
+                embed = generateMatchupsEmbed(ctx.guild, db.getOpenMatchups(ladder))
+
+            responseCache.put('openMatchups', ladder, version, embed)
+
+        await ctx.send(embed = embed)
 
     # Used by users to challenge other users in the ladder
     @commands.command()
@@ -661,41 +1752,7 @@ class PlayerCommands(commands.Cog, name = "Player Commands"):
 
         # 4. If no opponent was given, display the currently active challenge for the user
         if opponent is None:
-            activeChallenge = db.getActiveChallenge(ctx.author.id, ladder)
-            message = ''
-
-            # Add timeout info to message
-            timeouts = db.getTimeoutInfo(ctx.author.id, ladder)
-
-            if timeouts is not None and timeouts.outgoingTimeout is not None:
-                message += f"\nYou're on timeout and can't challenge others until {timeToString(timeouts.outgoingTimeout)}."
-            
-            if timeouts is not None and timeouts.incomingTimeout is not None:
-                message += f"\nYou're protected from challenges until {timeToString(timeouts.incomingTimeout)}."
-
-            # If user has no active challenge, display potential candidates
-            if activeChallenge is None:
-                message += "\nYou don't have any outstanding challenges!"
-
-                possibleChallenges = db.getPossibleChallenges(ctx.author.id)
-
-                if len(possibleChallenges) > 0:
-                    message += "\nPlayers you could challenge: "
-
-                    for potentialOpponentID in possibleChallenges:
-                        potentialOpponent = ctx.guild.get_member(potentialOpponentID)
-                        message += f"\n{potentialOpponent.name}"
-
-            elif activeChallenge.challenger == ctx.author.id:
-                opponent = ctx.guild.get_member(activeChallenge.opponent)
-                message += f"You challenged {opponent.name}. Play your game until {timeToString(activeChallenge.deadline)}!"
-            else:
-                opponent = ctx.guild.get_member(activeChallenge.challenger)
-                message += f"{opponent.name} challenged you! Play your game until {timeToString(activeChallenge.deadline)}."
-
-            if message.startswith('\n'):
-                message = message[1:]
-
+            message = getChallengeStatus(ctx.guild, ctx.author.id, ladder)
             await ctx.send(message)
             return
 
@@ -912,6 +1969,31 @@ class PlayerCommands(commands.Cog, name = "Player Commands"):
 bot.add_cog(PlayerCommands())
 bot.add_cog(AdminCommands())
 
-# Runs bot
-print('Starting bot...')
-bot.run(discordToken)
+# Runs bot, the database is initialized while it connects to Discord
+# Importing this file only sets up the bot and its commands, e.g. for ladderload.py
+if __name__ == '__main__':
+    # Reads Discord bot token from token file
+    try:
+        discordTokenFile = open('Discord.token', 'r')
+        discordToken = discordTokenFile.read()
+        discordTokenFile.close()
+    except:
+        print('Could not read Discord token file')
+        sys.exit('Invalid Discord token file or data')
+
+    print('Starting bot...')
+    bot.loop.create_task(initDatabase())
+    bot.loop.create_task(warmUpCaches())
+    bot.loop.create_task(notifyChallengeable())
+    bot.loop.create_task(postMatchmakingSuggestions())
+    bot.loop.create_task(saveWarmStatePeriodically())
+    bot.run(discordToken)
+
+    # Keeps the caches for the next start
+    if db is not None and float(db.getConfig('warm_state_interval')) > 0:
+        try:
+            saveWarmState()
+            print('Saved warm state')
+        except:
+            print('Could not write warm state')
+            traceback.print_exc()
@@ -0,0 +1,113 @@
+import array
+import random
+
+import ladderdiff
+import ladderevents
+import laddertiers
+
+
+layout = laddertiers.parseTierLayout('pyramid')
+
+# Stand-in for the columns of ladderdb.RankingSnapshot that RankingTracker.matches reads, from (PlayerID, rank, wins, losses, titles) rows
+class Ranking:
+    def __init__(self, rows):
+        self.playerIDs, self.ranks, self.wins, self.losses, self.titles = [array.array('q', column) for column in zip(*rows)]
+
+    def __len__(self):
+        return len(self.playerIDs)
+
+def getTierIndex(playerCount):
+    return laddertiers.TierIndex(layout, playerCount)
+
+# Returns the rows of the ranking as rank -> (Discord ID, wins, losses, titles)
+def getRows(state):
+    return dict([(player.rank, (player.discordID, player.wins, player.losses, player.titles)) for player in state.players.values()])
+
+# Returns Discord ID -> tier of every player
+def getTiers(state):
+    tierIndex = getTierIndex(len(state.players))
+    return dict([(player.discordID, tierIndex.getTier(player.rank)) for player in state.players.values()])
+
+def randomEvent(rng, state, nextPlayerID):
+    playerIDs = list(state.players.keys())
+    choice = rng.random()
+
+    if len(playerIDs) < 4 or choice < 0.15:
+        return 'signup', {'playerID': nextPlayerID, 'discordID': 1000 + nextPlayerID, 'rank': len(playerIDs) + 1}
+    elif choice < 0.25:
+        return 'kick', {'playerID': rng.choice(playerIDs)}
+    elif choice < 0.28:
+        order = list(playerIDs)
+        rng.shuffle(order)
+        return 'shuffle', {'order': order}
+    else:
+        challenger, opponent = rng.sample(playerIDs, 2)
+        return 'report', {'challenger': challenger, 'opponent': opponent, 'won': rng.random() < 0.5}
+
+def test_diffs_match_a_full_comparison():
+    rng = random.Random(3)
+
+    tracker = ladderdiff.RankingTracker()
+    tracker.reset('main', ladderevents.LadderState(), 0)
+    # Full copy of the ladder the changes are compared with
+    state = ladderevents.LadderState()
+
+    for eventID in range(1, 3000):
+        eventType, data = randomEvent(rng, state, eventID)
+
+        oldRows = getRows(state)
+        oldTiers = getTiers(state)
+        state.applyEvent(eventType, data)
+        newRows = getRows(state)
+        newTiers = getTiers(state)
+
+        diff = tracker.applyEvents([(eventID, eventType, data)], getTierIndex)
+
+        assert tracker.lastEventID == eventID
+        assert tracker.state.matches(state)
+
+        if eventType == 'shuffle':
+            assert diff.changedAll
+            continue
+
+        changedRanks = set([rank for rank in set(oldRows) | set(newRows) if not oldRows.get(rank) == newRows.get(rank)])
+        assert changedRanks <= diff.changedRanks
+
+        tierChanges = [(discordID, oldTiers[discordID], newTier) for discordID, newTier in newTiers.items() if discordID in oldTiers and not oldTiers[discordID] == newTier]
+        assert sorted(diff.tierChanges) == sorted(tierChanges)
+
+        if eventType == 'report':
+            winnerID, loserID = (data['challenger'], data['opponent']) if data['won'] else (data['opponent'], data['challenger'])
+            winner, loser = state.players[winnerID], state.players[loserID]
+            swapped = not oldRows[winner.rank][0] == winner.discordID
+
+            assert diff.swaps == ([(winner.discordID, loser.discordID, winner.rank)] if swapped else [])
+            assert diff.newChampion == (winner.discordID if swapped and winner.rank == 1 else None)
+
+        kicks = [row[0] for row in oldRows.values() if row[0] not in newTiers]
+        assert diff.kicks == kicks
+
+def test_unfollowable_events():
+    state = ladderevents.LadderState()
+    for playerID in range(1, 4):
+        state.applyEvent('signup', {'playerID': playerID, 'discordID': 1000 + playerID, 'rank': playerID})
+
+    tracker = ladderdiff.RankingTracker()
+    tracker.reset('main', state, 3)
+
+    assert tracker.applyEvents([(4, 'dispute', {'eventID': 2})], getTierIndex) is None
+    assert tracker.applyEvents([(4, 'report', {'challenger': 9, 'opponent': 1, 'won': True})], getTierIndex) is None
+    assert tracker.applyEvents([(4, 'timeout', {})], getTierIndex).hasAnnouncements() is False
+
+def test_matches_the_displayed_ranking():
+    state = ladderevents.LadderState()
+    for playerID in range(1, 4):
+        state.applyEvent('signup', {'playerID': playerID, 'discordID': 1000 + playerID, 'rank': playerID})
+
+    tracker = ladderdiff.RankingTracker()
+    tracker.reset('main', state, 3)
+    tracker.applyEvents([(4, 'report', {'challenger': 2, 'opponent': 1, 'won': True})], getTierIndex)
+
+    assert tracker.matches('main', Ranking([(2, 1, 1, 0, 1), (1, 2, 0, 1, 0)]))
+    assert not tracker.matches('main', Ranking([(1, 1, 0, 1, 0)]))
+    assert not tracker.matches('other', Ranking([(2, 1, 1, 0, 1)]))
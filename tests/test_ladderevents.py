@@ -0,0 +1,39 @@
+import ladderevents
+
+
+def createState():
+    state = ladderevents.LadderState()
+
+    for playerID in range(1, 5):
+        state.applyEvent('signup', {'playerID': playerID, 'discordID': 100 + playerID, 'rank': playerID})
+
+    return state
+
+def test_snapshot_round_trip():
+    state = createState()
+    state.applyEvent('report', {'challenger': 3, 'opponent': 2, 'won': True})
+
+    assert ladderevents.LadderState.fromSnapshot(state.toSnapshot()).matches(state)
+
+def test_replay_reproduces_the_ladder():
+    events = [('report', {'challenger': 2, 'opponent': 1, 'won': True}), ('kick', {'playerID': 3}), ('report', {'challenger': 4, 'opponent': 1, 'won': False})]
+
+    state = createState()
+    replayed = ladderevents.LadderState.fromSnapshot(state.toSnapshot())
+
+    for eventType, data in events:
+        state.applyEvent(eventType, data)
+        replayed.applyEvent(eventType, data)
+
+    assert replayed.matches(state)
+    assert [state.players[playerID].rank for playerID in [1, 2, 4]] == [2, 1, 3]
+    assert state.players[2].titles == 1
+
+def test_diverged_ranks_dont_match():
+    state = createState()
+    diverged = createState()
+    diverged.players[1].rank, diverged.players[2].rank = 2, 1
+
+    # Same players with the same records, only the ranks differ
+    assert not diverged.matches(state)
+    assert not createState().matches(ladderevents.LadderState())
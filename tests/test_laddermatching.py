@@ -0,0 +1,55 @@
+import itertools
+import random
+
+import laddermatching
+
+
+# Returns the size of a maximum matching of a small graph by trying every subset of edges
+def bruteForceMatchingSize(playerCount, pairs):
+    for size in range(playerCount // 2, 0, -1):
+        for subset in itertools.combinations(pairs, size):
+            players = [player for pair in subset for player in pair]
+
+            if len(set(players)) == len(players):
+                return size
+
+    return 0
+
+def randomChallenges(rng, playerCount, density):
+    return [(challenger, opponent) for challenger in range(1, playerCount + 1) for opponent in range(1, playerCount + 1)
+    if not challenger == opponent and rng.random() < density]
+
+def test_suggestions_are_maximum_matchings():
+    rng = random.Random(46)
+
+    for _ in range(300):
+        playerCount = rng.randint(2, 12)
+        possibleChallenges = randomChallenges(rng, playerCount, rng.choice([0.05, 0.15, 0.3]))
+        lastOpponentRanks = [rng.randint(0, playerCount) for _ in range(playerCount)]
+
+        games = laddermatching.suggestGames(possibleChallenges, lastOpponentRanks)
+
+        # Every game is a legal challenge and nobody plays twice
+        assert all([game in possibleChallenges for game in games])
+        players = [player for game in games for player in game]
+        assert len(set(players)) == len(players)
+
+        pairs = list(set([(min(game), max(game)) for game in possibleChallenges]))
+        assert len(games) == bruteForceMatchingSize(playerCount, pairs)
+
+def test_blossom_is_contracted():
+    # A triangle 1-2-3 with a tail at 3 and at 1, only a matching through the odd cycle covers everyone
+    possibleChallenges = [(2, 1), (3, 2), (3, 1), (4, 3), (5, 1), (6, 5)]
+    games = laddermatching.suggestGames(possibleChallenges, [0] * 6)
+
+    assert len(games) == 3
+
+def test_prefers_close_ranks_and_avoids_rematches():
+    assert laddermatching.suggestGames([(2, 1), (3, 1), (4, 3)], [0, 0, 0, 0]) == [(2, 1), (4, 3)]
+
+    # 3 and 2 just played, so 3 challenges 1 and 2 is left for 4
+    games = laddermatching.suggestGames([(3, 2), (3, 1), (4, 2)], [0, 3, 2, 0])
+    assert games == [(3, 1), (4, 2)]
+
+def test_no_challenges():
+    assert laddermatching.suggestGames([], [0, 0]) == []
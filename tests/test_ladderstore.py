@@ -0,0 +1,74 @@
+import array
+import datetime
+
+import ladderevents
+import ladderstore
+
+
+# Stand-ins for ladderdb.RankingSnapshot and ladderdb.ChallengeInfo with the same layout, ladderstore only gets them passed in
+class Ranking:
+    __slots__ = ('playerIDs', 'ranks', 'wins')
+
+    def __init__(self, rows = ()):
+        self.playerIDs = array.array('q', [row[0] for row in rows])
+        self.ranks = array.array('i', [row[1] for row in rows])
+        self.wins = array.array('i', [row[2] for row in rows])
+
+    def __len__(self):
+        return len(self.playerIDs)
+
+class Challenge:
+    __slots__ = ('challengeID', 'challenger', 'opponent', 'deadline')
+
+    def __init__(self, challengeID, challenger, opponent, deadline):
+        self.challengeID = challengeID
+        self.challenger = challenger
+        self.opponent = opponent
+        self.deadline = deadline
+
+def createWarmState():
+    ladderState = ladderevents.LadderState()
+    for playerID in range(1, 4):
+        ladderState.applyEvent('signup', {'playerID': playerID, 'discordID': 2 ** 40 + playerID, 'rank': playerID})
+    ladderState.applyEvent('report', {'challenger': 2, 'opponent': 1, 'won': True})
+
+    ranking = Ranking([(2, 1, 1), (1, 2, 0), (3, 3, 0)])
+    challenges = [Challenge(7, 2 ** 40 + 3, 2 ** 40 + 1, datetime.datetime(2024, 5, 1, 12, 30)), Challenge(5, 2 ** 40 + 3, 2 ** 40 + 2, datetime.datetime(2024, 4, 1))]
+
+    return ladderstore.WarmState('main', [12, 3], {'tier_layout': 'pyramid'}, ranking, ladderState, [(2 ** 40 + 1, 'outgoing', 1700000000.5)],
+    challenges, {2 ** 40 + 1: 'First', 2 ** 40 + 2: 'Second'})
+
+def test_round_trip():
+    state = createWarmState()
+    decoded = ladderstore.decodeWarmState(ladderstore.encodeWarmState(state), Ranking, Challenge)
+
+    assert (decoded.ladder, decoded.key, decoded.config, decoded.getLastEventID()) == ('main', [12, 3], {'tier_layout': 'pyramid'}, 12)
+    assert [list(getattr(decoded.ranking, name)) for name in Ranking.__slots__] == [[2, 1, 3], [1, 2, 3], [1, 0, 0]]
+    assert decoded.ladderState.matches(state.ladderState)
+    assert decoded.timeouts == state.timeouts
+    assert [(challenge.challengeID, challenge.challenger, challenge.opponent, challenge.deadline) for challenge in decoded.challenges] == \
+    [(challenge.challengeID, challenge.challenger, challenge.opponent, challenge.deadline) for challenge in state.challenges]
+    assert decoded.names == state.names
+
+    # The later challenge is the active one of the player in both
+    assert decoded.activeChallenges[2 ** 40 + 3].challengeID == 7
+
+def test_other_versions_and_damaged_data_are_ignored():
+    data = ladderstore.encodeWarmState(createWarmState())
+
+    assert ladderstore.decodeWarmState(b'', Ranking, Challenge) is None
+    assert ladderstore.decodeWarmState(b'XXXX' + data[4:], Ranking, Challenge) is None
+    assert ladderstore.decodeWarmState(data[:4] + (ladderstore.formatVersion + 1).to_bytes(2, 'little') + data[6:], Ranking, Challenge) is None
+    # Cut into the compressed ranking
+    assert ladderstore.decodeWarmState(data[:-3], Ranking, Challenge) is None
+
+def test_files(tmp_path):
+    fileName = str(tmp_path / 'WarmState.cache')
+
+    assert ladderstore.readFile(fileName, Ranking, Challenge) is None
+
+    ladderstore.writeFile(fileName, createWarmState())
+    ladderstore.writeFile(fileName, createWarmState())
+
+    assert ladderstore.readFile(fileName, Ranking, Challenge).key == [12, 3]
+    assert [path.name for path in tmp_path.iterdir()] == ['WarmState.cache']
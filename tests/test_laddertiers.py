@@ -0,0 +1,52 @@
+import random
+
+import laddertiers
+import ladderrules
+
+
+layouts = ['pyramid', 'fixed:1', 'fixed:3', 'percent:10,20,30,40', 'percent:50,1,49', 'percent:1,1,98', 'percent:1,0.1,98.9']
+
+def test_challengeable_ranks_match_the_rules():
+    for layoutText in layouts:
+        layout = laddertiers.parseTierLayout(layoutText)
+
+        for playerCount in range(1, 40):
+            tierIndex = laddertiers.TierIndex(layout, playerCount)
+
+            for rankRange in [1, 3]:
+                for rank in range(1, playerCount + 1):
+                    expected = [opponentRank for opponentRank in range(1, playerCount + 1) if not opponentRank == rank and
+                    ladderrules.isPossibleChallenge(rank, tierIndex.getTier(rank), opponentRank, tierIndex.getTier(opponentRank), rankRange)]
+
+                    challengeableRanks = tierIndex.getChallengeableRanks(rank, rankRange)
+                    # Small ladders with skipped tiers can put #1 into its own range, the queries leave the player out
+                    actual = [] if challengeableRanks is None else [opponentRank for opponentRank in range(challengeableRanks[0], challengeableRanks[1] + 1) if not opponentRank == rank]
+
+                    assert actual == expected, (layoutText, playerCount, rankRange, rank)
+
+def test_first_rank_can_challenge_tier_3_when_tier_2_is_empty():
+    # 1 player in tier 1, none in tier 2 and 99 in tier 3
+    tierIndex = laddertiers.TierIndex(laddertiers.parseTierLayout('percent:1,0.1,98.9'), 100)
+
+    assert tierIndex.getBounds(2) is None
+    assert tierIndex.getChallengeableRanks(1, 3) == tierIndex.getBounds(3)
+
+def test_changed_ranks_match_a_full_comparison():
+    rng = random.Random(7)
+
+    for layoutText in layouts:
+        layout = laddertiers.parseTierLayout(layoutText)
+
+        for _ in range(300):
+            oldCount = rng.randrange(1, 60)
+            removedRanks = rng.sample(range(1, oldCount + 1), rng.choice([0, 1, 1, 2, 5]) if oldCount > 5 else 0)
+            newCount = oldCount - len(removedRanks) + rng.choice([0, 0, 1, 3])
+
+            oldIndex = laddertiers.TierIndex(layout, oldCount)
+            newIndex = laddertiers.TierIndex(layout, newCount)
+
+            # Old rank of every remaining player, in their new order
+            oldRanks = [rank for rank in range(1, oldCount + 1) if rank not in removedRanks]
+            expected = [newRank for newRank, oldRank in enumerate(oldRanks, 1) if not oldIndex.getTier(oldRank) == newIndex.getTier(newRank)]
+
+            assert oldIndex.getChangedRanks(newIndex, removedRanks) == expected, (layoutText, oldCount, removedRanks, newCount)
@@ -0,0 +1,74 @@
+import math
+import random
+
+import laddertimers
+
+
+# Tick at which a timer scheduled at the given tick fires: its expiry tick, or the next tick if it's already due
+def getFireTick(expiry, scheduleTick, tickLength):
+    return max(int(math.ceil(expiry / tickLength)), scheduleTick + 1)
+
+def test_wheel_matches_reference_model():
+    rng = random.Random(42)
+
+    for tickLength in [1.0, 0.25]:
+        # Few small slots, so timers cascade through every level and the overflow
+        wheel = laddertimers.TimerWheel(1000.0, tickLength, slotCount = 4, levelCount = 3)
+        now = 1000.0
+        # Maps key -> (expiry, fire tick)
+        reference = {}
+
+        for step in range(5000):
+            action = rng.random()
+            key = rng.randrange(50)
+
+            if action < 0.5:
+                expiry = now + rng.choice([-5, 0, 0.1, 1, 3, 17, 64, 200, 1000]) * rng.random() * tickLength
+                wheel.schedule(key, expiry)
+                reference[key] = (expiry, getFireTick(expiry, wheel.currentTick, tickLength))
+
+            elif action < 0.6:
+                wheel.cancel(key)
+                reference.pop(key, None)
+
+            else:
+                now += rng.choice([0.1, 1, 5, 30, 500]) * rng.random() * tickLength
+                targetTick = int(math.floor(now / tickLength))
+
+                expired = wheel.advance(now)
+                expected = set([key for key, (expiry, fireTick) in reference.items() if fireTick <= targetTick])
+
+                assert set(expired) == expected
+                assert len(expired) == len(expected)
+
+                # Timers fire tick by tick
+                fireTicks = [reference[key][1] for key in expired]
+                assert fireTicks == sorted(fireTicks)
+
+                for key in expired:
+                    del reference[key]
+
+            assert len(wheel) == len(reference)
+
+            for key, (expiry, fireTick) in reference.items():
+                assert wheel.getExpiry(key) == expiry
+                assert wheel.isRunning(key, now) == (expiry > now)
+
+def test_rescheduling_replaces_the_timer():
+    wheel = laddertimers.TimerWheel(0)
+    wheel.schedule('a', 10)
+    wheel.schedule('a', 100)
+
+    assert wheel.advance(50) == []
+    assert wheel.advance(100) == ['a']
+    assert len(wheel) == 0
+
+def test_cancel_where():
+    wheel = laddertimers.TimerWheel(0)
+    for ladder in ['old', 'new']:
+        for discordID in range(3):
+            wheel.schedule((ladder, discordID), 5)
+
+    wheel.cancelWhere(lambda key: key[0] == 'old')
+
+    assert sorted(wheel.advance(10)) == [('new', discordID) for discordID in range(3)]